@@ -0,0 +1,82 @@
+"""
+Benchmark: /simplify tail latency with and without hedged model calls, against
+the local fake completion server with injected latency outliers.
+
+Each mode sends its own distinct texts (no cache hits) after a warm-up that
+gives the hedger enough latency samples. Reported: p50/p95/p99 request
+latency and the extra upstream calls hedging cost.
+
+Usage: python bench_hedging.py --requests 400 --concurrency 16 --outlier-rate 0.03
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from fake_openai_server import FakeCompletionServer
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def send(app, texts, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        async def one(text):
+            async with sem:
+                sent = time.perf_counter()
+                r = await http.post("/simplify", json={"text": text})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - sent)
+
+        await asyncio.gather(*(one(t) for t in texts))
+    return latencies
+
+
+async def run_modes(backend, server, args):
+    print(f"{'mode':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'extra calls':>12}")
+    for mode, ratio in (("no hedge", 0.0), ("hedged", args.max_ratio)):
+        backend.hedger.configure(max_ratio=ratio)
+        warmup = [f"The lessee shall pay warm-up installment {i} under the {mode} lease." for i in range(40)]
+        await send(backend.app, warmup, args.concurrency)
+        calls_before, hedges_before = server.calls, backend.hedger.hedges
+        texts = [f"The lessee shall pay installment {i} under the {mode} lease." for i in range(args.requests)]
+        latencies = await send(backend.app, texts, args.concurrency)
+        extra = (server.calls - calls_before - args.requests) / args.requests
+        print(f"{mode:>10} {percentile(latencies, 50) * 1000:>6.0f}ms {percentile(latencies, 95) * 1000:>6.0f}ms "
+              f"{percentile(latencies, 99) * 1000:>6.0f}ms {max(latencies) * 1000:>6.0f}ms {extra:>11.1%}"
+              f"  ({backend.hedger.hedges - hedges_before} hedges)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="normal fake model latency in seconds")
+    parser.add_argument("--outlier-rate", type=float, default=0.03, help="fraction of calls that are slow")
+    parser.add_argument("--outlier-latency", type=float, default=1.0, help="latency of a slow call in seconds")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-ratio", type=float, default=0.1, help="HEDGE_MAX_RATIO for the hedged run")
+    args = parser.parse_args()
+
+    with FakeCompletionServer(latency=args.latency, outlier_rate=args.outlier_rate,
+                              outlier_latency=args.outlier_latency, seed=1) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+        os.environ.setdefault("HEDGE_MIN_DELAY", "0")
+        import main as backend
+        backend.check_rate_limit = lambda *a, **kw: True
+
+        print(f"Fake latency {args.latency * 1000:.0f}ms, {args.outlier_rate:.0%} outliers at "
+              f"{args.outlier_latency * 1000:.0f}ms | {args.requests} requests at concurrency {args.concurrency}\n")
+        asyncio.run(run_modes(backend, server, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Microbenchmark: keyword categorization with one TermMatcher pass versus the
+previous per-term substring scans, as input length grows.
+
+Each iteration does the categorization work of one /simplify call: the
+fast-path signal count, _is_likely_legal and adjust_category.
+
+Usage: python bench_terms.py --lengths 200,2000,20000,200000
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+import main
+from main import _CATEGORY_TERMS, _ESTATE_TERMS, _FAST_PATH_SIGNALS, _LEGAL_SIGNAL_WORDS
+
+CLAUSES = [
+    "The party of the first part shall indemnify and hold harmless the party of the second part.",
+    "Upon my death, the trustee shall distribute the remaining assets of the trust to my grandchildren.",
+    "The employee may not be terminated without cause during the initial probationary period.",
+    "The grantor hereby conveys to the grantee all right, title, and interest in the property.",
+    "The plaintiff seeks damages for injuries sustained in a car accident caused by the defendant's negligence.",
+]
+
+
+def scan_adjust_category(legal_text, category):
+    """The substring-scan implementation adjust_category replaced, kept for comparison."""
+    lowered = legal_text.lower()
+    if category != "Personal Injury":
+        if "plaintiff" in lowered and (
+            "damages" in lowered or "injury" in lowered or "injuries" in lowered or "duty of care" in lowered or "negligence" in lowered
+        ):
+            strong_criminal_markers = ["search warrant", "probable cause", "fourth amendment", "remain silent", "attorney present", "criminal prosecution", "incriminating"]
+            if not any(m in lowered for m in strong_criminal_markers):
+                return "Personal Injury"
+    if category in ("Other Legal", "Non-Legal"):
+        if any(t in lowered for t in _ESTATE_TERMS):
+            if "agreement" in lowered and not any(w in lowered for w in ("bequeath", "codicil", "last will", "testament")) and "upon my death" not in lowered:
+                return "Contract"
+            return "Wills, Trusts, and Estates"
+        if any(t in lowered for t in _CATEGORY_TERMS["Contract"]):
+            return "Contract"
+        for cat, terms in _CATEGORY_TERMS.items():
+            if cat == "Contract":
+                continue
+            if any(t in lowered for t in terms):
+                return cat
+    if category == "Wills, Trusts, and Estates":
+        has_agreement = "agreement" in lowered
+        strong_estate = any(w in lowered for w in ("bequeath", "codicil", "last will", "upon my death", "trustee", "testament"))
+        if has_agreement and not strong_estate and "trust" not in lowered:
+            return "Contract"
+        real_estate_terms = _CATEGORY_TERMS.get("Real Estate", set())
+        if not strong_estate and sum(1 for t in real_estate_terms if t in lowered) >= 2:
+            return "Real Estate"
+    if category == "Criminal Procedure":
+        injury_terms = _CATEGORY_TERMS.get("Personal Injury", set())
+        pi_hits = sum(1 for t in injury_terms if t in lowered)
+        criminal_terms = {t for t in _CATEGORY_TERMS.get("Criminal Procedure", set()) if t != "defendant"}
+        has_strong_criminal = any(t in lowered for t in criminal_terms)
+        if pi_hits >= 1 and not has_strong_criminal:
+            return "Personal Injury"
+    if category == "Real Estate":
+        real_estate_terms = _CATEGORY_TERMS.get("Real Estate", set())
+        re_hits = sum(1 for t in real_estate_terms if t in lowered)
+        strong_estate = any(w in lowered for w in ("bequeath", "codicil", "last will", "upon my death", "trustee", "testament"))
+        if strong_estate and re_hits == 0:
+            return "Wills, Trusts, and Estates"
+        if "bequeath" in lowered:
+            return "Wills, Trusts, and Estates"
+    if category not in ("Wills, Trusts, and Estates"):
+        if any(w in lowered for w in ("bequeath", "last will", "codicil", "upon my death", "testament")):
+            return "Wills, Trusts, and Estates"
+    return category
+
+
+def scan_pipeline(text, category):
+    lowered = text.lower()
+    signals = sum(1 for w in _FAST_PATH_SIGNALS if w in lowered)
+    likely = any(w in text.lower() for w in _LEGAL_SIGNAL_WORDS)
+    return signals, likely, scan_adjust_category(text, category)
+
+
+def matcher_pipeline(text, category):
+    found = main.find_terms(text)
+    return main.legal_signal_count(text, found), main._is_likely_legal(text, found), main.adjust_category(text, category, found)
+
+
+def timeit(fn, text, categories, budget=0.5):
+    runs = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < budget:
+        for category in categories:
+            fn(text, category)
+        runs += len(categories)
+    return (time.perf_counter() - start) / runs
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", default="200,2000,20000,200000", help="comma-separated input lengths in characters")
+    args = parser.parse_args()
+
+    categories = ["Other Legal", "Wills, Trusts, and Estates", "Criminal Procedure", "Real Estate", "Contract"]
+    corpus = " ".join(CLAUSES)
+    print(f"{'chars':>8} {'scans (µs)':>11} {'matcher (µs)':>13} {'speedup':>8}")
+    for length in (int(n) for n in args.lengths.split(",")):
+        text = (corpus * (length // len(corpus) + 1))[:length]
+        assert all(scan_pipeline(text, c) == matcher_pipeline(text, c) for c in categories)
+        old = timeit(scan_pipeline, text, categories)
+        new = timeit(matcher_pipeline, text, categories)
+        print(f"{length:>8} {old * 1e6:>11.1f} {new * 1e6:>13.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,181 @@
+"""
+Response caches for /simplify: an in-process LRU + TTL tier and an optional
+SQLite tier that survives restarts and is shared by every worker on a host.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire `ttl` seconds after insertion.
+
+    A `maxsize` of 0 disables the cache. Not thread-safe; it is only touched
+    from the event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[Any]:
+        """Cached value or None; `count=False` leaves the hit/miss counters alone."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += count
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.misses += count
+            return None
+        self._data.move_to_end(key)
+        self.hits += count
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "max_size": self.maxsize,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+class SQLiteCache:
+    """Persistent JSON value store in a SQLite database running in WAL mode.
+
+    Several processes may open the same file: WAL lets readers proceed while
+    one writer commits, and writers wait up to `busy_timeout` seconds for each
+    other. The default is kept short because the cache is called from the
+    event loop: a lookup that would wait longer counts as a miss and a store
+    is skipped. Once the table holds more than `max_entries` rows the least
+    recently used ones are deleted. Database errors are logged and treated as
+    misses so the cache can never fail a request.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, evict_every: int = 100, busy_timeout: float = 0.05):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        # Setup above may wait for other workers; lookups and stores only wait this long.
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    try:
+                        self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    except sqlite3.OperationalError:
+                        pass  # another writer holds the lock; serve the hit without the LRU touch
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache read failed: {e}")
+            return None
+        if row is None:
+            self.misses += count
+            return None
+        self.hits += count
+        return json.loads(row[0])
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            with self._lock:
+                return self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._writes += 1
+                if self._writes % self.evict_every == 0:
+                    self._evict()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Persistent cache write failed: {e}")
+
+    def _evict(self) -> None:
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY accessed_at ASC"
+            " LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))",
+            (self.max_entries,),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            size = len(self)
+        except sqlite3.Error:
+            size = None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "size": size,
+            "max_size": self.max_entries,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
@@ -0,0 +1,221 @@
+"""
+Record/replay of model responses, so the /simplify pipeline and the evals
+can run offline.
+
+In record mode, CassetteClient passes calls through to the real client and
+saves each raw completion in a content-addressed store. The store key is a
+hash of the model, the system prompt and the user's text. In replay mode
+the client serves calls from that store only and raises CassetteMiss for
+anything that was not recorded. It never touches the network.
+
+Streaming calls are recorded as the completion they add up to. On replay
+that completion is streamed back as chunks.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(Exception):
+    """Replay found no recording for a request."""
+
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    """Store key for a completion request: model, system prompt hash and user text."""
+    messages = kwargs.get("messages", [])
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    prompt_sha = hashlib.sha256(system.encode("utf-8")).hexdigest()
+    material = "\x00".join((kwargs.get("model", ""), prompt_sha, user))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Directory of recorded completions, one JSON file per request key."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    def put(self, key: str, kwargs: Dict[str, Any], response: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        messages = kwargs.get("messages", [])
+        entry = {
+            "model": kwargs.get("model"),
+            "input": messages[-1].get("content") if messages else None,
+            "response": response,
+        }
+        # Write then rename, so a concurrent reader never sees a partial file.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+        self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+def _completion_from_stream(chunks) -> Dict[str, Any]:
+    """Fold streamed chunks back into the non-streaming completion they represent."""
+    content, arguments, tool_call, usage, model, finish_reason = [], [], None, None, "", None
+    for chunk in chunks:
+        model = chunk.model or model
+        usage = chunk.usage or usage
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        finish_reason = choice.finish_reason or finish_reason
+        if choice.delta.content:
+            content.append(choice.delta.content)
+        for tc in choice.delta.tool_calls or []:
+            if tc.id:
+                tool_call = {"id": tc.id, "type": "function", "function": {"name": tc.function.name, "arguments": ""}}
+            if tc.function and tc.function.arguments:
+                arguments.append(tc.function.arguments)
+    message: Dict[str, Any] = {"role": "assistant", "content": "".join(content) or None}
+    if tool_call is not None:
+        tool_call["function"]["arguments"] = "".join(arguments)
+        message["tool_calls"] = [tool_call]
+    return {
+        "id": "chatcmpl-recorded-stream",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": finish_reason or "stop", "message": message}],
+        "usage": usage.model_dump(mode="json") if usage is not None else None,
+    }
+
+
+def _chunks_from_completion(response: Dict[str, Any], chunk_size: int = 24):
+    """Replay a recorded completion as a stream of chunks, usage last."""
+    base = {"id": response.get("id", "chatcmpl-replay"), "object": "chat.completion.chunk",
+            "created": response.get("created", 0), "model": response.get("model", "")}
+    message = response["choices"][0]["message"]
+    if message.get("content"):
+        yield ChatCompletionChunk.model_validate({**base, "choices": [
+            {"index": 0, "delta": {"role": "assistant", "content": message["content"]}}]})
+    for tc in message.get("tool_calls") or []:
+        yield ChatCompletionChunk.model_validate({**base, "choices": [{"index": 0, "delta": {"tool_calls": [
+            {"index": 0, "id": tc["id"], "type": "function", "function": {"name": tc["function"]["name"], "arguments": ""}}]}}]})
+        arguments = tc["function"]["arguments"]
+        for i in range(0, len(arguments), chunk_size):
+            yield ChatCompletionChunk.model_validate({**base, "choices": [{"index": 0, "delta": {"tool_calls": [
+                {"index": 0, "function": {"arguments": arguments[i:i + chunk_size]}}]}}]})
+    yield ChatCompletionChunk.model_validate({**base, "choices": [
+        {"index": 0, "delta": {}, "finish_reason": response["choices"][0].get("finish_reason") or "stop"}]})
+    if response.get("usage"):
+        yield ChatCompletionChunk.model_validate({**base, "choices": [], "usage": response["usage"]})
+
+
+class _ReplayStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class _RecordingStream:
+    def __init__(self, stream, on_complete):
+        self._stream = stream
+        self._on_complete = on_complete
+        self._chunks = []
+
+    async def __aenter__(self):
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._stream.__aexit__(*exc)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._on_complete(_completion_from_stream(self._chunks))
+            raise
+        self._chunks.append(chunk)
+        return chunk
+
+
+class _Completions:
+    def __init__(self, owner: "CassetteClient"):
+        self._owner = owner
+
+    async def create(self, **kwargs):
+        owner = self._owner
+        key = request_key(kwargs)
+        if owner.mode == "replay":
+            response = owner.cassette.get(key)
+            if response is None:
+                raise CassetteMiss(f"No recorded response for {kwargs.get('model')!r} request {key[:12]}")
+            if kwargs.get("stream"):
+                return _ReplayStream(_chunks_from_completion(response))
+            return ChatCompletion.model_validate(response)
+
+        response = await owner.inner.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return _RecordingStream(response, lambda completion: owner.cassette.put(key, kwargs, completion))
+        owner.cassette.put(key, kwargs, response.model_dump(mode="json"))
+        return response
+
+
+class CassetteClient:
+    """Stands in for AsyncOpenAI, recording or replaying chat completions.
+
+    Only `chat.completions.create` and `close` are provided, which is all the
+    backend uses.
+    """
+
+    def __init__(self, inner, cassette: Cassette, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be record or replay, not {mode!r}")
+        self.inner = inner
+        self.cassette = cassette
+        self.mode = mode
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    async def close(self) -> None:
+        await self.inner.close()
@@ -1,3 +1,7 @@
+import argparse
+import os
+import time
+
 import requests
 import yaml
 
@@ -8,16 +12,17 @@ def load_samples(path):
         data = yaml.safe_load(f)
     return data["samples"]
 
+def normalize_category(category):
+    """Map a backend category onto the sample labels (Other Legal and Non-Legal both count as Other)."""
+    category = (category or "").strip()
+    return "Other" if category in ("Other Legal", "Non-Legal") else category
+
 def run_eval(samples):
     correct = 0
     for sample in samples:
         response = requests.post(API_URL, json={"text": sample["input"]})
         data = response.json()
-        predicted_raw = data.get("category", "").strip()
-        if predicted_raw in ("Other Legal", "Non-Legal"):
-            predicted = "Other"
-        else:
-            predicted = predicted_raw
+        predicted = normalize_category(data.get("category", ""))
         expected = sample["expected_category"].strip()
         print(f"Input: {sample['input']}")
         print(f"Expected: {expected}, Got: {predicted}")
@@ -25,6 +30,48 @@ def run_eval(samples):
             correct += 1
     print(f"\nAccuracy: {correct}/{len(samples)} ({100 * correct / len(samples):.1f}%)")
 
+def run_fast_path_eval(samples, thresholds):
+    """Offline: precision/recall of the local Non-Legal shortcut at each threshold (no server or API key needed)."""
+    os.environ.setdefault("OPENAI_API_KEY", "offline-eval")
+    from main import legal_signal_count
+
+    counts = []
+    start = time.perf_counter()
+    for sample in samples:
+        counts.append(legal_signal_count(sample["input"]))
+    per_decision_us = (time.perf_counter() - start) / len(samples) * 1e6
+
+    actual = [s["expected_category"].strip() == "Non-Legal" for s in samples]
+    print(f"Samples: {len(samples)} ({sum(actual)} Non-Legal) | avg decision time: {per_decision_us:.1f}µs\n")
+    print(f"{'threshold':>9} {'shortcut':>8} {'precision':>9} {'recall':>7}")
+    for threshold in thresholds:
+        predicted = [c <= threshold for c in counts]
+        tp = sum(1 for p, a in zip(predicted, actual) if p and a)
+        shortcut = sum(predicted)
+        precision = tp / shortcut if shortcut else 1.0
+        recall = tp / sum(actual) if any(actual) else 1.0
+        print(f"{threshold:>9} {shortcut:>8} {precision:>9.1%} {recall:>7.1%}")
+
+    misses = [(s["input"], c) for s, c, a in zip(samples, counts, actual) if c <= max(thresholds) and not a]
+    if misses:
+        print(f"\nLegal samples that would be shortcut at threshold {max(thresholds)}:")
+        for text, c in misses:
+            print(f"  [{c} signals] {text}")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Category accuracy eval against a running backend.")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="evaluate the local Non-Legal shortcut offline instead of calling the backend")
+    parser.add_argument("--thresholds", default="0,1,2", help="comma-separated LOCAL_CLASSIFIER_THRESHOLD values")
+    parser.add_argument("--in-process", choices=("stub", "replay", "live"),
+                        help="score through the pipeline in this process with the given model client (see eval_harness.py)")
+    args = parser.parse_args()
+
     samples = load_samples("category_eval_samples.yaml")
-    run_eval(samples)
\ No newline at end of file
+    if args.fast_path:
+        run_fast_path_eval(samples, [int(t) for t in args.thresholds.split(",")])
+    elif args.in_process:
+        from eval_harness import print_report, run
+        print_report(run(samples, model=args.in_process))
+    else:
+        run_eval(samples)
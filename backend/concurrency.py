@@ -0,0 +1,379 @@
+"""
+Concurrency helpers for the /simplify pipeline.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one underlying call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving while
+    it is running await the same task and receive its result or exception.
+    The task is shielded, so a caller that disconnects does not cancel the
+    work the remaining waiters depend on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away.
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised by Hedger.run when the overall deadline passes with attempts still running."""
+
+
+class Overloaded(Exception):
+    """Raised when a call is shed instead of queued or admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Upstream overloaded ({reason}); retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps concurrent upstream calls behind a bounded FIFO wait queue.
+
+    Up to `max_inflight` holders run at once; up to `max_queue` more wait, each
+    for at most `queue_timeout` seconds. Anything beyond that is shed at once
+    with Overloaded, whose `retry_after` estimates when a slot will free up
+    from the recent call duration. Limits can be changed at runtime with
+    `configure`; raising `max_inflight` admits waiters immediately, lowering
+    it takes effect as running calls finish.
+    """
+
+    def __init__(self, max_inflight: int, max_queue: int, queue_timeout: float):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self.max_wait = 0.0
+        self._avg_hold = 1.0
+
+    def configure(self, max_inflight: Optional[int] = None, max_queue: Optional[int] = None,
+                  queue_timeout: Optional[float] = None) -> None:
+        if max_inflight is not None:
+            self.max_inflight = max_inflight
+        if max_queue is not None:
+            self.max_queue = max_queue
+        if queue_timeout is not None:
+            self.queue_timeout = queue_timeout
+        self._wake()
+
+    def _retry_after(self) -> int:
+        backlog = (len(self._waiters) + 1) / max(1, self.max_inflight)
+        return max(1, math.ceil(self._avg_hold * backlog))
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < self.max_inflight:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        """Wait for a slot; raise Overloaded if the queue is full or the wait times out."""
+        if self.inflight < self.max_inflight and not self._waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise Overloaded("queue full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on.
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed_timeout += 1
+                raise Overloaded("queue timeout", self._retry_after()) from None
+            raise
+        waited = time.monotonic() - start
+        self._waited += 1
+        self._total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_hold += 0.2 * (time.monotonic() - start - self._avg_hold)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "queue_depth": len(self._waiters),
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "avg_wait_ms": (self._total_wait / self._waited * 1000) if self._waited else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream and lets a single probe test recovery.
+
+    Closed: calls go through; `failure_threshold` consecutive failures open
+    the breaker. Open: `allow()` is False until `reset_timeout` seconds have
+    passed, then the breaker turns half-open. Half-open: one probe call is
+    allowed at a time (another after `reset_timeout` if its outcome is never
+    recorded); success closes the breaker, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, history: int = 20):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.transitions: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.reset()
+
+    def reset(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.successes = 0
+        self.rejected = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self.transitions.clear()
+
+    def _transition(self, state: str, reason: str) -> None:
+        self.transitions.append({"from": self.state, "to": state, "at": time.time(), "reason": reason})
+        self.state = state
+        if state == self.OPEN:
+            self._opened_at = self._clock()
+        self._probe_started = None
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now. Every True must be followed by
+        record_success, record_failure or release."""
+        if self.state == self.CLOSED:
+            return True
+        now = self._clock()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self._transition(self.HALF_OPEN, "reset timeout elapsed")
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            self.rejected += 1
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED, "call succeeded")
+
+    def record_failure(self, reason: str = "") -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN:
+            self._transition(self.OPEN, f"probe failed: {reason}")
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._transition(self.OPEN, f"{self.consecutive_failures} consecutive failures: {reason}")
+
+    def release(self) -> None:
+        """Give back an allowed call that never reached upstream (e.g. it was shed)."""
+        if self.state == self.HALF_OPEN:
+            self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "open_for": (self._clock() - self._opened_at) if self.state != self.CLOSED and self._opened_at is not None else 0.0,
+            "failures": self.failures,
+            "successes": self.successes,
+            "served_degraded": self.rejected,
+            "transitions": list(self.transitions),
+        }
+
+
+class Hedger:
+    """Deadline budgeting and hedged retries for one logical upstream call.
+
+    `run(fn, deadline, attempt_timeout)` calls `fn(timeout)` and returns the
+    first successful result. If that attempt is still running after the
+    `percentile` latency of recent successful attempts (at least `min_delay`),
+    or fails early, one hedge attempt is started; whichever succeeds first wins
+    and the other is cancelled. Each attempt is given the smaller of
+    `attempt_timeout` and the time left before `deadline`, and nothing runs
+    past the deadline.
+
+    Hedges are paid for from a token budget that earns `max_ratio` tokens per
+    call (up to `burst`), so they add at most that fraction of extra upstream
+    calls. `max_ratio` 0 disables hedging; Overloaded failures are never
+    hedged since a second attempt would only add load.
+
+    Attempts still running at the deadline are cancelled and DeadlineExceeded
+    is raised, so their outcome is never seen by `fn`'s own error handling.
+    """
+
+    def __init__(self, percentile: float = 95.0, max_ratio: float = 0.0, min_delay: float = 0.0,
+                 window: int = 500, min_samples: int = 20, burst: float = 5.0):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.burst = burst
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self._tokens = 0.0
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.deadline_exceeded = 0
+
+    def configure(self, percentile: Optional[float] = None, max_ratio: Optional[float] = None,
+                  min_delay: Optional[float] = None) -> None:
+        if percentile is not None:
+            self.percentile = percentile
+        if max_ratio is not None:
+            self.max_ratio = max_ratio
+        if min_delay is not None:
+            self.min_delay = min_delay
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough latencies are known."""
+        if self.max_ratio <= 0 or len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return max(self.min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))])
+
+    def _take_token(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+        self.hedges_skipped += 1
+        return False
+
+    async def run(self, fn: Callable[[float], Awaitable[Any]], deadline: float, attempt_timeout: float,
+                  hedge: bool = True) -> Any:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start + deadline
+        self.calls += 1
+        self._tokens = min(self.burst, self._tokens + self.max_ratio)
+        hedge = hedge and self.max_ratio > 0
+        delay = self.hedge_delay() if hedge else None
+
+        async def attempt():
+            began = loop.time()
+            result = await fn(max(0.0, min(attempt_timeout, end - began)))
+            self.latencies.append(loop.time() - began)
+            return result
+
+        primary = asyncio.ensure_future(attempt())
+        pending = {primary}
+        errors = []
+        try:
+            while pending:
+                now = loop.time()
+                wait = end - now
+                if hedge and delay is not None:
+                    wait = min(wait, start + delay - now)
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, wait), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    errors.append(task.exception())
+                failed_early = bool(errors) and not isinstance(errors[-1], Overloaded)
+                if hedge and (failed_early or (delay is not None and loop.time() >= start + delay)):
+                    hedge = False
+                    if (pending or failed_early) and loop.time() < end and self._take_token():
+                        pending.add(asyncio.ensure_future(attempt()))
+                if pending and loop.time() >= end:
+                    self.deadline_exceeded += 1
+                    raise DeadlineExceeded(f"Model call exceeded the {deadline:g}s deadline")
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_ratio": (self.hedges / self.calls) if self.calls else 0.0,
+            "max_ratio": self.max_ratio,
+            "hedge_delay_ms": delay * 1000 if delay is not None else None,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
@@ -7,7 +7,12 @@ from dotenv import load_dotenv
 import time
 import sys
 import math
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from cache import SQLiteCache
+from judge import Judge
 
 load_dotenv()
 
@@ -20,6 +25,60 @@ EVAL_RETRY_BACKOFF = float(os.getenv("EVAL_RETRY_BACKOFF", "1.5"))
 SKIP_QUALITY = os.getenv("SKIP_QUALITY", "false").lower() in {"1", "true", "yes"}
 EVAL_MODEL = os.getenv("EVAL_MODEL", "gpt-4")  # or gpt-5 variant
 EVAL_RESULTS_PATH = os.getenv("EVAL_RESULTS_PATH", "enhanced_eval_results.json")
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "4"))  # concurrent backend calls
+EVAL_JUDGE_WORKERS = int(os.getenv("EVAL_JUDGE_WORKERS", "4"))  # concurrent quality judge calls
+# Client-side budget matching the backend's per-client limit (RATE_LIMIT_REQUESTS per RATE_LIMIT_WINDOW_MINUTES);
+# 0 disables it, e.g. when the backend limit is raised for the eval client.
+EVAL_RATE_LIMIT_REQUESTS = int(os.getenv("EVAL_RATE_LIMIT_REQUESTS", "10"))
+EVAL_RATE_LIMIT_WINDOW = float(os.getenv("EVAL_RATE_LIMIT_WINDOW", "60"))  # seconds
+EVAL_JUDGE_CACHE_PATH = os.getenv("EVAL_JUDGE_CACHE_PATH", "judge_cache.db")  # empty disables the judge score cache
+EVAL_JUDGE_BATCH_SIZE = int(os.getenv("EVAL_JUDGE_BATCH_SIZE", "0"))  # pairs per judge request; 0 or 1 grades one at a time
+
+judge = Judge(client, EVAL_MODEL)  # the score cache is opened by run_comprehensive_eval, not at import
+
+def open_judge_cache() -> None:
+    """Attach the score cache at EVAL_JUDGE_CACHE_PATH to the judge, once."""
+    if judge.cache is None and EVAL_JUDGE_CACHE_PATH:
+        judge.cache = SQLiteCache(EVAL_JUDGE_CACHE_PATH, busy_timeout=5.0)  # judge threads can afford to wait
+
+class RateBudget:
+    """Blocking client-side token bucket: up to `limit` calls at once, refilled at `limit` per `period` seconds.
+
+    Pacing requests this way keeps the eval under the backend's rate limit
+    instead of hitting 429s and sleeping through retry backoff.
+    """
+
+    def __init__(self, limit: int, period: float, clock=time.monotonic, sleep=time.sleep):
+        self.limit = limit
+        self.period = period
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(limit)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.limit <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(float(self.limit), self._tokens + (now - self._last) * self.limit / self.period)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.period / self.limit
+            self._sleep(wait)
+
+_sessions = threading.local()
+
+def _session() -> requests.Session:
+    """One keep-alive HTTP session per worker thread."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
 
 def wait_for_server(max_retries=None, delay=1):
     """Wait for the server to be ready"""
@@ -60,33 +119,17 @@ def load_samples(path):
     return data["samples"]
 
 def evaluate_translation_quality(original: str, translation: str) -> int:
-    """Use the model to evaluate translation quality (1-5)."""
-    prompt = f"""
-Evaluate this legal translation on a scale of 1-5 ONLY RESPOND WITH THE NUMBER:\n\nOriginal: {original}\nTranslation: {translation}\n\nCriteria:\n1. Accuracy (preserves legal meaning)\n2. Clarity (easy to understand)\n3. Completeness (doesn't omit important details)\n\nRespond with just an integer 1-5.
-"""
-    try:
-        kwargs = {
-            "model": EVAL_MODEL,
-            "messages": [{"role": "user", "content": prompt}],
-        }
-        if EVAL_MODEL.startswith("gpt-5"):
-            kwargs["max_completion_tokens"] = 10
-        else:
-            kwargs["max_tokens"] = 10
-            kwargs["temperature"] = 0
-        resp = client.chat.completions.create(**kwargs)
-        raw = (resp.choices[0].message.content or "").strip()
-        score = int(''.join(ch for ch in raw if ch.isdigit())[:1] or '3')
-        return max(1, min(5, score))
-    except Exception:
-        return 3
-
-def backend_request_with_retries(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Use the model to evaluate translation quality (1-5), reusing cached scores."""
+    return judge.score(original, translation)
+
+def backend_request_with_retries(payload: Dict[str, Any], budget: Optional[RateBudget] = None) -> Dict[str, Any]:
     """POST to backend /simplify with retries & backoff; returns JSON or raises last error."""
     last_err = None
     for attempt in range(1, EVAL_MAX_RETRIES + 1):
         try:
-            r = requests.post(API_URL, json=payload, timeout=EVAL_REQUEST_TIMEOUT)
+            if budget is not None:
+                budget.acquire()
+            r = _session().post(API_URL, json=payload, timeout=EVAL_REQUEST_TIMEOUT)
             r.raise_for_status()
             return r.json()
         except requests.exceptions.RequestException as e:
@@ -99,60 +142,92 @@ def backend_request_with_retries(payload: Dict[str, Any]) -> Dict[str, Any]:
                 break
     raise last_err if last_err else RuntimeError("Unknown request failure")
 
-def run_comprehensive_eval(samples):
-    category_correct = 0
-    quality_scores = []
-    results = []
-    
-    print("Running comprehensive evaluation...\n")
-    
+def _evaluate_sample(sample: Dict[str, Any], budget: Optional[RateBudget]):
+    """Backend call for one sample. Returns (result, whether its translation needs a quality score)."""
+    try:
+        data = backend_request_with_retries({"text": sample["input"]}, budget)
+        predicted_category = data.get("category", "").strip()
+        translation = data.get("response", "").strip()
+    except Exception as e:
+        return {
+            "input": sample["input"],
+            "expected_category": sample["expected_category"],
+            "predicted_category": "",
+            "category_correct": False,
+            "translation": "",
+            "quality_score": None,
+            "error": str(e)
+        }, False
+
+    expected_category = sample["expected_category"].strip()
+    return {
+        "input": sample["input"],
+        "expected_category": expected_category,
+        "predicted_category": predicted_category,
+        "category_correct": predicted_category == expected_category,
+        "translation": translation,
+        "quality_score": None
+    }, not SKIP_QUALITY and expected_category != "Other" and bool(translation)
+
+def run_comprehensive_eval(samples, workers: int = None, judge_workers: int = None, judge_batch_size: int = None):
+    """Evaluate all samples with `workers` backend calls and `judge_workers` judge calls in flight.
+    Results keep the sample order whatever order the calls finish in.
+
+    Judge calls normally start as each translation arrives, overlapping later
+    backend calls. With `judge_batch_size` above 1 they instead run once the
+    backend calls are done, that many pairs per request.
+    """
+    workers = workers or EVAL_WORKERS
+    judge_workers = judge_workers or EVAL_JUDGE_WORKERS
+    judge_batch_size = EVAL_JUDGE_BATCH_SIZE if judge_batch_size is None else judge_batch_size
+    batched = judge_batch_size > 1
+    if not SKIP_QUALITY:
+        open_judge_cache()
+    judge.reset_counters()
+    budget = RateBudget(EVAL_RATE_LIMIT_REQUESTS, EVAL_RATE_LIMIT_WINDOW) if EVAL_RATE_LIMIT_REQUESTS > 0 else None
+
+    print(f"Running comprehensive evaluation ({workers} workers, {judge_workers} judge workers)...\n")
+
     start_time = time.time()
-    for i, sample in enumerate(samples, 1):
-        print(f"[{i}/{len(samples)}] Testing: {sample['input'][:50]}...")
+    done = 0
+    progress_lock = threading.Lock()
+
+    def run_one(sample):
+        nonlocal done
         per_start = time.time()
-        try:
-            data = backend_request_with_retries({"text": sample["input"]})
-            predicted_category = data.get("category", "").strip()
-            translation = data.get("response", "").strip()
-        except Exception as e:
-            print(f"  ❌ API Error after retries: {e}")
-            results.append({
-                "input": sample["input"],
-                "expected_category": sample["expected_category"],
-                "predicted_category": "",
-                "category_correct": False,
-                "translation": "",
-                "quality_score": None,
-                "error": str(e)
-            })
-            continue
-
-        expected_category = sample["expected_category"].strip()
-        category_match = predicted_category == expected_category
-        if category_match:
-            category_correct += 1
-
-        quality_score = None
-        if not SKIP_QUALITY and expected_category != "Other" and translation:
-            quality_score = evaluate_translation_quality(sample["input"], translation)
-            quality_scores.append(quality_score)
-
-        result = {
-            "input": sample["input"],
-            "expected_category": expected_category,
-            "predicted_category": predicted_category,
-            "category_correct": category_match,
-            "translation": translation,
-            "quality_score": quality_score
-        }
-        results.append(result)
+        result, needs_quality = _evaluate_sample(sample, budget)
+        grading = judge_pool.submit(evaluate_translation_quality, sample["input"], result["translation"]) \
+            if needs_quality and not batched else None
+        with progress_lock:
+            done += 1
+            elapsed = time.time() - per_start
+            eta = (time.time() - start_time) / done * (len(samples) - done)
+            if result.get("error"):
+                print(f"[{done}/{len(samples)}] ❌ API Error after retries: {result['error']} | {sample['input'][:50]}...")
+            else:
+                status = "✅" if result["category_correct"] else "❌"
+                print(f"[{done}/{len(samples)}] {status} Expected: {result['expected_category']}, "
+                      f"Got: {result['predicted_category']} | {elapsed:.1f}s (ETA ~{eta:.1f}s) | {sample['input'][:50]}...")
+        return result, needs_quality, grading
+
+    with ThreadPoolExecutor(max_workers=judge_workers) as judge_pool, \
+         ThreadPoolExecutor(max_workers=workers) as backend_pool:
+        outcomes = list(backend_pool.map(run_one, samples))
+        for result, _, grading in outcomes:
+            if grading is not None:
+                result["quality_score"] = grading.result()
+        if batched:
+            pending = [result for result, needs_quality, _ in outcomes if needs_quality]
+            batches = [pending[i:i + judge_batch_size] for i in range(0, len(pending), judge_batch_size)]
+            graded = judge_pool.map(lambda batch: judge.score_batch([(r["input"], r["translation"]) for r in batch]), batches)
+            for batch, scores in zip(batches, graded):
+                for result, score in zip(batch, scores):
+                    result["quality_score"] = score
 
-        status = "✅" if category_match else "❌"
-        quality_str = f" | Quality: {quality_score}/5" if quality_score else ""
-        elapsed = time.time() - per_start
-        avg_so_far = (time.time() - start_time) / i
-        eta = avg_so_far * (len(samples) - i)
-        print(f"  {status} Expected: {expected_category}, Got: {predicted_category}{quality_str} | {elapsed:.1f}s (ETA ~{eta:.1f}s)")
+    results = [result for result, _, _ in outcomes]
+    category_correct = sum(1 for r in results if r["category_correct"])
+    quality_scores = [r["quality_score"] for r in results if r["quality_score"] is not None]
+    print(f"\nFinished {len(samples)} samples in {time.time() - start_time:.1f}s")
 
     print("\n" + "="*60)
     print("EVALUATION RESULTS")
@@ -184,6 +259,12 @@ def run_comprehensive_eval(samples):
         print(f"\nErrors encountered on {len(failures)} samples (kept going). Set EVAL_MAX_RETRIES higher or increase EVAL_REQUEST_TIMEOUT to mitigate timeouts.")
     print("\nConfig used:")
     print(f"  Timeout: {EVAL_REQUEST_TIMEOUT}s | Retries: {EVAL_MAX_RETRIES} | Backoff: {EVAL_RETRY_BACKOFF} | Skip quality: {SKIP_QUALITY} | Eval model: {EVAL_MODEL}")
+    print(f"  Workers: {workers} | Judge workers: {judge_workers} | Rate budget: {EVAL_RATE_LIMIT_REQUESTS}/{EVAL_RATE_LIMIT_WINDOW:g}s")
+    judge_run = judge.stats()
+    if judge_run["scored"] or judge_run["failures"]:
+        print(f"  Judge: {judge_run['scored']} scored, {judge_run['cache_hits']} from cache, "
+              f"{judge_run['requests']} requests ({judge_run['requests_saved']} saved, "
+              f"~{judge_run['tokens_saved_estimate']} tokens saved) | batch size: {judge_batch_size or 1}")
     # Persist results to JSON for CI reuse / parsing
     try:
         summary = {
@@ -193,7 +274,8 @@ def run_comprehensive_eval(samples):
             "average_quality": (sum(quality_scores) / len(quality_scores)) if quality_scores else None,
             "timestamp": time.time(),
             "model": EVAL_MODEL,
-            "skip_quality": SKIP_QUALITY
+            "skip_quality": SKIP_QUALITY,
+            "judge": judge_run
         }
         with open(EVAL_RESULTS_PATH, "w") as f:
             json.dump({"summary": summary, "results": results}, f, indent=2)
@@ -0,0 +1,286 @@
+"""
+In-process evaluation harness: scores category samples by driving the
+/simplify pipeline in main.py directly. It needs no running server, no
+network hop per sample and no wait_for_server polling.
+
+Transports:
+  direct  validate with SimplifyRequest and call resolve_translation (default)
+  asgi    POST /simplify to the FastAPI app through httpx's ASGI transport
+
+Model clients:
+  stub    in-process fake completions (fake_openai_server.StubCompletionClient);
+          measures pipeline speed and the local category rules, not the model
+  replay  recorded responses from MODEL_CASSETTE_DIR (see cassette.py); the run
+          fails with ReplayIncomplete if any sample was not recorded
+  live    the configured OpenAI client
+
+Samples run concurrently, and --synthetic N expands the sample file to N
+distinct inputs. The report includes per-stage timing: validation, local
+rules, cache lookup, model call, parsing and post-processing.
+
+Usage: python eval_harness.py --synthetic 10000 --concurrency 64 [--transport asgi] [--model replay]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List
+
+from category_eval import load_samples, normalize_category
+from segmentation import iter_sentences
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "category_eval_samples.yaml")
+STAGES = ("validate", "local_rules", "cache_lookup", "model_call", "parse", "postprocess")
+_SENTENCE_END_RE = re.compile(r"([.!?][\"')\]”’]*)?$")
+
+
+class ReplayIncomplete(RuntimeError):
+    """A replay run hit requests missing from the cassette, so its accuracy would not be the recorded one."""
+
+
+def _tagged(text: str, i: int) -> str:
+    """`text` with "(ref i)" inside every sentence, before its closing punctuation.
+
+    Every sentence differs from the original, so no clause is ever a cache hit
+    and synthetic inputs take the plain /simplify path rather than clause stitching.
+    """
+    return " ".join(_SENTENCE_END_RE.sub(rf" (ref {i})\1", sentence, count=1) for sentence in iter_sentences(text))
+
+
+def synthetic_samples(samples: List[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
+    """`n` distinct inputs cycled from `samples`, each keeping its sample's expected category and sentence count."""
+    return [
+        {**sample, "input": _tagged(sample["input"], i)}
+        for i, sample in ((i, samples[i % len(samples)]) for i in range(n))
+    ]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0.0
+
+
+class StageTimer:
+    """Wall time per pipeline stage, collected by wrapping the stage functions."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.samples[stage].append(time.perf_counter() - start)
+            return timed_async
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+        return timed
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "calls": len(times),
+                "total_ms": sum(times) * 1000,
+                "avg_ms": sum(times) / len(times) * 1000,
+                "p50_ms": percentile(times, 50) * 1000,
+                "p95_ms": percentile(times, 95) * 1000,
+            }
+            for stage in STAGES + ("request",)
+            for times in [self.samples.get(stage)] if times
+        }
+
+
+@contextmanager
+def instrumented(backend, timer: StageTimer):
+    """Time the pipeline's stage functions for the duration of the block."""
+    targets = {
+        "local_rules": "local_classification",
+        "cache_lookup": "cache_lookup",
+        "model_call": "_call_model",
+        "parse": "_parse_completion",
+        "postprocess": "_postprocess",
+    }
+    originals = {name: getattr(backend, name) for name in targets.values()}
+    try:
+        for stage, name in targets.items():
+            setattr(backend, name, timer.wrap(stage, originals[name]))
+        yield timer
+    finally:
+        for name, fn in originals.items():
+            setattr(backend, name, fn)
+
+
+def _model_client(backend, model: str):
+    if model == "stub":
+        from fake_openai_server import StubCompletionClient
+        return StubCompletionClient()
+    if model == "replay":
+        from cassette import Cassette, CassetteClient
+        return CassetteClient(backend.client, Cassette(backend.MODEL_CASSETTE_DIR), "replay")
+    if model == "live":
+        return backend.client
+    raise ValueError(f"Unknown model client {model!r}; use stub, replay or live")
+
+
+async def _run(backend, samples, transport: str, concurrency: int, timer: StageTimer) -> List[Dict[str, Any]]:
+    sem = asyncio.Semaphore(concurrency)
+    validate = timer.wrap("validate", backend.SimplifyRequest)
+
+    async def direct(text):
+        try:
+            request = validate(text=text)
+        except Exception as e:
+            return {"error": str(e)}
+        return await backend.resolve_translation(request.text)
+
+    async def run_all(send):
+        async def one(sample):
+            async with sem:
+                start = time.perf_counter()
+                try:
+                    return await send(sample["input"])
+                except Exception as e:
+                    return {"error": str(e)}
+                finally:
+                    timer.samples["request"].append(time.perf_counter() - start)
+        return await asyncio.gather(*(one(s) for s in samples))
+
+    if transport == "direct":
+        return await run_all(direct)
+    if transport == "asgi":
+        import httpx
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=backend.app), base_url="http://harness") as http:
+            async def over_asgi(text):
+                r = await http.post("/simplify", json={"text": text})
+                data = r.json()
+                return data if r.status_code == 200 else {"error": str(data.get("detail"))}
+            return await run_all(over_asgi)
+    raise ValueError(f"Unknown transport {transport!r}; use direct or asgi")
+
+
+def run(samples, model: str = "stub", transport: str = "direct", concurrency: int = 64) -> Dict[str, Any]:
+    """Score `samples` in process; returns a report with summary, results and stage timings."""
+    os.environ.setdefault("OPENAI_API_KEY", "offline-eval")
+    import main as backend
+    from unittest import mock
+
+    logger = logging.getLogger("main")
+    level = logger.level
+    logger.setLevel(logging.WARNING)  # one INFO line per sample would dominate the run
+    timer = StageTimer()
+    model_client = _model_client(backend, model)
+    # Stub and replay answers must never reach the shared PERSISTENT_CACHE_PATH database that the server reads.
+    persistent_cache = backend.persistent_cache if model == "live" else None
+    # Clause stitching sends different pieces to the model depending on what is cached; replay needs whole texts.
+    clause_cache = backend.CLAUSE_CACHE_ENABLED and model != "replay"
+    try:
+        with mock.patch.object(backend, "client", model_client), \
+             mock.patch.object(backend, "persistent_cache", persistent_cache), \
+             mock.patch.object(backend, "CLAUSE_CACHE_ENABLED", clause_cache), \
+             mock.patch.object(backend, "check_rate_limit", lambda *a, **kw: True), \
+             instrumented(backend, timer):
+            start = time.perf_counter()
+            responses = asyncio.run(_run(backend, samples, transport, concurrency, timer))
+            elapsed = time.perf_counter() - start
+    finally:
+        logger.setLevel(level)
+
+    results = []
+    for sample, data in zip(samples, responses):
+        expected = sample["expected_category"].strip()
+        predicted = (data.get("category") or "").strip()
+        result = {
+            "input": sample["input"],
+            "expected_category": expected,
+            "predicted_category": predicted,
+            "category_correct": "error" not in data and normalize_category(predicted) == normalize_category(expected),
+            "translation": (data.get("response") or "").strip(),
+            "quality_score": None,
+        }
+        if "error" in data:
+            result["error"] = data["error"]
+        results.append(result)
+
+    if model == "replay":
+        incomplete = [r for r, data in zip(results, responses)
+                      if "error" in data or data.get("parse_confidence") == "degraded"]
+        if incomplete:
+            raise ReplayIncomplete(
+                f"{len(incomplete)} of {len(samples)} samples were not answered from the recording "
+                f"(first: {incomplete[0].get('error', 'degraded answer')}); record them with MODEL_CASSETTE_MODE=record"
+            )
+
+    correct = sum(r["category_correct"] for r in results)
+    return {
+        "summary": {
+            "total_samples": len(samples),
+            "category_correct": correct,
+            "accuracy": correct / len(samples) if samples else 0.0,
+            "errors": sum(1 for r in results if "error" in r),
+            "elapsed_s": elapsed,
+            "samples_per_s": len(samples) / elapsed if elapsed else 0.0,
+            "model": model,
+            "transport": transport,
+            "concurrency": concurrency,
+        },
+        "stages": timer.report(),
+        "results": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    s = report["summary"]
+    print(f"{s['total_samples']} samples via {s['transport']} with {s['model']} model client, "
+          f"concurrency {s['concurrency']}")
+    print(f"Category Accuracy: {s['category_correct']}/{s['total_samples']} ({s['accuracy']:.1%}) | "
+          f"errors: {s['errors']} | {s['elapsed_s']:.2f}s ({s['samples_per_s']:.0f} samples/s)\n")
+    print(f"{'stage':<13} {'calls':>7} {'total':>10} {'avg':>9} {'p50':>9} {'p95':>9}")
+    for stage, t in report["stages"].items():
+        print(f"{stage:<13} {t['calls']:>7} {t['total_ms']:>8.0f}ms {t['avg_ms']:>7.3f}ms "
+              f"{t['p50_ms']:>7.3f}ms {t['p95_ms']:>7.3f}ms")
+    print("\nStage times are wall time under concurrency, so model_call includes admission queueing.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLES_PATH)
+    parser.add_argument("--synthetic", type=int, default=0, help="expand the samples to this many distinct inputs")
+    parser.add_argument("--transport", choices=("direct", "asgi"), default="direct")
+    parser.add_argument("--model", choices=("stub", "replay", "live"), default="stub")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", help="write the report (enhanced_eval_results.json layout plus stages) here")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples)
+    if args.synthetic:
+        samples = synthetic_samples(samples, args.synthetic)
+    try:
+        report = run(samples, args.model, args.transport, args.concurrency)
+    except ReplayIncomplete as e:
+        raise SystemExit(f"Replay incomplete: {e}")
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
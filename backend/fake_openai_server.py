@@ -0,0 +1,204 @@
+"""
+Local stand-in for the OpenAI chat completions API, used by load tests and
+benchmarks so they can run without network access or API spend. A served
+version (FakeCompletionServer) and an in-process one (StubCompletionClient)
+give the same answers.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from openai.types.chat import ChatCompletion
+
+
+def _prefix(body: dict) -> str:
+    """The static part of a request as a provider renders it: tools, then every message before the last."""
+    return json.dumps(body.get("tools", [])) + json.dumps(body.get("messages", [])[:-1])
+
+
+def _usage(body: dict, arguments: str, cached_tokens: int = 0) -> dict:
+    # Roughly four characters per token, which is close enough for accounting tests.
+    prompt_tokens = (len(json.dumps(body.get("messages", []))) + len(json.dumps(body.get("tools", [])))) // 4
+    completion_tokens = max(1, len(arguments) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+
+
+def _arguments(body: dict) -> str:
+    user_text = next(
+        (m.get("content", "") for m in reversed(body.get("messages", [])) if m.get("role") == "user"),
+        "",
+    )
+    return json.dumps({
+        "category": "Other Legal",
+        "plain_english": "In plain terms: " + user_text,
+    })
+
+
+def _completion(body: dict, call: int, arguments: str, cached_tokens: int = 0) -> dict:
+    return {
+        "id": f"chatcmpl-fake-{call}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "tool_calls",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{call}",
+                    "type": "function",
+                    "function": {"name": "classify_legal_area", "arguments": arguments},
+                }],
+            },
+        }],
+        "usage": _usage(body, arguments, cached_tokens),
+    }
+
+
+def _chunk(body: dict, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": "chatcmpl-fake-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def create_app(latency: float = 0.05, chunk_delay: float = 0.01, chunk_size: int = 12,
+               outlier_rate: float = 0.0, outlier_latency: float = 1.0, seed=None) -> FastAPI:
+    """Build a fake /v1/chat/completions app that answers every call with a
+    classify_legal_area tool call after sleeping `latency` seconds.
+
+    A random `outlier_rate` fraction of calls sleeps `outlier_latency` seconds
+    instead, to simulate a slow tail. Streaming requests get their first chunk
+    after that delay and then one `chunk_size`-character argument fragment
+    every `chunk_delay` seconds. Usage is estimated at about four characters
+    per token and, for streams that set `stream_options.include_usage`, sent
+    in a final chunk.
+
+    Prefix caching is emulated too: a call whose model and prefix (tools
+    plus every message before the user's) were seen before reports the
+    prefix's tokens as cached. `state.prefixes` counts calls per (model, prefix hash).
+    """
+    fake = FastAPI()
+    fake.state.latency = latency
+    fake.state.outlier_rate = outlier_rate
+    fake.state.outlier_latency = outlier_latency
+    fake.state.calls = 0
+    fake.state.outliers = 0
+    fake.state.prefixes = Counter()
+    rng = random.Random(seed)
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        fake.state.calls += 1
+        prefix = _prefix(body)
+        key = (body.get("model"), hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        cached_tokens = len(prefix) // 4 if key in fake.state.prefixes else 0
+        fake.state.prefixes[key] += 1
+        if rng.random() < fake.state.outlier_rate:
+            fake.state.outliers += 1
+            await asyncio.sleep(fake.state.outlier_latency)
+        else:
+            await asyncio.sleep(fake.state.latency)
+        arguments = _arguments(body)
+        if body.get("stream"):
+            async def chunks():
+                yield _chunk(body, {"role": "assistant", "tool_calls": [{
+                    "index": 0, "id": f"call_{fake.state.calls}", "type": "function",
+                    "function": {"name": "classify_legal_area", "arguments": ""},
+                }]})
+                for i in range(0, len(arguments), chunk_size):
+                    await asyncio.sleep(chunk_delay)
+                    yield _chunk(body, {"tool_calls": [{"index": 0, "function": {"arguments": arguments[i:i + chunk_size]}}]})
+                yield _chunk(body, {}, finish_reason="tool_calls")
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    usage = {"id": "chatcmpl-fake-stream", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": body.get("model", "fake"), "choices": [], "usage": _usage(body, arguments, cached_tokens)}
+                    yield f"data: {json.dumps(usage)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+        return _completion(body, fake.state.calls, arguments, cached_tokens)
+
+    return fake
+
+
+class FakeCompletionServer:
+    """Runs the fake completion app with uvicorn on a background thread.
+
+    Use as a context manager; `base_url` is ready to pass to an OpenAI client.
+    """
+
+    def __init__(self, latency: float = 0.05, host: str = "127.0.0.1", port: int = 0, **app_options):
+        self.app = create_app(latency, **app_options)
+        self.host = host
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.servers[0].sockets[0].getsockname()[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def calls(self) -> int:
+        return self.app.state.calls
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Fake completion server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+class StubCompletionClient:
+    """In-process stand-in for AsyncOpenAI that gives the fake server's answers
+    without HTTP, for harnesses that push many samples through the pipeline.
+
+    Only non-streaming `chat.completions.create` is supported.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        if kwargs.get("stream"):
+            raise NotImplementedError("StubCompletionClient does not stream")
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatCompletion.model_validate(_completion(kwargs, self.calls, _arguments(kwargs)))
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,179 @@
+"""
+Translation quality judge for the evals: a 1-5 score per (original,
+translation) pair from a judge model, with a persistent score cache and an
+optional batched mode that grades many pairs in one request.
+
+A score is cached under a hash of the judge model, the rubric and the pair,
+so changing any of them re-grades. Calls that fail fall back to a neutral 3,
+which is never cached.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+RUBRIC = (
+    "Criteria:\n1. Accuracy (preserves legal meaning)\n2. Clarity (easy to understand)\n"
+    "3. Completeness (doesn't omit important details)"
+)
+RUBRIC_SHA = hashlib.sha256(RUBRIC.encode("utf-8")).hexdigest()
+FALLBACK_SCORE = 3
+
+_BATCH_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "judge_scores",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "scores": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {"id": {"type": "integer"}, "score": {"type": "integer"}},
+                        "required": ["id", "score"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["scores"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def score_key(model: str, original: str, translation: str) -> str:
+    material = "\x00".join(("judge", model, RUBRIC_SHA, original, translation))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _clamp(score: int) -> int:
+    return max(1, min(5, score))
+
+
+class Judge:
+    """Scores translations with `model` through a synchronous OpenAI client.
+
+    `cache` is any store with get/set (e.g. cache.SQLiteCache); None disables
+    caching. Safe to call from several threads.
+    """
+
+    def __init__(self, client, model: str, cache=None):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self) -> None:
+        self.cache_hits = 0
+        self.graded = 0
+        self.requests = 0
+        self.failures = 0
+        self.tokens = 0
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for name, n in deltas.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def _limits(self, max_tokens: int) -> Dict[str, Any]:
+        if self.model.startswith("gpt-5"):
+            return {"max_completion_tokens": max_tokens}
+        return {"max_tokens": max_tokens, "temperature": 0}
+
+    def _create(self, **kwargs):
+        resp = self.client.chat.completions.create(model=self.model, **kwargs)
+        total = getattr(getattr(resp, "usage", None), "total_tokens", None)
+        self._count(requests=1, tokens=total if isinstance(total, int) else 0)
+        return resp
+
+    def cached(self, original: str, translation: str) -> Optional[int]:
+        if self.cache is None:
+            return None
+        score = self.cache.get(score_key(self.model, original, translation))
+        if score is not None:
+            self._count(cache_hits=1)
+        return score
+
+    def _store(self, original: str, translation: str, score: int) -> None:
+        self._count(graded=1)
+        if self.cache is not None:
+            self.cache.set(score_key(self.model, original, translation), score)
+
+    def score(self, original: str, translation: str) -> int:
+        """Score one pair, from the cache if it was graded before."""
+        cached = self.cached(original, translation)
+        if cached is not None:
+            return cached
+        prompt = f"""
+Evaluate this legal translation on a scale of 1-5 ONLY RESPOND WITH THE NUMBER:\n\nOriginal: {original}\nTranslation: {translation}\n\n{RUBRIC}\n\nRespond with just an integer 1-5.
+"""
+        try:
+            resp = self._create(messages=[{"role": "user", "content": prompt}], **self._limits(10))
+            raw = (resp.choices[0].message.content or "").strip()
+            digits = "".join(ch for ch in raw if ch.isdigit())[:1]
+        except Exception:
+            digits = ""
+        if not digits:
+            self._count(failures=1)
+            return FALLBACK_SCORE
+        score = _clamp(int(digits))
+        self._store(original, translation, score)
+        return score
+
+    def score_batch(self, pairs: Sequence[Tuple[str, str]]) -> List[int]:
+        """Score several pairs in one request with structured output.
+
+        Cached pairs are skipped, and pairs the response leaves out are graded
+        one by one.
+        """
+        scores: List[Optional[int]] = [self.cached(o, t) for o, t in pairs]
+        pending = [i for i, s in enumerate(scores) if s is None]
+        if len(pending) == 1:
+            scores[pending[0]] = self.score(*pairs[pending[0]])
+            pending = []
+        if pending:
+            items = "\n\n".join(
+                f"[{n}]\nOriginal: {pairs[i][0]}\nTranslation: {pairs[i][1]}" for n, i in enumerate(pending)
+            )
+            prompt = (
+                "Evaluate each legal translation below on a scale of 1-5.\n\n"
+                f"{RUBRIC}\n\n{items}\n\n"
+                "Return one integer score 1-5 per item, using the item's number as its id."
+            )
+            try:
+                resp = self._create(
+                    messages=[{"role": "user", "content": prompt}],
+                    response_format=_BATCH_SCHEMA,
+                    **self._limits(20 * len(pending) + 50),
+                )
+                returned = {int(s["id"]): int(s["score"]) for s in json.loads(resp.choices[0].message.content)["scores"]}
+            except Exception:
+                returned = {}
+            for n, i in enumerate(pending):
+                if n in returned:
+                    scores[i] = _clamp(returned[n])
+                    self._store(*pairs[i], scores[i])
+                else:
+                    scores[i] = self.score(*pairs[i])
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        # Without cache or batching every scored pair would have cost one request.
+        scored = self.cache_hits + self.graded
+        tokens_per_pair = self.tokens / self.graded if self.graded else 0.0
+        return {
+            "model": self.model,
+            "scored": scored,
+            "cache_hits": self.cache_hits,
+            "graded": self.graded,
+            "requests": self.requests,
+            "failures": self.failures,
+            "tokens": self.tokens,
+            "requests_saved": max(0, scored + self.failures - self.requests),
+            "tokens_saved_estimate": round(self.cache_hits * tokens_per_pair),
+        }
@@ -0,0 +1,76 @@
+"""
+Load test for /simplify against a local fake completion server.
+
+Shows how throughput grows with concurrency now that the model call is
+asynchronous and shares a pooled HTTP client. Requests shed by admission
+control (503) are counted separately; p99 is over the successful ones.
+
+Usage: python load_test.py --latency 0.5 --requests 200 --concurrency 1,8,32,64
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from fake_openai_server import FakeCompletionServer
+
+
+async def run_level(app, concurrency: int, total: int):
+    """Send `total` requests with at most `concurrency` in flight; return (successful requests/second, shed, p99 seconds)."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    shed = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as http:
+        async def one(i):
+            nonlocal shed
+            async with sem:
+                sent = time.perf_counter()
+                r = await http.post("/simplify", json={"text": f"The lessee shall remit payment number {i} of batch {concurrency} prior to the due date."})
+                if r.status_code == 503:
+                    shed += 1
+                    return
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - sent)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+    return len(latencies) / elapsed, shed, p99
+
+
+async def run_levels(app, levels, total: int):
+    # One event loop for every level: the pooled upstream client is bound to it.
+    baseline = None
+    for level in levels:
+        rps, shed, p99 = await run_level(app, level, total)
+        baseline = baseline or rps
+        print(f"{level:>12} {rps:>10.1f} {rps / baseline:>8.1f}x {shed:>6} {p99:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model latency in seconds")
+    parser.add_argument("--requests", type=int, default=128, help="requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated concurrency levels")
+    args = parser.parse_args()
+
+    with FakeCompletionServer(latency=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "load-test")
+        import main as backend
+        backend.check_rate_limit = lambda *a, **kw: True  # measure the model path, not the limiter
+
+        print(f"Fake model latency: {args.latency:.2f}s | requests per level: {args.requests}")
+        print(f"{'concurrency':>12} {'req/s':>10} {'speedup':>9} {'shed':>6} {'p99':>9}")
+        levels = [int(c) for c in args.concurrency.split(",")]
+        asyncio.run(run_levels(backend.app, levels, args.requests))
+
+
+if __name__ == "__main__":
+    main()
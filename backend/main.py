@@ -1,16 +1,35 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi import HTTPException
-from pydantic import BaseModel, Field, field_validator
-from openai import OpenAI
-from jinja2 import Environment, FileSystemLoader
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import httpx
 import os
 from dotenv import load_dotenv
 import logging
 import json
 import re
 import time
+import hashlib
+import hmac
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional
 from collections import defaultdict
+from contextlib import asynccontextmanager
+from cache import SQLiteCache, TTLCache
+from concurrency import AdmissionController, CircuitBreaker, DeadlineExceeded, Hedger, Overloaded, SingleFlight
+from streaming import ToolArgsStream, sse_event
+from segmentation import iter_chunks, iter_sentences
+from terms import TermMatcher
+from ratelimit import SQLiteRateLimiter, TokenBucketLimiter
+from rewrite import load_rules
+from routing import RoutingStats, weak_reasons
+from prompt_store import PromptStore
+from usage import TokenUsage
+from request_builder import RequestBuilder
+from cassette import MODES as CASSETTE_MODES, Cassette, CassetteClient, CassetteMiss
 
 tools = [
     {
@@ -55,14 +74,64 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))  # seconds per model call
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))  # shared upstream pool size
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+# record: save every model response under MODEL_CASSETTE_DIR; replay: answer only from those recordings, offline.
+MODEL_CASSETTE_MODE = os.getenv("MODEL_CASSETTE_MODE", "off").lower()
+MODEL_CASSETTE_DIR = os.getenv("MODEL_CASSETTE_DIR", os.path.join(os.path.dirname(__file__), "cassettes"))
+if MODEL_CASSETTE_MODE not in CASSETTE_MODES:
+    raise ValueError(f"MODEL_CASSETTE_MODE must be one of {', '.join(CASSETTE_MODES)}")
+
+client = AsyncOpenAI(
+    # Replay never calls the API, so it needs no real key.
+    api_key=os.getenv("OPENAI_API_KEY") or ("cassette-replay" if MODEL_CASSETTE_MODE == "replay" else None),
+    timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    ),
+)
+
+cassette = None
+if MODEL_CASSETTE_MODE != "off":
+    cassette = Cassette(MODEL_CASSETTE_DIR)
+    client = CassetteClient(client, cassette, MODEL_CASSETTE_MODE)
+    logger.info(f"Model cassette in {MODEL_CASSETTE_MODE} mode at {MODEL_CASSETTE_DIR}")
 
 MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-5")
 logger.info(f"Using OpenAI model: {MODEL_NAME}")
+# Optional fast tier: tried first, with escalation to MODEL_NAME only when its answer is weak.
+FAST_MODEL_NAME = os.getenv("FAST_MODEL", "")  # e.g. gpt-5-mini; empty sends everything to MODEL_NAME
+FAST_MODEL_MAX_TOKENS = int(os.getenv("FAST_MODEL_MAX_TOKENS", "500"))
+if FAST_MODEL_NAME:
+    logger.info(f"Routing through fast model {FAST_MODEL_NAME} first")
 
 PROMPT_TEMPLATE = os.getenv("PROMPT_TEMPLATE", "legal_assistant_v5.txt")
+PROMPT_WATCH_INTERVAL = float(os.getenv("PROMPT_WATCH_INTERVAL", "2"))  # seconds between prompts/ checks; 0 disables hot reload
+prompt_store = PromptStore(os.path.join(os.path.dirname(__file__), "prompts"), PROMPT_TEMPLATE, "legal_assistant_v4.txt")
+logger.info(f"Using system prompt {prompt_store.current.version}")
+PROMPT_CACHE_KEY_ENABLED = os.getenv("PROMPT_CACHE_KEY_ENABLED", "false").lower() in {"1", "true", "yes"}  # send prompt_cache_key (OpenAI only)
+request_builder = RequestBuilder(
+    tools, {"type": "function", "function": {"name": "classify_legal_area"}}, cache_key=PROMPT_CACHE_KEY_ENABLED
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = asyncio.create_task(prompt_store.watch(PROMPT_WATCH_INTERVAL)) if PROMPT_WATCH_INTERVAL > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await client.close()
+    if persistent_cache is not None:
+        persistent_cache.close()
+    rate_limiter.close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 frontend_origin = os.getenv("FRONTEND_ORIGIN")
 origins = ["http://localhost:3000"]
@@ -77,9 +146,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-prompt_env = Environment(loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), "prompts")))
+RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "10"))  # per client per window
+RATE_LIMIT_WINDOW_MINUTES = float(os.getenv("RATE_LIMIT_WINDOW_MINUTES", "1"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))  # clients tracked at once
+# Render sets RENDER=true and terminates TLS in a proxy, so every request arrives from the proxy's address there.
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "true" if os.getenv("RENDER") else "false").lower() in {"1", "true", "yes"}
+RATE_LIMIT_PROXY_HOPS = max(1, int(os.getenv("RATE_LIMIT_PROXY_HOPS", "1")))  # trusted proxies appending to X-Forwarded-For
+RATE_LIMIT_API_KEYS = {k.strip() for k in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if k.strip()}  # keys that get their own bucket
+RATE_LIMIT_BUSY_TIMEOUT = float(os.getenv("RATE_LIMIT_BUSY_TIMEOUT", "0.05"))  # seconds a check may wait on a locked file before allowing
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "")  # e.g. rate_limit.db to share limits across workers; empty keeps them per process
+if RATE_LIMIT_DB_PATH:
+    rate_limiter = SQLiteRateLimiter(RATE_LIMIT_DB_PATH, RATE_LIMIT_WINDOW_MINUTES * 60, RATE_LIMIT_MAX_KEYS,
+                                     busy_timeout=RATE_LIMIT_BUSY_TIMEOUT)
+else:
+    rate_limiter = TokenBucketLimiter(RATE_LIMIT_WINDOW_MINUTES * 60, RATE_LIMIT_MAX_KEYS)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))  # 0 disables the cache
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # seconds
+response_cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+PERSISTENT_CACHE_PATH = os.getenv("PERSISTENT_CACHE_PATH", "")  # e.g. translation_cache.db; empty disables
+PERSISTENT_CACHE_MAX_ENTRIES = int(os.getenv("PERSISTENT_CACHE_MAX_ENTRIES", "100000"))
+PERSISTENT_CACHE_BUSY_TIMEOUT = float(os.getenv("PERSISTENT_CACHE_BUSY_TIMEOUT", "0.05"))  # seconds the event loop may block on a locked file
+persistent_cache = SQLiteCache(PERSISTENT_CACHE_PATH, PERSISTENT_CACHE_MAX_ENTRIES, busy_timeout=PERSISTENT_CACHE_BUSY_TIMEOUT) if PERSISTENT_CACHE_PATH else None
+
+# Identical texts arriving together share one model call.
+inflight = SingleFlight()
+
+# Upstream model calls beyond UPSTREAM_MAX_INFLIGHT wait in a bounded queue; the rest get a 503.
+UPSTREAM_MAX_INFLIGHT = int(os.getenv("UPSTREAM_MAX_INFLIGHT", "32"))
+UPSTREAM_MAX_QUEUE = int(os.getenv("UPSTREAM_MAX_QUEUE", "64"))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "10"))  # seconds a request may wait for a slot
+admission = AdmissionController(UPSTREAM_MAX_INFLIGHT, UPSTREAM_MAX_QUEUE, UPSTREAM_QUEUE_TIMEOUT)
+# After CIRCUIT_FAILURE_THRESHOLD consecutive model call failures, answer from the local
+# rules (parse_confidence "degraded") and probe upstream every CIRCUIT_RESET_TIMEOUT seconds.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+# Deadline budget for one model call, including any hedge. With HEDGE_MAX_RATIO > 0, a second
+# attempt starts once the first runs past the HEDGE_PERCENTILE latency of recent calls.
+MODEL_DEADLINE = float(os.getenv("MODEL_DEADLINE", "60"))  # seconds
+MODEL_ATTEMPT_TIMEOUT = float(os.getenv("MODEL_ATTEMPT_TIMEOUT", "60"))  # seconds per attempt
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0"))  # extra calls as a fraction of calls; 0 disables hedging
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.25"))  # seconds
+hedger = Hedger(HEDGE_PERCENTILE, HEDGE_MAX_RATIO, HEDGE_MIN_DELAY)
+routing_stats = RoutingStats()
+token_usage = TokenUsage()
 
-request_timestamps = defaultdict(list)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # enables the /admin endpoints; empty disables them
+
+# Multi-sentence texts reuse cached translations of their individual clauses.
+# Off by default with a cassette: which pieces reach the model would depend on what happens to be cached,
+# so a replay could ask for texts the recording never saw.
+CLAUSE_CACHE_ENABLED = os.getenv("CLAUSE_CACHE_ENABLED", "true" if MODEL_CASSETTE_MODE == "off" else "false").lower() in {"1", "true", "yes"}
+clause_stats = {"lookups": 0, "lookup_hits": 0, "stitched_requests": 0, "clauses": 0, "clauses_from_cache": 0}
+
+# Inputs with no more legal signals than this are answered Non-Legal without a model call.
+# -1 (default) disables the fast path. The signal list misses everyday contract wording ("Rent is due on the
+# first day of each month."), so only enable it after checking precision on your own traffic.
+LOCAL_CLASSIFIER_THRESHOLD = int(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "-1"))
+fast_path_stats = {"answered_locally": 0}
 
 _LEGAL_SIGNAL_WORDS = {
     "hereby","whereas","agreement","contract","party","indemnify","hold harmless","trust","will","testament","estate",
@@ -98,133 +226,202 @@ _CATEGORY_TERMS = {
     "Personal Injury": {"negligence", "duty of care", "damages", "car accident", "injuries", "plaintiff seeks", "injury"},
 }
 
-def adjust_category(legal_text: str, category: str) -> str:
+# Extra formal/legal vocabulary consulted only by the local fast path, so that
+# clauses like "The tenant must pay by the 5th" are never answered locally.
+_FORMAL_LEGAL_MARKERS = {
+    "shall", "hereby", "herein", "hereof", "hereto", "thereof", "therein", "whereof", "pursuant", "notwithstanding",
+    "lessee", "lessor", "tenant", "landlord", "lease", "covenant", "clause", "provision", "obligation", "liable",
+    "attorney", "court", "jurisdiction", "breach", "damages", "indemnif", "arbitration", "lawsuit", "legal",
+    "license", "copyright", "rights", "heirs", "bequeath", "executor", "guardian", "alimony", "felony", "misdemeanor",
+}
+_FAST_PATH_SIGNALS = frozenset(
+    _LEGAL_SIGNAL_WORDS | _ESTATE_TERMS | _FORMAL_LEGAL_MARKERS | set().union(*_CATEGORY_TERMS.values())
+)
+
+_PI_DAMAGE_TERMS = frozenset({"damages", "injury", "injuries", "duty of care", "negligence"})
+_STRONG_CRIMINAL_MARKERS = frozenset({"search warrant", "probable cause", "fourth amendment", "remain silent", "attorney present", "criminal prosecution", "incriminating"})
+_WILL_TERMS = frozenset({"bequeath", "codicil", "last will", "testament"})
+_STRONG_ESTATE_TERMS = frozenset({"bequeath", "codicil", "last will", "upon my death", "trustee", "testament"})
+_ESTATE_OVERRIDE_TERMS = frozenset({"bequeath", "last will", "codicil", "upon my death", "testament"})
+_CATEGORY_TERM_SETS = {cat: frozenset(terms) for cat, terms in _CATEGORY_TERMS.items()}
+_CRIMINAL_TERMS_EXCEPT_DEFENDANT = _CATEGORY_TERM_SETS["Criminal Procedure"] - {"defendant"}
+
+# Every trigger term above, compiled once so a text is scanned a single time.
+_TERM_MATCHER = TermMatcher(
+    _FAST_PATH_SIGNALS | _PI_DAMAGE_TERMS | _STRONG_CRIMINAL_MARKERS | _STRONG_ESTATE_TERMS
+    | {"plaintiff", "agreement", "trust", "upon my death"}
+)
+
+def find_terms(text: str) -> frozenset:
+    """All trigger terms occurring (as substrings) in the lowered text, in one pass."""
+    return _TERM_MATCHER.find(text.lower())
+
+class TextAnalysis:
+    """Derived forms of one input text, shared by every step that handles it.
+
+    The lowered text, tokens and word count are computed on construction; the
+    normalized form, alphanumeric words and term hits on first use.
+    """
+    __slots__ = ("text", "lowered", "tokens", "word_count", "_normalized", "_alnum", "_found")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lowered = text.lower()
+        self.tokens = text.split()
+        self.word_count = len(self.tokens)
+        self._normalized = self._alnum = self._found = None
+
+    @property
+    def normalized(self) -> str:
+        """Lowered with whitespace runs collapsed (the cache key form)."""
+        if self._normalized is None:
+            self._normalized = " ".join(self.tokens).lower()
+        return self._normalized
+
+    @property
+    def alnum(self) -> str:
+        """Lowered with every run of non-alphanumerics collapsed to one space."""
+        if self._alnum is None:
+            self._alnum = _NON_ALNUM_RE.sub(" ", self.lowered).strip()
+        return self._alnum
+
+    @property
+    def found(self) -> frozenset:
+        """find_terms result for the text."""
+        if self._found is None:
+            self._found = _TERM_MATCHER.find(self.lowered)
+        return self._found
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+def category_hits(found: frozenset) -> dict:
+    """Per-category trigger term counts for a find_terms result."""
+    return _TERM_MATCHER.counts(found, _CATEGORY_TERM_SETS)
+
+def adjust_category(legal_text: str, category: str, found: frozenset = None) -> str:
     """If the model returned Other Legal or Non-Legal but clear trigger terms exist, promote to specific category.
     Protect Contract vs Estate overlap: presence of 'agreement' or 'indemnify' keeps Contract even if 'heirs' appears.
+    Pass `found` (from find_terms) to reuse an earlier scan of the text.
     """
-    lowered = legal_text.lower()
+    if found is None:
+        found = find_terms(legal_text)
     if category != "Personal Injury":
-        if "plaintiff" in lowered and (
-            "damages" in lowered or "injury" in lowered or "injuries" in lowered or "duty of care" in lowered or "negligence" in lowered
-        ):
-            strong_criminal_markers = ["search warrant", "probable cause", "fourth amendment", "remain silent", "attorney present", "criminal prosecution", "incriminating"]
-            if not any(m in lowered for m in strong_criminal_markers):
+        if "plaintiff" in found and found & _PI_DAMAGE_TERMS:
+            if not found & _STRONG_CRIMINAL_MARKERS:
                 return "Personal Injury"
     if category in ("Other Legal", "Non-Legal"):
-        if any(t in lowered for t in _ESTATE_TERMS):
-            if "agreement" in lowered and not any(w in lowered for w in ("bequeath", "codicil", "last will", "testament")) and "upon my death" not in lowered:
+        if found & _ESTATE_TERMS:
+            if "agreement" in found and not found & _WILL_TERMS and "upon my death" not in found:
                 return "Contract"
             return "Wills, Trusts, and Estates"
-        if any(t in lowered for t in _CATEGORY_TERMS["Contract"]):
+        hits = category_hits(found)
+        if hits["Contract"]:
             return "Contract"
-        for cat, terms in _CATEGORY_TERMS.items():
+        for cat in _CATEGORY_TERMS:
             if cat == "Contract":
                 continue
-            if any(t in lowered for t in terms):
+            if hits[cat]:
                 return cat
     if category == "Wills, Trusts, and Estates":
-        has_agreement = "agreement" in lowered
-        strong_estate = any(w in lowered for w in ("bequeath", "codicil", "last will", "upon my death", "trustee", "testament"))
-        if has_agreement and not strong_estate and "trust" not in lowered:
+        has_agreement = "agreement" in found
+        strong_estate = bool(found & _STRONG_ESTATE_TERMS)
+        if has_agreement and not strong_estate and "trust" not in found:
             return "Contract"
-        real_estate_terms = _CATEGORY_TERMS.get("Real Estate", set())
-        if not strong_estate and sum(1 for t in real_estate_terms if t in lowered) >= 2:
+        if not strong_estate and len(found & _CATEGORY_TERM_SETS["Real Estate"]) >= 2:
             return "Real Estate"
     if category == "Criminal Procedure":
-        injury_terms = _CATEGORY_TERMS.get("Personal Injury", set())
-        pi_hits = sum(1 for t in injury_terms if t in lowered)
-        criminal_terms = {t for t in _CATEGORY_TERMS.get("Criminal Procedure", set()) if t != "defendant"}
-        has_strong_criminal = any(t in lowered for t in criminal_terms)
+        pi_hits = len(found & _CATEGORY_TERM_SETS["Personal Injury"])
+        has_strong_criminal = bool(found & _CRIMINAL_TERMS_EXCEPT_DEFENDANT)
         if pi_hits >= 1 and not has_strong_criminal:
             return "Personal Injury"
     if category == "Real Estate":
-        real_estate_terms = _CATEGORY_TERMS.get("Real Estate", set())
-        re_hits = sum(1 for t in real_estate_terms if t in lowered)
-        strong_estate = any(w in lowered for w in ("bequeath", "codicil", "last will", "upon my death", "trustee", "testament"))
+        re_hits = len(found & _CATEGORY_TERM_SETS["Real Estate"])
+        strong_estate = bool(found & _STRONG_ESTATE_TERMS)
         if strong_estate and re_hits == 0:
             return "Wills, Trusts, and Estates"
-        if "bequeath" in lowered:
+        if "bequeath" in found:
             return "Wills, Trusts, and Estates"
     if category not in ("Wills, Trusts, and Estates"):
-        if any(w in lowered for w in ("bequeath", "last will", "codicil", "upon my death", "testament")):
-            if not ("agreement" in lowered and not any(w in lowered for w in ("bequeath", "codicil", "last will", "upon my death", "testament"))):
-                return "Wills, Trusts, and Estates"
+        if found & _ESTATE_OVERRIDE_TERMS:
+            return "Wills, Trusts, and Estates"
     return category
 
-def _is_likely_legal(text: str) -> bool:
-    t = text.lower()
-    return any(w in t for w in _LEGAL_SIGNAL_WORDS)
+def _is_likely_legal(text: str, found: frozenset = None) -> bool:
+    if found is None:
+        found = find_terms(text)
+    return bool(found & _LEGAL_SIGNAL_WORDS)
+
+NON_LEGAL_RESPONSE = "This isn't legal language; there's nothing to translate."
+
+def legal_signal_count(text: str, found: frozenset = None) -> int:
+    """Number of distinct legal terms (from every term set above) appearing in the text."""
+    if found is None:
+        found = find_terms(text)
+    return len(found & _FAST_PATH_SIGNALS)
+
+def local_classification(legal_text: str, threshold: int = None, analysis: TextAnalysis = None):
+    """Answer confidently non-legal input without a model call.
+
+    Returns a /simplify payload when the text has at most `threshold` legal
+    signals (LOCAL_CLASSIFIER_THRESHOLD by default; -1 disables), else None.
+    """
+    threshold = LOCAL_CLASSIFIER_THRESHOLD if threshold is None else threshold
+    if threshold < 0:
+        return None
+    analysis = analysis or TextAnalysis(legal_text)
+    if legal_signal_count(legal_text, analysis.found) > threshold:
+        return None
+    word_count = analysis.word_count
+    return {
+        "response": NON_LEGAL_RESPONSE,
+        "category": "Non-Legal",
+        "confidence": "high" if word_count > 10 else "medium",
+        "word_count": word_count,
+        "parse_confidence": "local",
+    }
+
+REWRITE_RULES_PATH = os.getenv("REWRITE_RULES_PATH", os.path.join(os.path.dirname(__file__), "rewrite_rules.yaml"))
+_REWRITES = load_rules(REWRITE_RULES_PATH)
+_WHITESPACE_RE = re.compile(r"\s+")
+_THE_THE_RE = re.compile(r"\bthe the\b", re.IGNORECASE)
 
-def create_basic_translation(text: str) -> str:
+def create_basic_translation(text: str, analysis: TextAnalysis = None) -> str:
     """Fallback simplification without adding explanatory prefixes.
     Applies light, safe substitutions to reduce archaic or formal legal phrasing.
     Ensures output differs from input when possible.
     """
     original = text
-    simplified = original
-    replacements = [
-        (r"\bshall\b", "will"),
-        (r"\bhereby\b", ""),
-        (r"\bthereof\b", "of it"),
-        (r"\bherein\b", "here"),
-        (r"\bwhereas\b", "because"),
-        (r"\baforementioned\b", "earlier mentioned"),
-        (r"\bparty of the first part\b", "first party"),
-        (r"\bparty of the second part\b", "second party"),
-        (r"\bupon my death\b", "when I die"),
-        (r"\bremaining assets\b", "what's left"),
-        (r"\bdistribute\b", "give"),
-        (r"\bany and all\b", "all"),
-        (r"\bincluding but not limited to\b", "including"),
-        (r"\bprior to\b", "before"),
-        (r"\bsubsequent to\b", "after"),
-    ]
-    for pattern, repl in replacements:
-        try:
-            simplified = re.sub(pattern, repl, simplified, flags=re.IGNORECASE)
-        except re.error:
-            continue
-    simplified = re.sub(r"\s+", " ", simplified).strip()
-    if simplified.lower() == original.lower():
-        temp = re.sub(r"\bthe the\b", "the", simplified, flags=re.IGNORECASE)
-        if temp.lower() != original.lower():
+    lowered = analysis.lowered if analysis is not None else original.lower()
+    simplified = _REWRITES["basic_translation"].apply(original)
+    simplified = _WHITESPACE_RE.sub(" ", simplified).strip()
+    if simplified.lower() == lowered:
+        temp = _THE_THE_RE.sub("the", simplified)
+        if temp.lower() != lowered:
             simplified = temp
     return simplified
 
-def ensure_meaningful_simplification(original: str, translated: str, category: str) -> str:
+def ensure_meaningful_simplification(original: str, translated: str, category: str, analysis: TextAnalysis = None) -> str:
     """If the model output basically echoes the original (especially for Personal Injury), apply targeted rephrasing.
     Keeps meaning but uses more everyday phrasing.
     Only triggers if normalized strings match or differ trivially.
     """
-    norm_orig = re.sub(r"[^a-z0-9]+", " ", original.lower()).strip()
-    norm_trans = re.sub(r"[^a-z0-9]+", " ", translated.lower()).strip()
-    if category == "Personal Injury" and (norm_orig == norm_trans or len(set(norm_orig.split()) ^ set(norm_trans.split())) <= 2):
-        simplified = translated
-        replacements = [
-            (r"\bdefendant\b", "the other party"),
-            (r"\bplaintiff\b", "the injured person"),
-            (r"\bbreached the duty of care owed to\b", "failed to act with reasonable care toward"),
-            (r"\bbreached\b", "failed to meet"),
-            (r"\bduty of care\b", "responsibility to act carefully"),
-            (r"\bresulting in compensable damages\b", "causing harm the injured person can seek money for"),
-            (r"\bcompensable damages\b", "harm they can recover money for"),
-            (r"\bseeks damages\b", "is asking for money"),
-            (r"\binjuries sustained\b", "injuries suffered"),
-            (r"\bnegligence\b", "carelessness"),
-        ]
-        for pattern, repl in replacements:
-            try:
-                simplified = re.sub(pattern, repl, simplified, flags=re.IGNORECASE)
-            except re.error:
-                continue
-        simplified = re.sub(r"\s+", " ", simplified).strip()
-        if simplified.lower() == original.lower():
+    if category != "Personal Injury":
+        return translated
+    analysis = analysis or TextAnalysis(original)
+    norm_orig = analysis.alnum
+    norm_trans = _NON_ALNUM_RE.sub(" ", translated.lower()).strip()
+    if norm_orig == norm_trans or len(set(norm_orig.split()) ^ set(norm_trans.split())) <= 2:
+        simplified = _REWRITES["personal_injury"].apply(translated)
+        simplified = _WHITESPACE_RE.sub(" ", simplified).strip()
+        if simplified.lower() == analysis.lowered:
             simplified = simplified + " (stating the other party failed to use proper care and caused recoverable harm)"
         return simplified.strip()
     return translated
 
+SIMPLIFY_MAX_CHARS = 2000
+
 class SimplifyRequest(BaseModel):
-    text: str = Field(..., min_length=1, max_length=2000, description="Legal text to translate")
+    text: str = Field(..., min_length=1, max_length=SIMPLIFY_MAX_CHARS, description="Legal text to translate")
     
     @field_validator('text')
     @classmethod
@@ -236,165 +433,609 @@ class SimplifyRequest(BaseModel):
             raise ValueError('Input too short - please provide substantial legal text')
         return v.strip()
 
-def check_rate_limit(client_ip: str, max_requests: int = 10, window_minutes: int = 1) -> bool:
-    """Simple rate limiting: max_requests per window_minutes"""
-    now = time.time()
-    window_start = now - (window_minutes * 60)
-    
-    request_timestamps[client_ip] = [
-        timestamp for timestamp in request_timestamps[client_ip] 
-        if timestamp > window_start
-    ]
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # model calls in flight per batch
 
-    if len(request_timestamps[client_ip]) >= max_requests:
-        return False
-    
-    request_timestamps[client_ip].append(now)
-    return True
+class SimplifyBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="Legal texts to translate")
+
+DOCUMENT_MAX_CHARS = int(os.getenv("DOCUMENT_MAX_CHARS", "500000"))
+DOCUMENT_CHUNK_CHARS = int(os.getenv("DOCUMENT_CHUNK_CHARS", "1200"))
+DOCUMENT_CONCURRENCY = int(os.getenv("DOCUMENT_CONCURRENCY", "16"))  # model calls in flight per document
+if not 0 < DOCUMENT_CHUNK_CHARS <= SIMPLIFY_MAX_CHARS:
+    raise ValueError(f"DOCUMENT_CHUNK_CHARS must be between 1 and {SIMPLIFY_MAX_CHARS} (the /simplify limit)")
+
+class SimplifyDocumentRequest(SimplifyRequest):
+    text: str = Field(..., min_length=1, max_length=DOCUMENT_MAX_CHARS, description="Legal document to translate")
+
+def check_rate_limit(client_id: str, max_requests: int = None, window_minutes: float = None, cost: int = 1) -> bool:
+    """Token-bucket rate limiting: bursts of up to max_requests, refilled at max_requests per window_minutes
+    (RATE_LIMIT_REQUESTS per RATE_LIMIT_WINDOW_MINUTES by default). A request that can make several model
+    calls costs one token per call."""
+    max_requests = RATE_LIMIT_REQUESTS if max_requests is None else max_requests
+    window_minutes = RATE_LIMIT_WINDOW_MINUTES if window_minutes is None else window_minutes
+    return rate_limiter.hit(client_id, max_requests, window_minutes * 60, now=time.time(), cost=cost)
+
+def charge_rate_limit(http_request: Request, cost: int, unit: str) -> None:
+    """Charge a multi-call request `cost` tokens up front; 413 if it can never fit the limit, 429 if not now."""
+    if cost > RATE_LIMIT_REQUESTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Request needs {cost} {unit}s of rate limit but at most {RATE_LIMIT_REQUESTS} are allowed "
+                   f"per {RATE_LIMIT_WINDOW_MINUTES:g} minute(s); split it up.",
+        )
+    if not check_rate_limit(client_identity(http_request), cost=cost):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
+
+def client_identity(http_request: Request) -> str:
+    """Rate-limit key for a request: its API key if that key is in RATE_LIMIT_API_KEYS, otherwise the client IP.
+
+    Unlisted keys are ignored, so sending a fresh key per request neither
+    escapes the limit nor floods the limiter with buckets. Likewise only the
+    X-Forwarded-For entry appended by the outermost trusted proxy is used,
+    RATE_LIMIT_PROXY_HOPS from the right; anything left of it is client-supplied.
+    """
+    api_key = http_request.headers.get("x-api-key")
+    if api_key and api_key in RATE_LIMIT_API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    forwarded = http_request.headers.get("x-forwarded-for") if RATE_LIMIT_TRUST_FORWARDED else None
+    if forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        return "ip:" + hops[-min(RATE_LIMIT_PROXY_HOPS, len(hops))]
+    return "ip:" + (http_request.client.host if http_request.client else "unknown")
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def cache_key(legal_text: str, analysis: TextAnalysis = None) -> str:
+    """Stable key for a translation: normalized text plus the model and prompt that produced it."""
+    normalized = analysis.normalized if analysis is not None else _normalize_text(legal_text)
+    models = f"{FAST_MODEL_NAME}>{MODEL_NAME}" if FAST_MODEL_NAME else MODEL_NAME
+    material = "\x00".join((models, prompt_store.current.version, normalized))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
 @app.post("/simplify")
-async def simplify_text(request: SimplifyRequest):
-    request_key = hash(request.text) % 1000
-    if not check_rate_limit(str(request_key)):
+async def simplify_text(request: SimplifyRequest, http_request: Request):
+    if not check_rate_limit(client_identity(http_request)):
         raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
     
+    try:
+        return await resolve_translation(request.text)
+    except Overloaded as e:
+        logger.warning(f"Shed request: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"OpenAI Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/simplify/batch")
+async def simplify_batch(request: SimplifyBatchRequest, http_request: Request):
+    """Translate many texts in one call. Results come back in input order; an item
+    that fails validation or translation carries an `error` instead of failing the batch.
+    The batch costs one rate-limit token per distinct valid text."""
+    sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+    unique = {}
+
+    async def run_one(legal_text: str) -> dict:
+        async with sem:
+            try:
+                return await resolve_translation(legal_text)
+            except Exception as e:
+                logger.error(f"OpenAI Error: {str(e)}")
+                return {"error": str(e)}
+
+    items = []
+    for text in request.texts:
+        try:
+            legal_text = SimplifyRequest(text=text).text
+        except ValidationError as e:
+            items.append({"error": e.errors()[0]["msg"]})
+            continue
+        key = cache_key(legal_text)
+        unique.setdefault(key, legal_text)
+        items.append(key)
+
+    charge_rate_limit(http_request, max(1, len(unique)), "item")
+    futures = {key: asyncio.ensure_future(run_one(text)) for key, text in unique.items()}
+    await asyncio.gather(*futures.values())
+    results = [futures[item].result() if isinstance(item, str) else item for item in items]
+    return {
+        "results": results,
+        "count": len(results),
+        "unique": len(unique),
+        "errors": sum(1 for r in results if "error" in r),
+    }
+
+@app.post("/simplify/document")
+async def simplify_document(request: SimplifyDocumentRequest, http_request: Request):
+    """Translate a document longer than /simplify accepts.
+
+    The text is packed into sentence-aligned chunks of at most
+    DOCUMENT_CHUNK_CHARS, which DOCUMENT_CONCURRENCY workers translate
+    concurrently, so latency tracks the slowest chunk rather than the sum.
+    Chunks come back in document order with their own category; the document
+    category is the legal category covering the most text. The document
+    costs one rate-limit token per chunk.
+    """
+    chunk_list = list(iter_chunks(request.text, DOCUMENT_CHUNK_CHARS))
+    charge_rate_limit(http_request, max(1, len(chunk_list)), "chunk")
+
+    chunks = enumerate(chunk_list)
+    results = {}
+
+    async def worker():
+        # Workers pull from one shared generator, so only DOCUMENT_CONCURRENCY chunks are in flight.
+        for index, chunk in chunks:
+            try:
+                result = await resolve_translation(chunk, local_rules=False)
+                results[index] = {"index": index, "text": chunk, **result}
+            except Exception as e:
+                logger.error(f"OpenAI Error: {str(e)}")
+                results[index] = {"index": index, "text": chunk, "error": str(e)}
+
+    await asyncio.gather(*(worker() for _ in range(DOCUMENT_CONCURRENCY)))
+    ordered = [results[i] for i in range(len(results))]
+
+    coverage = _category_coverage((item["category"], item["text"]) for item in ordered if "error" not in item)
+
+    return {
+        "response": " ".join(item.get("response", "") for item in ordered if "error" not in item),
+        "category": _dominant_category(coverage),
+        "category_breakdown": coverage,
+        "chunks": ordered,
+        "chunk_count": len(ordered),
+        "errors": sum(1 for item in ordered if "error" in item),
+        "word_count": len(request.text.split()),
+    }
+
+@app.post("/simplify/stream")
+async def simplify_stream(request: SimplifyRequest, http_request: Request):
+    """Server-Sent Events version of /simplify.
+
+    Emits `category` as soon as the model commits to one, `delta` events with
+    plain_english text as it arrives, then `done` with the post-processed
+    payload (adjusted category, parse_confidence, final response text).
+    """
+    if not check_rate_limit(client_identity(http_request)):
+        raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
+
     legal_text = request.text
+    analysis = TextAnalysis(legal_text)
+    key = cache_key(legal_text, analysis)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    cached = local_classification(legal_text, analysis=analysis)
+    if cached is not None:
+        fast_path_stats["answered_locally"] += 1
+    else:
+        cached = cache_lookup(key)
+    if cached is None and not breaker.allow():
+        cached = degraded_translation(legal_text, analysis)
+    if cached is not None:
+        async def replay():
+            yield sse_event("category", {"category": cached["category"]})
+            yield sse_event("delta", {"text": cached["response"]})
+            yield sse_event("done", cached)
+        return StreamingResponse(replay(), media_type="text/event-stream", headers=headers)
+
+    logger.info(f"Received streaming request: {legal_text!r}")
+    return StreamingResponse(_stream_translation(key, legal_text, analysis), media_type="text/event-stream", headers=headers)
+
+async def _stream_translation(key: str, legal_text: str, analysis: TextAnalysis = None):
+    args = ToolArgsStream()
+    content = []
+    usage = None
+    prompt_version = prompt_store.current.version
     try:
-        system_prompt = prompt_env.get_template(PROMPT_TEMPLATE).render()
-    except Exception:
-        system_prompt = prompt_env.get_template("legal_assistant_v4.txt").render()
+        async with admission.slot():
+            try:
+                stream = await client.chat.completions.create(
+                    **_completion_kwargs(legal_text), stream=True, stream_options={"include_usage": True}
+                )
+                async with stream:
+                    async for chunk in stream:
+                        usage = getattr(chunk, "usage", None) or usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            content.append(delta.content)
+                        for tc in delta.tool_calls or []:
+                            if tc.function and tc.function.arguments:
+                                category, text = args.feed(tc.function.arguments)
+                                if category:
+                                    yield sse_event("category", {"category": category})
+                                if text:
+                                    yield sse_event("delta", {"text": text})
+            except Exception as e:
+                breaker.record_failure(str(e))
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+
+        # Reassemble the streamed message so it goes through the same parser as /simplify.
+        tool_calls = [SimpleNamespace(type="function", function=SimpleNamespace(arguments=args.buffer))] if args.buffer else None
+        message = SimpleNamespace(tool_calls=tool_calls, function_call=None, content="".join(content))
+        analysis = analysis or TextAnalysis(legal_text)
+        parsed, parse_confidence = _parse_completion(legal_text, message, analysis)
+        result = _postprocess(legal_text, parsed, parse_confidence, analysis)
+        token_usage.record(prompt_version, result["category"], usage)
+    except Overloaded as e:
+        breaker.release()
+        logger.warning(f"Shed streaming request: {e}")
+        yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+        return
+    except Exception as e:
+        logger.error(f"OpenAI Error: {str(e)}")
+        yield sse_event("error", {"detail": str(e)})
+        return
+    cache_store(key, result)
+    yield sse_event("done", result)
+
+async def resolve_translation(legal_text: str, local_rules: bool = True, count_lookup: bool = True) -> dict:
+    """Serve a validated text locally or from cache, or translate it (sharing any identical call in flight).
+
+    Pieces of a larger text (clauses, document chunks) pass local_rules=False:
+    a sentence with no legal terms still belongs to the legal text around it,
+    so it is sent to the model rather than answered as Non-Legal. Stitched
+    clauses also pass count_lookup=False (see cache_lookup).
+    """
+    analysis = TextAnalysis(legal_text)
+    local = local_classification(legal_text, analysis=analysis) if local_rules else None
+    if local is not None:
+        fast_path_stats["answered_locally"] += 1
+        return local
+
+    key = cache_key(legal_text, analysis)
+    cached = cache_lookup(key, count_lookup)
+    if cached is not None:
+        return cached
 
     logger.info(f"Received request: {legal_text!r}")
+    return await inflight.do(key, lambda: _translate_and_store(key, legal_text, analysis))
 
-    try:
-        completion_kwargs = {
-            "model": MODEL_NAME,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": legal_text}
-            ],
-            "tools": tools,
-            "tool_choice": {"type": "function", "function": {"name": "classify_legal_area"}},
-        }
-        
-        if not MODEL_NAME.startswith("gpt-5"):
-            completion_kwargs["temperature"] = 0.1
-        if MODEL_NAME.startswith("gpt-5"):
-            completion_kwargs["max_completion_tokens"] = 500
+async def _translate_and_store(key: str, legal_text: str, analysis: TextAnalysis = None) -> dict:
+    analysis = analysis or TextAnalysis(legal_text)
+    result = await _translate_from_clauses(legal_text, analysis) if CLAUSE_CACHE_ENABLED else None
+    if result is None:
+        result = await _translate(legal_text, analysis)
+    # The ratio describes this stitching only; an exact hit later serves the whole text from cache.
+    cache_store(key, {k: v for k, v in result.items() if k != "clause_cache_ratio"})
+    return result
+
+def _category_coverage(parts) -> dict:
+    """Characters of text per category, from (category, text) pairs."""
+    coverage = defaultdict(int)
+    for category, text in parts:
+        coverage[category] += len(text)
+    return dict(coverage)
+
+def _dominant_category(coverage: dict) -> str:
+    """The specific legal category covering the most text, falling back to Other Legal/Non-Legal."""
+    legal = {c: n for c, n in coverage.items() if c not in ("Other Legal", "Non-Legal")}
+    ranked = legal or coverage
+    return max(ranked, key=ranked.get) if ranked else ""
+
+_CONFIDENCE_RANK = {"low": 0, "medium": 1, "adjusted": 2, "high": 3}
+
+async def _translate_from_clauses(legal_text: str, analysis: TextAnalysis = None):
+    """Assemble a translation from cached clauses, sending only the uncached ones to the model.
+
+    Returns None (translate the whole text) when the text is a single clause or
+    none of its clauses are cached. Consecutive uncached clauses are sent as one
+    text, so a document costs at most one model call per gap between hits.
+    """
+    clauses = list(iter_sentences(legal_text))
+    if len(clauses) < 2:
+        return None
+    hits = [cache_lookup(cache_key(clause), count=False) for clause in clauses]
+    served = sum(1 for hit in hits if hit is not None)
+    clause_stats["lookups"] += len(clauses)
+    clause_stats["lookup_hits"] += served
+    if not served:
+        return None
+
+    parts = []
+    for clause, hit in zip(clauses, hits):
+        if hit is None and parts and parts[-1][1] is None:
+            parts[-1] = (f"{parts[-1][0]} {clause}", None)
         else:
-            completion_kwargs["max_tokens"] = 500
-
-        response = client.chat.completions.create(**completion_kwargs)
-        choice = response.choices[0].message
-
-        args_str = None
-        if hasattr(choice, "tool_calls") and choice.tool_calls:
-            for tc in choice.tool_calls:
-                try:
-                    if getattr(tc, "type", "") == "function":
-                        fn = getattr(tc, "function", None)
-                        if fn and getattr(fn, "arguments", None):
-                            args_str = fn.arguments
-                            break
-                except Exception:
-                    continue
-        elif hasattr(choice, "function_call") and getattr(choice.function_call, "arguments", None):
-            args_str = choice.function_call.arguments
-
-        parsed = {}
-        parse_confidence = "low"
-        if args_str:
+            parts.append((clause, hit))
+    misses = [text for text, hit in parts if hit is None]
+    translated = iter(await asyncio.gather(*(resolve_translation(text, local_rules=False, count_lookup=False) for text in misses)))
+    results = [hit if hit is not None else next(translated) for _, hit in parts]
+
+    clause_stats["stitched_requests"] += 1
+    clause_stats["clauses"] += len(clauses)
+    clause_stats["clauses_from_cache"] += served
+    logger.info(f"Served {served}/{len(clauses)} clauses from cache")
+
+    category = _dominant_category(_category_coverage((r["category"], text) for (text, _), r in zip(parts, results)))
+    parse_confidence = min((r["parse_confidence"] for r in results), key=lambda c: _CONFIDENCE_RANK.get(c, 0))
+    analysis = analysis or TextAnalysis(legal_text)
+    adjusted = adjust_category(legal_text, category, analysis.found)
+    if adjusted != category and parse_confidence == "high":
+        parse_confidence = "adjusted"
+    return {
+        "response": " ".join(r["response"] for r in results),
+        "category": adjusted,
+        "confidence": "high" if analysis.word_count > 10 else "medium",
+        "word_count": analysis.word_count,
+        "parse_confidence": parse_confidence,
+        "clause_cache_ratio": served / len(clauses),
+    }
+
+def cache_lookup(key: str, count: bool = True):
+    """Check the in-process cache, then the persistent tier (promoting hits into memory).
+
+    Lookups made on behalf of a larger text pass count=False so they do not
+    skew the cache hit rates in /metrics; clause_stats tracks those instead.
+    """
+    cached = response_cache.get(key, count)
+    if cached is None and persistent_cache is not None:
+        cached = persistent_cache.get(key, count)
+        if cached is not None:
+            response_cache.set(key, cached)
+    return cached
+
+def cache_store(key: str, result: dict) -> None:
+    # Low-confidence parses and degraded answers are not cached so the next request gets a fresh attempt.
+    if result["parse_confidence"] in ("low", "degraded"):
+        return
+    response_cache.set(key, result)
+    if persistent_cache is not None:
+        persistent_cache.set(key, result)
+
+async def _translate(legal_text: str, analysis: TextAnalysis = None) -> dict:
+    """Run the model call and the post-processing chain for one text."""
+    analysis = analysis or TextAnalysis(legal_text)
+    if not breaker.allow():
+        return degraded_translation(legal_text, analysis)
+    if not FAST_MODEL_NAME:
+        routing_stats.strong_only += 1
+        result, _ = await _translate_with(legal_text, analysis, "strong", MODEL_NAME, 500)
+        return result
+
+    start = time.perf_counter()
+    try:
+        result, reasons = await _translate_with(legal_text, analysis, "fast", FAST_MODEL_NAME, FAST_MODEL_MAX_TOKENS)
+    except Overloaded:
+        raise
+    except Exception as e:
+        logger.warning(f"Fast model call failed, escalating: {e}")
+        result, reasons = None, ["error"]
+    # Both tiers share one MODEL_DEADLINE, so the strong call only gets what the fast one left.
+    remaining = MODEL_DEADLINE - (time.perf_counter() - start)
+    if not reasons or remaining <= 0:
+        if result is None:
+            raise DeadlineExceeded(f"Model call exceeded the {MODEL_DEADLINE:g}s deadline")
+        routing_stats.fast_served += 1
+        return result
+    routing_stats.record_escalation(reasons)
+    logger.info(f"Escalating to {MODEL_NAME}: {', '.join(reasons)}")
+    if not breaker.allow():
+        return degraded_translation(legal_text, analysis)
+    result, _ = await _translate_with(legal_text, analysis, "strong", MODEL_NAME, 500, deadline=remaining)
+    return result
+
+async def _translate_with(legal_text: str, analysis: TextAnalysis, tier: str, model: str, max_tokens: int,
+                          deadline: float = None) -> tuple:
+    """One model call on `model` within `deadline` seconds (MODEL_DEADLINE by default) plus post-processing;
+    returns (payload, reasons the answer is weak)."""
+    prompt_version = prompt_store.current.version
+    completion_kwargs = _completion_kwargs(legal_text, model, max_tokens)
+    start = time.perf_counter()
+    try:
+        response = await hedger.run(
+            lambda timeout: _call_model(completion_kwargs, timeout),
+            MODEL_DEADLINE if deadline is None else deadline, MODEL_ATTEMPT_TIMEOUT,
+            hedge=breaker.state == CircuitBreaker.CLOSED,
+        )
+    except DeadlineExceeded as e:
+        # The attempts cut off at the deadline were cancelled, which _call_model releases rather than counts.
+        breaker.record_failure(str(e))
+        raise
+    routing_stats.record_call(tier, time.perf_counter() - start)
+    parsed, parse_confidence = _parse_completion(legal_text, response.choices[0].message, analysis)
+    model_category = (parsed.get("category") or "").strip()
+    model_text = _normalize_text(str(parsed.get("plain_english") or ""))
+    result = _postprocess(legal_text, parsed, parse_confidence, analysis)
+    token_usage.record(prompt_version, result["category"], getattr(response, "usage", None))
+    echoed = result["category"] != "Non-Legal" and model_text in ("", analysis.normalized)
+    overridden = bool(model_category) and result["category"] != model_category
+    return result, weak_reasons(result["parse_confidence"], overridden, echoed)
+
+async def _call_model(completion_kwargs: dict, timeout: float = None):
+    """One upstream call under admission control, with its outcome reported to the circuit breaker.
+    The caller must already have been let through by breaker.allow()."""
+    try:
+        async with admission.slot():
             try:
-                parsed = json.loads(args_str)
-                parse_confidence = "high"
-            except Exception as parse_err:
-                logger.error(f"Parse Error decoding function arguments: {parse_err}")
-                try:
-                    category_match = re.search(r'"category"\s*:\s*"([^"]+)"', args_str)
-                    text_match = re.search(r'"plain_english"\s*:\s*"([^"]+)"', args_str)
-                    if category_match and text_match:
-                        parsed = {
-                            "category": category_match.group(1),
-                            "plain_english": text_match.group(1)
-                        }
-                        parse_confidence = "medium"
-                    else:
-                        parsed = {"category": "", "plain_english": args_str}
-                        parse_confidence = "low"
-                except Exception:
+                response = await asyncio.wait_for(client.chat.completions.create(**completion_kwargs), timeout)
+            except asyncio.TimeoutError:
+                raise asyncio.TimeoutError(f"Model call timed out after {timeout:g}s") from None
+    except (Overloaded, CassetteMiss):
+        # Neither reached upstream: a shed call, or a replay of a request that was never recorded.
+        breaker.release()
+        raise
+    except Exception as e:
+        breaker.record_failure(str(e))
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    breaker.record_success()
+    return response
+
+def degraded_translation(legal_text: str, analysis: TextAnalysis = None) -> dict:
+    """Answer from the local rules alone (basic rewrite plus keyword category) while upstream is unavailable."""
+    return _postprocess(legal_text, {"category": "", "plain_english": ""}, "degraded", analysis)
+
+def _completion_kwargs(legal_text: str, model: str = None, max_tokens: int = 500) -> dict:
+    return request_builder.build(prompt_store.current, legal_text, model or MODEL_NAME, max_tokens)
+
+def _parse_completion(legal_text: str, choice, analysis: TextAnalysis = None) -> tuple:
+    """Extract (parsed arguments, parse_confidence) from a completion message."""
+    args_str = None
+    if hasattr(choice, "tool_calls") and choice.tool_calls:
+        for tc in choice.tool_calls:
+            try:
+                if getattr(tc, "type", "") == "function":
+                    fn = getattr(tc, "function", None)
+                    if fn and getattr(fn, "arguments", None):
+                        args_str = fn.arguments
+                        break
+            except Exception:
+                continue
+    elif hasattr(choice, "function_call") and getattr(choice.function_call, "arguments", None):
+        args_str = choice.function_call.arguments
+
+    parsed = {}
+    parse_confidence = "low"
+    if args_str:
+        try:
+            parsed = json.loads(args_str)
+            parse_confidence = "high"
+        except Exception as parse_err:
+            logger.error(f"Parse Error decoding function arguments: {parse_err}")
+            try:
+                category_match = re.search(r'"category"\s*:\s*"([^"]+)"', args_str)
+                text_match = re.search(r'"plain_english"\s*:\s*"([^"]+)"', args_str)
+                if category_match and text_match:
+                    parsed = {
+                        "category": category_match.group(1),
+                        "plain_english": text_match.group(1)
+                    }
+                    parse_confidence = "medium"
+                else:
                     parsed = {"category": "", "plain_english": args_str}
                     parse_confidence = "low"
-        else:
-            content = getattr(choice, "content", "") or ""
-            json_match = re.search(r"\{[\s\S]*\}", content)
-            if json_match:
-                try:
-                    candidate = json.loads(json_match.group(0))
-                    if isinstance(candidate, dict):
-                        parsed = candidate
-                        parse_confidence = "medium"
-                except Exception:
-                    pass
-            if not parsed:
-                # Fallback with estate detection
-                lower_text = legal_text.lower()
-                if any(t in lower_text for t in _ESTATE_TERMS):
-                    fallback_category = "Wills, Trusts, and Estates"
-                else:
-                    fallback_category = "Other Legal" if _is_likely_legal(legal_text) else "Non-Legal"
-                parsed = {
-                    "category": fallback_category,
-                    "plain_english": content.strip() if content.strip() else create_basic_translation(legal_text)
-                }
+            except Exception:
+                parsed = {"category": "", "plain_english": args_str}
                 parse_confidence = "low"
+    else:
+        content = getattr(choice, "content", "") or ""
+        json_match = re.search(r"\{[\s\S]*\}", content)
+        if json_match:
+            try:
+                candidate = json.loads(json_match.group(0))
+                if isinstance(candidate, dict):
+                    parsed = candidate
+                    parse_confidence = "medium"
+            except Exception:
+                pass
+        if not parsed:
+            # Fallback with estate detection
+            analysis = analysis or TextAnalysis(legal_text)
+            if analysis.found & _ESTATE_TERMS:
+                fallback_category = "Wills, Trusts, and Estates"
+            else:
+                fallback_category = "Other Legal" if _is_likely_legal(legal_text, analysis.found) else "Non-Legal"
+            parsed = {
+                "category": fallback_category,
+                "plain_english": content.strip() if content.strip() else create_basic_translation(legal_text, analysis)
+            }
+            parse_confidence = "low"
+    return parsed, parse_confidence
 
-        if not parsed.get("category") or parsed.get("category").strip() == "":
-            parsed["category"] = "Other Legal" if _is_likely_legal(legal_text) else "Non-Legal"
-            logger.info("Assigned fallback category '%s' (minimal detection).", parsed["category"]) 
-
-        original_category = parsed.get("category", "")
-        new_category = adjust_category(legal_text, original_category)
-        if new_category != original_category:
-            parsed["category"] = new_category
-            if parse_confidence == "high":
-                parse_confidence = "adjusted" 
-
-        response_text = parsed.get("plain_english", "").strip()
-        if not response_text or response_text.lower() == legal_text.lower():
-            response_text = create_basic_translation(legal_text)
-            parsed["plain_english"] = response_text
-
-        if parsed.get("category") == "Non-Legal":
-            norm_original = re.sub(r"\s+", " ", legal_text.strip().lower())
-            norm_resp = re.sub(r"\s+", " ", parsed.get("plain_english", "").strip().lower())
-            if norm_resp == norm_original:
-                parsed["plain_english"] = "This isn't legal language; there's nothing to translate." 
-                response_text = parsed["plain_english"]
-        
-        confidence = "high" if len(legal_text.split()) > 10 else "medium"
-        response_text = parsed.get("plain_english", "")
-        response_text = ensure_meaningful_simplification(legal_text, response_text, parsed.get("category", ""))
-        return {
-            "response": response_text,
-            "category": parsed.get("category", ""),
-            "confidence": confidence,
-            "word_count": len(legal_text.split()),
-            "parse_confidence": parse_confidence
-        }
+def _postprocess(legal_text: str, parsed: dict, parse_confidence: str, analysis: TextAnalysis = None) -> dict:
+    """Apply category adjustment and translation fallbacks, and build the response payload."""
+    analysis = analysis or TextAnalysis(legal_text)
+    if not parsed.get("category") or parsed.get("category").strip() == "":
+        parsed["category"] = "Other Legal" if _is_likely_legal(legal_text, analysis.found) else "Non-Legal"
+        logger.info("Assigned fallback category '%s' (minimal detection).", parsed["category"]) 
+
+    original_category = parsed.get("category", "")
+    new_category = adjust_category(legal_text, original_category, analysis.found)
+    if new_category != original_category:
+        parsed["category"] = new_category
+        if parse_confidence == "high":
+            parse_confidence = "adjusted" 
+
+    response_text = parsed.get("plain_english", "").strip()
+    if not response_text or response_text.lower() == analysis.lowered:
+        response_text = create_basic_translation(legal_text, analysis)
+        parsed["plain_english"] = response_text
+
+    if parsed.get("category") == "Non-Legal":
+        norm_original = analysis.normalized
+        norm_resp = _normalize_text(parsed.get("plain_english", ""))
+        if norm_resp == norm_original:
+            parsed["plain_english"] = NON_LEGAL_RESPONSE
+            response_text = parsed["plain_english"]
+    
+    confidence = "high" if analysis.word_count > 10 else "medium"
+    response_text = parsed.get("plain_english", "")
+    response_text = ensure_meaningful_simplification(legal_text, response_text, parsed.get("category", ""), analysis)
+    return {
+        "response": response_text,
+        "category": parsed.get("category", ""),
+        "confidence": confidence,
+        "word_count": analysis.word_count,
+        "parse_confidence": parse_confidence
+    }
+
+class AdmissionLimits(BaseModel):
+    max_inflight: Optional[int] = Field(None, ge=1)
+    max_queue: Optional[int] = Field(None, ge=0)
+    queue_timeout: Optional[float] = Field(None, gt=0)
+
+def require_admin(http_request: Request) -> None:
+    if not ADMIN_TOKEN or not hmac.compare_digest(http_request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.put("/admin/admission")
+def update_admission_limits(limits: AdmissionLimits, http_request: Request):
+    """Change the upstream concurrency limits without a restart (requires X-Admin-Token)."""
+    require_admin(http_request)
+    admission.configure(**limits.model_dump())
+    logger.info(f"Admission limits updated: {limits.model_dump(exclude_none=True)}")
+    return admission.stats()
+
+@app.post("/admin/prompts/reload")
+def reload_prompts(http_request: Request):
+    """Re-read the system prompt from disk now rather than waiting for the watcher (requires X-Admin-Token)."""
+    require_admin(http_request)
+    try:
+        changed = prompt_store.reload()
     except Exception as e:
-        logger.error(f"OpenAI Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Prompt reload failed: {e}")
+    return {"changed": changed, **prompt_store.stats()}
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok" if breaker.state == CircuitBreaker.CLOSED else "degraded", "circuit": breaker.state}
 
 @app.get("/metrics")
 def get_metrics():
-    total_requests = sum(len(timestamps) for timestamps in request_timestamps.values())
-    active_clients = len([k for k, v in request_timestamps.items() if v])
+    limiter = rate_limiter.stats(time.time())
+    tokens = token_usage.stats()
+    prefix = request_builder.prefix(prompt_store.current)
     return {
-        "total_requests_in_window": total_requests,
-        "active_clients": active_clients,
-        "server_status": "healthy"
+        "total_requests_in_window": limiter["requests_in_window"],
+        "active_clients": limiter["tracked_keys"],
+        "rate_limiter": limiter,
+        "response_cache": response_cache.stats(),
+        "persistent_cache": persistent_cache.stats() if persistent_cache is not None else None,
+        "coalesced_requests": inflight.coalesced,
+        "admission": admission.stats(),
+        "hedging": hedger.stats(),
+        "routing": routing_stats.stats(),
+        "prompt": prompt_store.stats(),
+        "tokens": tokens,
+        "cassette": {"mode": MODEL_CASSETTE_MODE, **cassette.stats()} if cassette is not None else None,
+        "prefix_cache": {
+            "prefix_sha256": prefix.sha256,
+            "prefix_chars": prefix.chars,
+            "hit_ratio": tokens["cache_hit_ratio"],
+            "cached_token_ratio": tokens["cached_ratio"],
+        },
+        "answered_locally": fast_path_stats["answered_locally"],
+        "clause_cache": {
+            **clause_stats,
+            "hit_ratio": (clause_stats["clauses_from_cache"] / clause_stats["clauses"]) if clause_stats["clauses"] else 0.0,
+        },
+        "circuit_breaker": breaker.stats(),
+        "server_status": "healthy" if breaker.state == CircuitBreaker.CLOSED else "degraded"
     }
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+System prompt loading for /simplify: the prompt template is rendered once,
+kept as an immutable snapshot, and swapped atomically when the prompts
+directory changes or a reload is requested.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader
+
+logger = logging.getLogger(__name__)
+
+
+class PromptSnapshot(NamedTuple):
+    template: str
+    text: str
+    sha256: str
+    loaded_at: float
+
+    @property
+    def version(self) -> str:
+        """Template name and content hash, e.g. legal_assistant_v5.txt@3f2a9c1d04be."""
+        return f"{self.template}@{self.sha256[:12]}"
+
+
+class PromptStore:
+    """Holds the rendered system prompt.
+
+    If `template` fails to render, `fallback` is used and the error is logged
+    at startup rather than on the first request; if neither renders, the
+    constructor raises. Reloads only render `template`: a failed reload keeps
+    the current snapshot instead of switching live traffic to the fallback.
+    """
+
+    def __init__(self, directory: str, template: str, fallback: Optional[str] = None):
+        self.directory = directory
+        self.template = template
+        self.fallback = fallback
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error: Optional[str] = None
+        self.current = self._load()
+
+    def _render(self, name: str) -> PromptSnapshot:
+        # A fresh environment so an edited file is never served from Jinja's template cache.
+        env = Environment(loader=FileSystemLoader(self.directory))
+        text = env.get_template(name).render()
+        return PromptSnapshot(name, text, hashlib.sha256(text.encode("utf-8")).hexdigest(), time.time())
+
+    def _load(self) -> PromptSnapshot:
+        try:
+            return self._render(self.template)
+        except Exception as e:
+            if not self.fallback:
+                raise
+            logger.error(f"Prompt template {self.template!r} failed to load ({e}); using {self.fallback!r}")
+            self.last_error = str(e)
+            return self._render(self.fallback)
+
+    def reload(self) -> bool:
+        """Re-render `template`; returns True if its text changed. Raises (keeping the current prompt) if it fails."""
+        try:
+            snapshot = self._render(self.template)
+        except Exception as e:
+            self.reload_errors += 1
+            self.last_error = str(e)
+            logger.error(f"Prompt reload failed, keeping {self.current.version}: {e}")
+            raise
+        if snapshot.sha256 == self.current.sha256:
+            return False
+        self.current = snapshot
+        self.reloads += 1
+        logger.info(f"System prompt reloaded: {snapshot.version}")
+        return True
+
+    def _fingerprint(self) -> Tuple:
+        with os.scandir(self.directory) as entries:
+            return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in entries if e.is_file()))
+
+    async def watch(self, interval: float) -> None:
+        """Poll the prompts directory every `interval` seconds and reload on any change."""
+        seen = self._fingerprint()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                fingerprint = self._fingerprint()
+                if fingerprint != seen:
+                    seen = fingerprint
+                    self.reload()
+            except Exception:
+                pass  # already logged by reload(); keep watching
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.current
+        return {
+            "template": snapshot.template,
+            "version": snapshot.version,
+            "sha256": snapshot.sha256,
+            "loaded_at": snapshot.loaded_at,
+            "using_fallback": snapshot.template != self.template,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,110 @@
+"""
+Offline report of the token cost of each system prompt in prompts/, and
+optionally of its category accuracy on category_eval_samples.yaml.
+
+The footprint is the prompt plus the tools schema, which go out with every
+/simplify call. Tokens are counted with tiktoken when it is installed and
+estimated at four characters per token otherwise (marked with ~).
+
+--accuracy runs the samples through the in-process pipeline once per prompt
+and reports accuracy alongside the prompt tokens the backend billed, taken
+from the completions' usage data. It calls whatever OPENAI_BASE_URL points
+at. --fake uses the local fake completion server instead; its answers do not
+depend on the prompt, so that run only exercises the accounting and the
+local category rules.
+
+Usage: python prompt_tokens.py [--accuracy [--fake]] [--prompts legal_assistant_v4.txt,legal_assistant_v5.txt]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+from category_eval import load_samples, normalize_category
+from prompt_store import PromptStore
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "category_eval_samples.yaml")
+
+
+def token_counter(model: str):
+    """Return (count(text) -> int, exact) using tiktoken if available."""
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: len(text) // 4), False
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return (lambda text: len(encoding.encode(text))), True
+
+
+def prompt_names(selected=None):
+    names = sorted(n for n in os.listdir(PROMPTS_DIR) if n.endswith(".txt"))
+    return [n for n in names if n in selected] if selected else names
+
+
+def footprint(backend, names):
+    count, exact = token_counter(backend.MODEL_NAME)
+    mark = "" if exact else "~"
+    tools_tokens = count(json.dumps(backend.tools))
+    print(f"Tools schema: {mark}{tools_tokens} tokens (sent with every prompt)\n")
+    print(f"{'prompt':<28} {'chars':>7} {'tokens':>8} {'with tools':>11}")
+    for name in names:
+        text = PromptStore(PROMPTS_DIR, name).current.text
+        tokens = count(text)
+        print(f"{name:<28} {len(text):>7} {mark + str(tokens):>8} {mark + str(tokens + tools_tokens):>11}")
+
+
+async def evaluate(backend, samples, name):
+    backend.prompt_store = PromptStore(PROMPTS_DIR, name)
+    backend.token_usage = backend.TokenUsage()
+    correct = 0
+    for sample in samples:
+        text = sample["input"]
+        analysis = backend.TextAnalysis(text)
+        result = backend.local_classification(text, analysis=analysis) or await backend._translate(text, analysis)
+        if normalize_category(result["category"]) == sample["expected_category"].strip():
+            correct += 1
+    return correct, backend.token_usage.stats()
+
+
+async def accuracy(backend, samples, names):
+    print(f"\n{'prompt':<28} {'accuracy':>9} {'calls':>6} {'avg prompt tok':>15} {'avg completion tok':>19}")
+    for name in names:
+        correct, usage = await evaluate(backend, samples, name)
+        print(f"{name:<28} {correct / len(samples):>9.1%} {usage['calls']:>6} "
+              f"{usage['avg_prompt_tokens']:>15.0f} {usage['avg_completion_tokens']:>19.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accuracy", action="store_true", help="also run the category samples once per prompt")
+    parser.add_argument("--fake", action="store_true", help="answer --accuracy calls from the local fake server")
+    parser.add_argument("--prompts", default="", help="comma-separated prompt files (default: all in prompts/)")
+    parser.add_argument("--samples", default=SAMPLES_PATH)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "offline-eval")
+    os.environ["PERSISTENT_CACHE_PATH"] = ""
+    names = prompt_names(set(filter(None, args.prompts.split(","))))
+
+    if args.accuracy and args.fake:
+        from fake_openai_server import FakeCompletionServer
+        with FakeCompletionServer(latency=0) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            import main as backend
+            footprint(backend, names)
+            asyncio.run(accuracy(backend, load_samples(args.samples), names))
+        return
+
+    import main as backend
+    footprint(backend, names)
+    if args.accuracy:
+        asyncio.run(accuracy(backend, load_samples(args.samples), names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Per-client rate limiting for the /simplify endpoints: an in-process limiter
+and a SQLite-backed one whose limits hold across every worker on a host.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """Token buckets per client key, updated in constant time.
+
+    Each key may burst up to `limit` requests and regains `limit` tokens every
+    `period` seconds. Buckets live in an OrderedDict kept in last-seen order,
+    so idle keys are evicted from the front as part of normal traffic: a key
+    unseen for a full `window` has refilled its bucket anyway, so forgetting
+    it changes nothing. Past `max_keys`, the least recently seen key is
+    dropped and starts over with a full bucket if it returns.
+
+    Allowed requests are also tallied in a sliding-window counter (the
+    current and previous `window`), so totals need no per-key scan. A request
+    may cost several tokens (e.g. one per model call it will make); it is
+    allowed only if the bucket holds them all, and the window counter tallies
+    tokens rather than requests.
+    """
+
+    def __init__(self, window: float = 60.0, max_keys: int = 10_000, clock: Callable[[], float] = time.time):
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._window_start: Optional[float] = None
+        self._current = 0
+        self._previous = 0
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def hit(self, key: Hashable, limit: int, period: float, now: Optional[float] = None, cost: int = 1) -> bool:
+        """Take `cost` tokens from `key`'s bucket; False (taking none) if it holds fewer."""
+        now = self._clock() if now is None else now
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = float(limit)
+        else:
+            tokens, last = bucket
+            tokens = min(float(limit), tokens + max(0.0, now - last) * limit / period)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._evict(now)
+
+        self._roll(now)
+        if allowed:
+            self.allowed += 1
+            self._current += cost
+        else:
+            self.rejected += 1
+        return allowed
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            _, last = buckets[next(iter(buckets))]
+            if now - last < self.window:
+                break
+            buckets.popitem(last=False)
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def _roll(self, now: float) -> None:
+        if self._window_start is None or now < self._window_start:
+            self._window_start, self._previous, self._current = now, 0, 0
+            return
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self._previous = self._current if elapsed < 2 * self.window else 0
+            self._current = 0
+            self._window_start = now - elapsed % self.window
+
+    def requests_in_window(self, now: Optional[float] = None) -> int:
+        """Allowed requests over the last `window` seconds (sliding-window estimate)."""
+        now = self._clock() if now is None else now
+        self._roll(now)
+        overlap = max(0.0, 1 - (now - self._window_start) / self.window)
+        return round(self._previous * overlap + self._current)
+
+    def active_keys(self, now: Optional[float] = None) -> int:
+        """Keys seen within the last `window` seconds."""
+        self._evict(self._clock() if now is None else now)
+        return len(self._buckets)
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, int]:
+        now = self._clock() if now is None else now
+        return {
+            "tracked_keys": self.active_keys(now),
+            "max_keys": self.max_keys,
+            "requests_in_window": self.requests_in_window(now),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+        }
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._window_start = None
+        self._current = self._previous = 0
+
+    def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimiter:
+    """The same token buckets as TokenBucketLimiter, stored in a SQLite file
+    so that every process opening it shares one limit per key.
+
+    A check is one UPSERT that refills and takes a token in a single atomic
+    statement, plus a per-window counter bump, in one WAL transaction.
+    Idle and excess keys are deleted every `evict_every` checks. Checks run
+    on the event loop, so one waits at most `busy_timeout` seconds for
+    another process's transaction. Database errors, including that wait
+    running out, are logged and the request is allowed, so the limiter can
+    never fail or stall a request. The allowed/rejected/evicted counters in
+    `stats` are for this process; the key and window totals are global.
+    """
+
+    _HIT_SQL = (
+        "INSERT INTO buckets (key, tokens, last, granted)"
+        " VALUES (:key, :limit - :cost * (:limit >= :cost), :now, :limit >= :cost)"
+        " ON CONFLICT (key) DO UPDATE SET"
+        " granted = MIN(:limit, tokens + MAX(0, :now - last) * :rate) >= :cost,"
+        " tokens = MIN(:limit, tokens + MAX(0, :now - last) * :rate)"
+        " - :cost * (MIN(:limit, tokens + MAX(0, :now - last) * :rate) >= :cost),"
+        " last = MAX(last, :now)"
+        " RETURNING granted"
+    )
+
+    def __init__(self, path: str, window: float = 60.0, max_keys: int = 10_000, evict_every: int = 100,
+                 clock: Callable[[], float] = time.time, busy_timeout: float = 0.05):
+        self.path = path
+        self.window = window
+        self.max_keys = max_keys
+        self.evict_every = evict_every
+        self._clock = clock
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.errors = 0
+        self._checks = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " last REAL NOT NULL,"
+            " granted INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_last ON buckets (last)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS window_counts (slot INTEGER PRIMARY KEY, allowed INTEGER NOT NULL)")
+        # Setup above may wait for other workers; checks only wait this long.
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    def hit(self, key: Hashable, limit: int, period: float, now: Optional[float] = None, cost: int = 1) -> bool:
+        """Take `cost` tokens from `key`'s shared bucket; False (taking none) if it holds fewer."""
+        now = self._clock() if now is None else now
+        params = {"key": str(key), "limit": limit, "rate": limit / period, "now": now, "cost": cost}
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    allowed = bool(self._conn.execute(self._HIT_SQL, params).fetchone()[0])
+                    if allowed:
+                        self._conn.execute(
+                            "INSERT INTO window_counts (slot, allowed) VALUES (?, ?)"
+                            " ON CONFLICT (slot) DO UPDATE SET allowed = allowed + excluded.allowed",
+                            (int(now // self.window), cost),
+                        )
+                    self._checks += 1
+                    if self._checks % self.evict_every == 0:
+                        self._evict(now)
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Shared rate limiter check failed, allowing request: {e}")
+            return True
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return allowed
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM buckets WHERE last <= ?", (now - self.window,))
+        self.evicted += self._conn.execute(
+            "DELETE FROM buckets WHERE key IN ("
+            " SELECT key FROM buckets ORDER BY last ASC"
+            " LIMIT max(0, (SELECT COUNT(*) FROM buckets) - ?))",
+            (self.max_keys,),
+        ).rowcount
+        self._conn.execute("DELETE FROM window_counts WHERE slot < ?", (int(now // self.window) - 1,))
+
+    def requests_in_window(self, now: Optional[float] = None) -> int:
+        """Allowed requests from all processes over the last `window` seconds (sliding-window estimate)."""
+        now = self._clock() if now is None else now
+        current = int(now // self.window)
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT slot, allowed FROM window_counts WHERE slot IN (?, ?)", (current - 1, current)
+            ).fetchall())
+        overlap = 1 - (now - current * self.window) / self.window
+        return round(counts.get(current - 1, 0) * overlap + counts.get(current, 0))
+
+    def active_keys(self, now: Optional[float] = None) -> int:
+        """Keys seen by any process within the last `window` seconds."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM buckets WHERE last > ?", (now - self.window,)).fetchone()[0]
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, int]:
+        now = self._clock() if now is None else now
+        try:
+            tracked, in_window = self.active_keys(now), self.requests_in_window(now)
+        except sqlite3.Error:
+            tracked = in_window = None
+        return {
+            "tracked_keys": tracked,
+            "max_keys": self.max_keys,
+            "requests_in_window": in_window,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "errors": self.errors,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM buckets")
+            self._conn.execute("DELETE FROM window_counts")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
@@ -0,0 +1,65 @@
+"""
+Chat completion requests for /simplify, built so that everything before the
+user's text is byte-identical from one request to the next.
+
+Providers cache the longest previously seen prefix of a request (tools
+schema, then system prompt), so that prefix must not vary with the model
+tier, token limits or the input. The builder serializes the tools once and
+hands each request a fresh copy decoded from that serialization, so callers
+that mutate a request cannot change later prefixes. It fingerprints the
+prefix for each prompt snapshot so changes to it show up in /metrics.
+"""
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from prompt_store import PromptSnapshot
+
+
+class Prefix(NamedTuple):
+    sha256: str
+    chars: int
+
+
+class RequestBuilder:
+    """Builds completion kwargs: static prefix (tools, system prompt) first, user text last."""
+
+    def __init__(self, tools: List[Dict[str, Any]], tool_choice: Optional[Dict[str, Any]] = None,
+                 cache_key: bool = False):
+        self._tools_json = json.dumps(tools, separators=(",", ":"))
+        self._tool_choice = copy.deepcopy(tool_choice)
+        self.cache_key = cache_key
+        self._prefix: Optional[Prefix] = None
+        self._prefix_for: Optional[str] = None
+
+    def prefix(self, prompt: PromptSnapshot) -> Prefix:
+        """Fingerprint of the static part of a request under `prompt`."""
+        if self._prefix_for != prompt.sha256:
+            material = self._tools_json + "\x00" + prompt.text
+            self._prefix = Prefix(hashlib.sha256(material.encode("utf-8")).hexdigest(), len(material))
+            self._prefix_for = prompt.sha256
+        return self._prefix
+
+    def build(self, prompt: PromptSnapshot, user_text: str, model: str, max_tokens: int = 500) -> Dict[str, Any]:
+        """Completion kwargs for one call; the caller owns them and may modify them freely."""
+        kwargs = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": prompt.text},
+                {"role": "user", "content": user_text},
+            ],
+            "tools": json.loads(self._tools_json),
+        }
+        if self._tool_choice is not None:
+            kwargs["tool_choice"] = copy.deepcopy(self._tool_choice)
+        if self.cache_key:
+            # Routes requests sharing this prefix to the same provider cache shard.
+            kwargs["prompt_cache_key"] = "legal-ease-" + self.prefix(prompt).sha256[:16]
+        if model.startswith("gpt-5"):
+            kwargs["max_completion_tokens"] = max_tokens
+        else:
+            kwargs["temperature"] = 0.1
+            kwargs["max_tokens"] = max_tokens
+        return kwargs
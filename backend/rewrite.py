@@ -0,0 +1,55 @@
+"""
+Phrase rewrite rules for the local fallback simplifications.
+
+A RewriteRules object compiles an ordered list of (phrase, replacement) rules
+into one case-insensitive alternation and applies all of them in a single
+scan of the text. A rule's phrase is matched as whole words only, the same as
+wrapping it in \\b...\\b. When two rules match at the same position, the one
+listed first wins, so list longer phrases before their prefixes
+(e.g. "breached the duty of care owed to" before "breached").
+
+The rule sets ship in rewrite_rules.yaml, so new archaic-phrase rewrites can
+be added there without code changes.
+"""
+
+import re
+from typing import Dict, Iterable, Tuple
+
+import yaml
+
+
+class RewriteRules:
+    """An ordered set of whole-phrase rewrites applied in one pass."""
+
+    def __init__(self, rules: Iterable[Tuple[str, str]]):
+        self.rules = [(phrase, replacement) for phrase, replacement in rules]
+        self._regexes = [re.compile(rf"\b{re.escape(phrase)}\b", re.IGNORECASE) for phrase, _ in self.rules]
+        # Replacements are never rescanned, which only gives the same result as
+        # applying the rules one after another if no replacement contains a
+        # phrase that a later rule would rewrite.
+        for i, (phrase, replacement) in enumerate(self.rules):
+            for later, regex in zip(self.rules[i + 1:], self._regexes[i + 1:]):
+                if regex.search(replacement):
+                    raise ValueError(f"Rewrite of {phrase!r} to {replacement!r} would be rewritten again by {later[0]!r}")
+        self._replacements: Dict[str, str] = {f"r{i}": replacement for i, (_, replacement) in enumerate(self.rules)}
+        # \b(?:a|b)\b matches exactly what \ba\b|\bb\b does, but the word
+        # boundary is tested once per position instead of once per rule.
+        alternation = "|".join(f"(?P<r{i}>{re.escape(phrase)})" for i, (phrase, _) in enumerate(self.rules))
+        self._regex = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE) if self.rules else None
+
+    def _replace(self, m: re.Match) -> str:
+        return self._replacements[m.lastgroup]
+
+    def apply(self, text: str) -> str:
+        """Rewrite every rule phrase in `text`."""
+        if self._regex is None:
+            return text
+        return self._regex.sub(self._replace, text)
+
+
+def load_rules(path: str) -> Dict[str, RewriteRules]:
+    """Load named rule sets from a YAML file mapping set name -> {phrase: replacement}."""
+    with open(path, "r") as f:
+        data = yaml.safe_load(f) or {}
+    return {name: RewriteRules((str(p), str(r) if r is not None else "") for p, r in (rules or {}).items())
+            for name, rules in data.items()}
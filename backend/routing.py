@@ -0,0 +1,63 @@
+"""
+Tiered model routing for /simplify: a fast model answers first and the strong
+model is only called when that answer looks weak.
+"""
+
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List
+
+TIERS = ("fast", "strong")
+
+
+def weak_reasons(parse_confidence: str, category_overridden: bool, echoed: bool) -> List[str]:
+    """Why a fast-tier result should be escalated; empty if it can be served."""
+    reasons = []
+    if parse_confidence in ("low", "medium"):
+        reasons.append("low_confidence")
+    if category_overridden:
+        reasons.append("category_override")
+    if echoed:
+        reasons.append("echo")
+    return reasons
+
+
+class RoutingStats:
+    """Routing decisions, escalation reasons and per-tier latency over the last `window` calls."""
+
+    def __init__(self, window: int = 500):
+        self.fast_served = 0
+        self.escalated = 0
+        self.strong_only = 0
+        self.reasons: Counter = Counter()
+        self._latencies: Dict[str, Deque[float]] = {tier: deque(maxlen=window) for tier in TIERS}
+        self._calls = Counter()
+
+    def record_call(self, tier: str, seconds: float) -> None:
+        self._calls[tier] += 1
+        self._latencies[tier].append(seconds)
+
+    def record_escalation(self, reasons: List[str]) -> None:
+        self.escalated += 1
+        self.reasons.update(reasons)
+
+    def _tier_stats(self, tier: str) -> Dict[str, Any]:
+        samples = sorted(self._latencies[tier])
+        if not samples:
+            return {"calls": self._calls[tier], "avg_ms": None, "p50_ms": None, "p95_ms": None}
+        return {
+            "calls": self._calls[tier],
+            "avg_ms": sum(samples) / len(samples) * 1000,
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        routed = self.fast_served + self.escalated
+        return {
+            "fast_served": self.fast_served,
+            "escalated": self.escalated,
+            "strong_only": self.strong_only,
+            "escalation_rate": (self.escalated / routed) if routed else 0.0,
+            "escalation_reasons": dict(self.reasons),
+            "latency": {tier: self._tier_stats(tier) for tier in TIERS},
+        }
@@ -0,0 +1,89 @@
+"""
+Clause and sentence segmentation for long legal documents.
+
+Everything here is a generator over the input so a multi-hundred-KB document
+is walked once without building intermediate lists.
+"""
+
+import re
+from typing import Iterator
+
+# A sentence ends at . ! or ? (plus any closing quotes/brackets) followed by
+# whitespace and something that can start a sentence; blank lines always split.
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])([\"')\]”’]*)\s+(?=[\"'(\[“‘]?[A-Z0-9])|\n[ \t]*\n\s*")
+
+_ABBREVIATIONS = {
+    "inc", "ltd", "llc", "co", "corp", "no", "nos", "sec", "secs", "art", "para", "paras", "cl", "ch",
+    "e.g", "i.e", "etc", "vs", "v", "mr", "mrs", "ms", "dr", "st", "jr", "sr", "u.s", "u.s.c", "u.s.a",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "approx", "ex",
+}
+
+# Preferred places to break a single sentence that is longer than a chunk.
+_SOFT_BREAKS = ("; ", ": ", ", ", " ")
+
+
+def _is_false_boundary(text: str, start: int, period: int) -> bool:
+    """True for periods after abbreviations, initials, and clause numbers like "1." or "2.1"."""
+    token = text[max(start, period - 12):period].rsplit(None, 1)[-1:] or [""]
+    word = token[0].lstrip("(\"'").lower()
+    if word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+        return True
+    if period - start > 8:
+        return False
+    lead = text[start:period].strip()
+    return len(lead) <= 5 and lead.replace(".", "").isdigit()
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Yield the sentences and paragraphs of `text`, stripped, in order."""
+    start = 0
+    for m in _BOUNDARY_RE.finditer(text):
+        closing = m.group(1)
+        if closing is not None:
+            period = m.start(1) - 1
+            if text[period] == "." and _is_false_boundary(text, start, period):
+                continue
+            end = m.end(1)
+        else:
+            end = m.start()
+        sentence = text[start:end].strip()
+        if sentence:
+            yield sentence
+        start = m.end()
+    tail = text[start:].strip()
+    if tail:
+        yield tail
+
+
+def _split_long(sentence: str, max_chars: int) -> Iterator[str]:
+    while len(sentence) > max_chars:
+        window = sentence[:max_chars]
+        for sep in _SOFT_BREAKS:
+            cut = window.rfind(sep)
+            if cut > max_chars // 3:
+                cut += len(sep.rstrip())
+                break
+        else:
+            cut = max_chars
+        yield sentence[:cut].strip()
+        sentence = sentence[cut:].strip()
+    if sentence:
+        yield sentence
+
+
+def iter_chunks(text: str, max_chars: int) -> Iterator[str]:
+    """Pack consecutive sentences into chunks of at most `max_chars` characters.
+
+    Sentences are never reordered; one that is longer than a chunk is split at
+    the last clause separator (semicolon, colon, comma, then space) that fits.
+    """
+    current = ""
+    for sentence in iter_sentences(text):
+        for piece in _split_long(sentence, max_chars):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                yield current
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        yield current
@@ -0,0 +1,83 @@
+"""
+Incremental parsing of streamed classify_legal_area tool-call arguments, and
+Server-Sent Events formatting for /simplify/stream.
+"""
+
+import json
+import re
+from typing import Optional, Tuple
+
+_CATEGORY_RE = re.compile(r'"category"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_PLAIN_ENGLISH_RE = re.compile(r'"plain_english"\s*:\s*"')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _decode_partial_string(buf: str, start: int) -> Tuple[str, bool]:
+    """Decode a JSON string body beginning at `start` as far as `buf` allows.
+
+    Returns (decoded text, whether the closing quote was reached). An escape
+    sequence cut off by the end of the buffer is held back until more arrives.
+    """
+    out = []
+    i = start
+    n = len(buf)
+    while i < n:
+        ch = buf[i]
+        if ch == '"':
+            return "".join(out), True
+        if ch != "\\":
+            out.append(ch)
+            i += 1
+            continue
+        if i + 1 >= n:
+            break
+        esc = buf[i + 1]
+        if esc == "u":
+            if i + 6 > n:
+                break
+            code = int(buf[i + 2:i + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate: wait for its low half.
+                if i + 12 > n:
+                    break
+                low = int(buf[i + 8:i + 12], 16)
+                out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                i += 12
+                continue
+            out.append(chr(code))
+            i += 6
+            continue
+        out.append(_ESCAPES.get(esc, esc))
+        i += 2
+    return "".join(out), False
+
+
+class ToolArgsStream:
+    """Accumulates argument fragments and reports the category and new
+    plain_english text as soon as they can be read from the partial JSON."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.category: Optional[str] = None
+        self._emitted = 0
+
+    def feed(self, fragment: str) -> Tuple[Optional[str], str]:
+        """Add a fragment; return (category if it just became known, new translation text)."""
+        self.buffer += fragment
+        new_category = None
+        if self.category is None:
+            m = _CATEGORY_RE.search(self.buffer)
+            if m:
+                self.category = json.loads(f'"{m.group(1)}"')
+                new_category = self.category
+        delta = ""
+        m = _PLAIN_ENGLISH_RE.search(self.buffer)
+        if m:
+            text, _ = _decode_partial_string(self.buffer, m.end())
+            delta = text[self._emitted:]
+            self._emitted = len(text)
+        return new_category, delta
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,84 @@
+"""
+Single-pass multi-term matcher used by the keyword categorization rules.
+
+The rules in main.py ask "does this substring occur in the lowered text?" for
+well over a hundred terms. TermMatcher answers all of those questions from
+one whitespace split of the text:
+
+- A term without spaces can only occur inside a single whitespace-delimited
+  token, so the terms contained in each distinct token are looked up in a
+  memo (computed once per token with a trie-shaped regex) and unioned.
+- A multi-word term can only occur if each of its words occurs inside some
+  token, so only those candidates are confirmed with a substring check.
+
+The result is exactly the set of terms t for which `t in text` is true.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A term ends here; the greedy optional still prefers the longer term.
+            return body + "?" if len(branches) > 1 else "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class _TokenMemo(dict):
+    def __init__(self, matcher: "TermMatcher"):
+        super().__init__()
+        self._matcher = matcher
+
+    def __missing__(self, token: str) -> FrozenSet[str]:
+        value = self[token] = self._matcher._words_in(token)
+        return value
+
+
+class TermMatcher:
+    """Finds which of a fixed set of terms occur as substrings of a text."""
+
+    def __init__(self, terms: Iterable[str], memo_size: int = 50_000):
+        self.terms = frozenset(terms)
+        phrases = sorted(t for t in self.terms if len(t.split()) > 1 or t != t.strip())
+        self._phrases = [(p, frozenset(p.split())) for p in phrases]
+        words = (self.terms - set(phrases)) | {w for _, parts in self._phrases for w in parts}
+        # The scan reports the longest word starting at each position; shorter
+        # words nested inside it (e.g. "will" in "wills") are implied.
+        self._regex = re.compile("(?=(" + _trie_pattern(words) + "))")
+        self._implied = {w: frozenset(u for u in words if u in w) for w in words}
+        self._memo = _TokenMemo(self)
+        self._memo_size = memo_size
+
+    def _words_in(self, token: str) -> FrozenSet[str]:
+        longest = set(self._regex.findall(token))
+        if not longest:
+            return frozenset()
+        return frozenset().union(*(self._implied[w] for w in longest))
+
+    def find(self, lowered: str) -> FrozenSet[str]:
+        """Return every term that occurs as a substring of `lowered`."""
+        if len(self._memo) > self._memo_size:
+            self._memo.clear()
+        words = frozenset().union(*map(self._memo.__getitem__, set(lowered.split())))
+        found = words & self.terms
+        candidates = [p for p, parts in self._phrases if parts <= words and p in lowered]
+        return found.union(candidates) if candidates else found
+
+    def counts(self, found: FrozenSet[str], groups: Dict[str, FrozenSet[str]]) -> Dict[str, int]:
+        """Per-group hit counts (distinct terms) for a `find` result."""
+        return {name: len(found & terms) for name, terms in groups.items()}
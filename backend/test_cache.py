@@ -0,0 +1,117 @@
+import multiprocessing
+import sqlite3
+import time
+
+from cache import SQLiteCache, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_hit_and_miss_counts():
+    cache = TTLCache(maxsize=4, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", {"category": "Contract"})
+    assert cache.get("a") == {"category": "Contract"}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_zero_size_disables_caching():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path)
+    cache.set("k", {"category": "Contract", "parse_confidence": "high"})
+    cache.close()
+
+    reopened = SQLiteCache(path)
+    assert reopened.get("k") == {"category": "Contract", "parse_confidence": "high"}
+    assert reopened.get("missing") is None
+    assert reopened.stats()["hits"] == 1
+    assert reopened.stats()["misses"] == 1
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=3, evict_every=1)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        time.sleep(0.001)
+    cache.get("a")
+    cache.set("d", "d")
+    assert len(cache) == 3
+    assert "b" not in cache
+    assert "a" in cache
+
+
+def test_sqlite_cache_does_not_wait_out_a_locked_database(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path)
+    cache.set("k", "cached")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # another process mid-write
+
+    start = time.perf_counter()
+    assert cache.get("k") == "cached"
+    cache.set("new", "value")
+    elapsed = time.perf_counter() - start
+
+    other.rollback()
+    other.close()
+    assert elapsed < 1
+    assert cache.stats()["errors"] == 1
+    assert "new" not in cache
+
+
+def _write_entries(path, worker, count):
+    cache = SQLiteCache(path, busy_timeout=5.0)
+    for i in range(count):
+        cache.set(f"{worker}-{i}", {"n": i})
+    cache.close()
+
+
+def test_sqlite_cache_concurrent_writers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).close()
+    procs = [multiprocessing.Process(target=_write_entries, args=(path, w, 50)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+    cache = SQLiteCache(path)
+    assert len(cache) == 200
+    assert cache.stats()["errors"] == 0
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+
+import pytest
+from openai import AsyncOpenAI
+
+from cassette import Cassette, CassetteClient, CassetteMiss, request_key
+from fake_openai_server import FakeCompletionServer
+
+TOOLS = [{"type": "function", "function": {"name": "classify_legal_area", "parameters": {"type": "object"}}}]
+
+
+def request(text, model="gpt-5", system="You are a legal assistant."):
+    return {"model": model, "messages": [{"role": "system", "content": system}, {"role": "user", "content": text}],
+            "tools": TOOLS}
+
+
+def test_request_key_covers_model_prompt_and_input_only():
+    base = request_key(request("The tenant shall pay rent."))
+    assert base == request_key({**request("The tenant shall pay rent."), "max_completion_tokens": 10})
+    assert base != request_key(request("The tenant shall pay rent.", model="gpt-5-mini"))
+    assert base != request_key(request("The tenant shall pay rent.", system="Other prompt"))
+    assert base != request_key(request("The landlord shall pay rent."))
+
+
+def test_record_then_replay_offline(tmp_path):
+    cassette = Cassette(str(tmp_path))
+
+    async def record(base_url):
+        recorder = CassetteClient(AsyncOpenAI(api_key="test", base_url=base_url), cassette, "record")
+        plain = await recorder.chat.completions.create(**request("Clause one."))
+        stream = await recorder.chat.completions.create(**request("Clause two."), stream=True,
+                                                        stream_options={"include_usage": True})
+        async with stream:
+            async for _ in stream:
+                pass
+        await recorder.close()
+        return plain
+
+    async def replay():
+        # The inner client points nowhere: any network call would fail.
+        replayer = CassetteClient(AsyncOpenAI(api_key="test", base_url="http://127.0.0.1:9/v1"), cassette, "replay")
+        plain = await replayer.chat.completions.create(**request("Clause one."))
+        as_plain = await replayer.chat.completions.create(**request("Clause two."))
+        stream = await replayer.chat.completions.create(**request("Clause one."), stream=True)
+        arguments, usage = [], None
+        async with stream:
+            async for chunk in stream:
+                usage = chunk.usage or usage
+                for choice in chunk.choices:
+                    for tc in choice.delta.tool_calls or []:
+                        arguments.append(tc.function.arguments or "")
+        with pytest.raises(CassetteMiss):
+            await replayer.chat.completions.create(**request("Never recorded."))
+        return plain, as_plain, "".join(arguments), usage
+
+    with FakeCompletionServer(latency=0, chunk_delay=0) as server:
+        recorded = asyncio.run(record(server.base_url))
+        assert server.calls == 2
+    plain, as_plain, streamed_arguments, usage = asyncio.run(replay())
+
+    assert cassette.recorded == 2
+    assert plain.model_dump() == recorded.model_dump()
+    assert json.loads(as_plain.choices[0].message.tool_calls[0].function.arguments)["plain_english"] == "In plain terms: Clause two."
+    assert streamed_arguments == recorded.choices[0].message.tool_calls[0].function.arguments
+    assert usage.prompt_tokens == recorded.usage.prompt_tokens
+    assert len(os.listdir(tmp_path)) == 2
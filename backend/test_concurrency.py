@@ -0,0 +1,251 @@
+import asyncio
+
+import pytest
+
+from concurrency import AdmissionController, CircuitBreaker, DeadlineExceeded, Hedger, Overloaded, SingleFlight
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"category": "Contract"}
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == {"category": "Contract"} for r in results)
+    assert flight.coalesced == 4
+    assert len(flight) == 0
+
+
+def test_single_flight_propagates_errors_to_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) and str(r) == "upstream down" for r in results)
+
+
+def test_single_flight_survives_leader_cancellation():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        flight = SingleFlight()
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_admission_caps_inflight_and_queues_in_order():
+    order = []
+
+    async def call(controller, i):
+        async with controller.slot():
+            order.append(i)
+            await asyncio.sleep(0.02)
+
+    async def run():
+        controller = AdmissionController(max_inflight=2, max_queue=10, queue_timeout=5)
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, controller.inflight)
+                await asyncio.sleep(0.001)
+
+        watcher = asyncio.ensure_future(watch())
+        await asyncio.gather(*(call(controller, i) for i in range(6)))
+        watcher.cancel()
+        return controller, peak
+
+    controller, peak = asyncio.run(run())
+    assert peak == 2
+    assert order == list(range(6))
+    stats = controller.stats()
+    assert stats["inflight"] == 0 and stats["queue_depth"] == 0
+    assert stats["admitted"] == 6 and stats["queued"] == 4
+
+
+def test_admission_sheds_when_queue_is_full_or_wait_times_out():
+    async def run():
+        controller = AdmissionController(max_inflight=1, max_queue=1, queue_timeout=0.05)
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await controller.acquire()
+        with pytest.raises(Overloaded) as timed_out:
+            await waiter
+        controller.release()
+        return controller, full.value, timed_out.value
+
+    controller, full, timed_out = asyncio.run(run())
+    assert full.reason == "queue full" and full.retry_after >= 1
+    assert timed_out.reason == "queue timeout"
+    assert controller.stats()["shed_queue_full"] == 1
+    assert controller.stats()["shed_timeout"] == 1
+    assert controller.inflight == 0
+
+
+def test_admission_configure_admits_waiters_and_cancelled_waiters_leave_the_queue():
+    async def run():
+        controller = AdmissionController(max_inflight=1, max_queue=5, queue_timeout=5)
+        await controller.acquire()
+        cancelled = asyncio.ensure_future(controller.acquire())
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        depth_after_cancel = controller.stats()["queue_depth"]
+        controller.configure(max_inflight=2)
+        await asyncio.wait_for(waiting, 1)
+        return controller, depth_after_cancel
+
+    controller, depth_after_cancel = asyncio.run(run())
+    assert depth_after_cancel == 1
+    assert controller.inflight == 2
+    assert controller.stats()["queue_depth"] == 0
+
+
+def test_circuit_breaker_opens_probes_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure("timeout")
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure("still down")
+    assert breaker.state == "open"
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.release()  # probe shed before reaching upstream
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert [t["to"] for t in breaker.transitions] == ["open", "half_open", "open", "half_open", "closed"]
+    assert breaker.stats()["served_degraded"] == 2
+
+
+def _warm_hedger(max_ratio, latency=0.01, samples=20):
+    hedger = Hedger(percentile=90, max_ratio=max_ratio, burst=1, min_samples=samples)
+    hedger.latencies.extend([latency] * samples)
+    hedger._tokens = 1
+    return hedger
+
+
+def test_hedger_second_attempt_wins_and_loser_is_cancelled():
+    started, cancelled = [], []
+
+    async def call(timeout):
+        n = len(started)
+        started.append(timeout)
+        try:
+            await asyncio.sleep(1.0 if n == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return n
+
+    async def run():
+        hedger = _warm_hedger(max_ratio=0.5)
+        begin = asyncio.get_running_loop().time()
+        result = await hedger.run(call, deadline=5, attempt_timeout=2)
+        elapsed = asyncio.get_running_loop().time() - begin
+        await asyncio.sleep(0)
+        return hedger, result, elapsed
+
+    hedger, result, elapsed = asyncio.run(run())
+    assert result == 1
+    assert elapsed < 0.5
+    assert cancelled == [0]
+    assert started[0] == 2
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+def test_hedger_budget_caps_extra_calls():
+    calls = []
+
+    async def slow(timeout):
+        calls.append(1)
+        await asyncio.sleep(0.03)
+        return "ok"
+
+    async def run():
+        hedger = Hedger(percentile=50, max_ratio=0.2, min_samples=1, burst=1)
+        hedger.latencies.append(0.001)
+        for _ in range(20):
+            await hedger.run(slow, deadline=1, attempt_timeout=1)
+        return hedger
+
+    hedger = asyncio.run(run())
+    assert hedger.hedges <= 0.2 * 20
+    assert len(calls) == 20 + hedger.hedges
+    assert hedger.hedges_skipped > 0
+
+
+def test_hedger_retries_early_failures_but_not_overload():
+    async def run(error):
+        attempts = []
+
+        async def flaky(timeout):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise error
+            return "ok"
+
+        hedger = _warm_hedger(max_ratio=1.0)
+        try:
+            return await hedger.run(flaky, deadline=1, attempt_timeout=1), len(attempts)
+        except Exception as e:
+            return e, len(attempts)
+
+    assert asyncio.run(run(RuntimeError("reset"))) == ("ok", 2)
+    result, attempts = asyncio.run(run(Overloaded("queue full", 1)))
+    assert isinstance(result, Overloaded) and attempts == 1
+
+
+def test_hedger_enforces_overall_deadline():
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    async def run():
+        hedger = Hedger(max_ratio=0)
+        begin = asyncio.get_running_loop().time()
+        with pytest.raises(DeadlineExceeded):
+            await hedger.run(hang, deadline=0.05, attempt_timeout=1)
+        return hedger, asyncio.get_running_loop().time() - begin
+
+    hedger, elapsed = asyncio.run(run())
+    assert elapsed < 0.5
+    assert hedger.stats()["deadline_exceeded"] == 1
@@ -0,0 +1,61 @@
+import json
+import time
+
+import enhanced_eval
+from enhanced_eval import RateBudget, run_comprehensive_eval
+from judge import Judge
+
+
+def test_rate_budget_bursts_then_paces_at_the_backend_rate():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    budget = RateBudget(limit=3, period=6.0, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        budget.acquire()
+    assert sleeps == [2.0, 2.0]
+    assert now[0] == 4.0
+
+
+def test_eval_runs_concurrently_in_sample_order_with_same_schema(tmp_path, monkeypatch):
+    samples = [{"input": f"Clause {i}", "expected_category": "Contract" if i % 2 else "Real Estate"} for i in range(8)]
+
+    def fake_backend(payload, budget=None):
+        i = int(payload["text"].split()[-1])
+        time.sleep(0.1 if i % 3 == 0 else 0.02)  # finish out of order
+        if i == 5:
+            raise RuntimeError("backend down")
+        return {"category": "Contract", "response": f"Plain {i}"}
+
+    def fake_judge(original, translation):
+        time.sleep(0.05)
+        return 4
+
+    monkeypatch.setattr(enhanced_eval, "backend_request_with_retries", fake_backend)
+    monkeypatch.setattr(enhanced_eval, "evaluate_translation_quality", fake_judge)
+    monkeypatch.setattr(enhanced_eval, "SKIP_QUALITY", False)
+    monkeypatch.setattr(enhanced_eval, "EVAL_RATE_LIMIT_REQUESTS", 0)
+    monkeypatch.setattr(enhanced_eval, "EVAL_RESULTS_PATH", str(tmp_path / "results.json"))
+    monkeypatch.setattr(enhanced_eval, "EVAL_JUDGE_CACHE_PATH", str(tmp_path / "judge_cache.db"))
+    monkeypatch.setattr(enhanced_eval, "judge", Judge(None, "gpt-4"))
+
+    start = time.perf_counter()
+    results = run_comprehensive_eval(samples, workers=8, judge_workers=8)
+    elapsed = time.perf_counter() - start
+
+    # Serially this would take about 0.3 + 0.1 + 7 * 0.05 seconds.
+    assert elapsed < 0.5
+    assert [r["input"] for r in results] == [s["input"] for s in samples]
+    assert results[5]["error"] == "backend down"
+    assert results[1]["quality_score"] == 4 and results[1]["category_correct"] is True
+    saved = json.loads((tmp_path / "results.json").read_text())
+    assert saved["summary"]["category_correct"] == 3
+    assert saved["results"] == results
+    assert (tmp_path / "judge_cache.db").exists()  # opened by the run, not by importing enhanced_eval
+    enhanced_eval.judge.cache.close()
+    assert set(saved["results"][0]) == {"input", "expected_category", "predicted_category", "category_correct",
+                                        "translation", "quality_score"}
@@ -0,0 +1,68 @@
+import pytest
+import yaml
+
+import main
+from eval_harness import ReplayIncomplete, run, synthetic_samples
+from segmentation import iter_sentences
+
+with open("category_eval_samples.yaml") as f:
+    SAMPLES = yaml.safe_load(f)["samples"]
+
+
+def fresh_pipeline():
+    main.response_cache.clear()
+    main.breaker.reset()
+
+
+def test_synthetic_samples_are_distinct_and_keep_labels():
+    expanded = synthetic_samples(SAMPLES, 100)
+    assert len({s["input"] for s in expanded}) == 100
+    assert expanded[len(SAMPLES)]["expected_category"] == SAMPLES[0]["expected_category"]
+    assert all(len(list(iter_sentences(s["input"]))) == len(list(iter_sentences(SAMPLES[i % len(SAMPLES)]["input"])))
+               for i, s in enumerate(expanded))
+
+
+def test_direct_and_asgi_transports_agree_and_time_each_stage():
+    samples = synthetic_samples(SAMPLES, 300)
+    fresh_pipeline()
+    direct = run(samples, model="stub", transport="direct", concurrency=32)
+    fresh_pipeline()
+    asgi = run(samples, model="stub", transport="asgi", concurrency=32)
+    fresh_pipeline()
+
+    assert direct["summary"]["errors"] == 0
+    assert [r["predicted_category"] for r in direct["results"]] == [r["predicted_category"] for r in asgi["results"]]
+    assert direct["summary"]["accuracy"] == asgi["summary"]["accuracy"] > 0.5
+    assert [r["input"] for r in direct["results"]] == [s["input"] for s in samples]
+    stages = direct["stages"]
+    assert stages["request"]["calls"] == stages["local_rules"]["calls"] == 300
+    assert 0 < stages["model_call"]["calls"] <= 300
+    assert stages["validate"]["calls"] == 300
+    # One lookup per input: synthetic copies never go through clause stitching.
+    assert stages["cache_lookup"]["calls"] == 300
+    # Instrumentation is removed afterwards.
+    assert not hasattr(main.local_classification, "__wrapped__")
+
+
+def test_stub_runs_leave_the_persistent_cache_alone(tmp_path, monkeypatch):
+    from cache import SQLiteCache
+
+    shared = SQLiteCache(str(tmp_path / "translation_cache.db"))
+    monkeypatch.setattr(main, "persistent_cache", shared)
+    fresh_pipeline()
+    run(synthetic_samples(SAMPLES, 20), model="stub")
+    fresh_pipeline()
+
+    assert main.persistent_cache is shared
+    assert len(shared) == 0
+    assert shared.hits + shared.misses == 0
+    shared.close()
+
+
+def test_replay_fails_loudly_on_missing_recordings(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "MODEL_CASSETTE_DIR", str(tmp_path))
+    fresh_pipeline()
+    with pytest.raises(ReplayIncomplete):
+        run(SAMPLES, model="replay", concurrency=4)
+    assert main.breaker.state == main.breaker.CLOSED
+    fresh_pipeline()
@@ -0,0 +1,65 @@
+import json
+from types import SimpleNamespace
+
+from cache import SQLiteCache
+from judge import Judge
+
+
+class FakeJudgeClient:
+    """Synchronous stand-in for OpenAI: scores by translation length, batches via structured output."""
+
+    def __init__(self, drop_ids=()):
+        self.calls = []
+        self.drop_ids = set(drop_ids)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        prompt = kwargs["messages"][0]["content"]
+        if "response_format" in kwargs:
+            items = prompt.split("\n\n[")[1:]
+            scores = [{"id": n, "score": 4} for n in range(len(items)) if n not in self.drop_ids]
+            content = json.dumps({"scores": scores})
+        else:
+            content = "5"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                               usage=SimpleNamespace(total_tokens=100))
+
+
+def test_scores_are_cached_across_runs(tmp_path):
+    path = str(tmp_path / "judge.db")
+    client = FakeJudgeClient()
+    first = Judge(client, "gpt-4", SQLiteCache(path))
+    assert first.score("The lessee shall pay.", "The tenant pays.") == 5
+
+    second = Judge(client, "gpt-4", SQLiteCache(path))
+    assert second.score("The lessee shall pay.", "The tenant pays.") == 5
+    assert second.score("The lessee shall pay.", "The tenant must pay.") == 5
+    assert len(client.calls) == 2
+    stats = second.stats()
+    assert stats["cache_hits"] == 1 and stats["requests"] == 1 and stats["requests_saved"] == 1
+    assert stats["tokens_saved_estimate"] == 100
+
+    # A different judge model grades again.
+    Judge(client, "gpt-5", SQLiteCache(path)).score("The lessee shall pay.", "The tenant pays.")
+    assert len(client.calls) == 3
+
+
+def test_batch_grades_uncached_pairs_in_one_request_and_falls_back_for_missing_ids():
+    client = FakeJudgeClient(drop_ids={2})
+    judge = Judge(client, "gpt-4")
+    pairs = [(f"Original {i}", f"Translation {i}") for i in range(4)]
+    assert judge.score_batch(pairs) == [4, 4, 5, 4]
+    assert [("response_format" in c) for c in client.calls] == [True, False]
+    assert judge.stats()["requests_saved"] == 2
+
+
+def test_failed_judge_calls_are_not_cached(tmp_path):
+    def broken(**kwargs):
+        raise RuntimeError("judge down")
+
+    cache = SQLiteCache(str(tmp_path / "judge.db"))
+    judge = Judge(SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=broken))), "gpt-4", cache)
+    assert judge.score("a", "b") == 3
+    assert len(cache) == 0
+    assert judge.stats()["failures"] == 1
@@ -1,15 +1,24 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
-from main import app, check_rate_limit, request_timestamps
+from unittest.mock import patch, MagicMock, AsyncMock
+from main import app, breaker, check_rate_limit, rate_limiter, response_cache
 import time
+import json
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    response_cache.clear()
+    breaker.reset()
+    yield
+    response_cache.clear()
+    breaker.reset()
+
 def test_health():
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    assert response.json() == {"status": "ok", "circuit": "closed"}
 
 def test_health_wrong_method():
     response = client.post("/health")
@@ -45,7 +54,7 @@ def test_simplify_malformed_json(monkeypatch, caplog):
         def __init__(self):
             self.message = FakeMessage()
     fake_client = MagicMock()
-    fake_client.chat.completions.create.return_value = type("FakeResponse", (), {"choices": [FakeChoices()]})()
+    fake_client.chat.completions.create = AsyncMock(return_value=type("FakeResponse", (), {"choices": [FakeChoices()]})())
 
     with patch("main.client", fake_client):
         payload = {"text": "Some legalese"}
@@ -58,7 +67,7 @@ def test_simplify_malformed_json(monkeypatch, caplog):
             assert any("Parse Error" in record.message for record in caplog.records)
 
 def test_simplify_openai_error(monkeypatch, caplog):
-    def raise_exception(*args, **kwargs):
+    async def raise_exception(*args, **kwargs):
         raise Exception("OpenAI API failed")
     with patch("main.client.chat.completions.create", raise_exception):
         payload = {"text": "Some legalese"}
@@ -98,7 +107,7 @@ def test_cors_headers():
 def test_rate_limit_function():
     """Test the rate limiting function directly"""
     
-    request_timestamps.clear()
+    rate_limiter.clear()
     
     client_id = "test_client"
   
@@ -108,11 +117,11 @@ def test_rate_limit_function():
     
     assert check_rate_limit(client_id, max_requests=2, window_minutes=1) == False
     
-    request_timestamps.clear()
+    rate_limiter.clear()
 
 def test_rate_limit_window_expiry():
     """Test that rate limit resets after time window"""
-    request_timestamps.clear()
+    rate_limiter.clear()
     
     client_id = "test_client_2"
 
@@ -128,11 +137,11 @@ def test_rate_limit_window_expiry():
 
         assert check_rate_limit(client_id, max_requests=2, window_minutes=1) == True
     
-    request_timestamps.clear()
+    rate_limiter.clear()
 
 def test_rate_limit_multiple_clients():
     """Test that rate limiting is per-client"""
-    request_timestamps.clear()
+    rate_limiter.clear()
     
     client1 = "client_1"
     client2 = "client_2"
@@ -143,11 +152,11 @@ def test_rate_limit_multiple_clients():
     assert check_rate_limit(client1, max_requests=1, window_minutes=1) == False
     assert check_rate_limit(client2, max_requests=1, window_minutes=1) == False
     
-    request_timestamps.clear()
+    rate_limiter.clear()
 
 def test_simplify_rate_limiting():
     """Test rate limiting on the /simplify endpoint"""
-    request_timestamps.clear()
+    rate_limiter.clear()
 
     with patch('main.check_rate_limit', return_value=False):
         payload = {"text": "The party of the first part shall indemnify the party of the second part."}
@@ -155,11 +164,11 @@ def test_simplify_rate_limiting():
         assert response.status_code == 429
         assert "Too many requests" in response.json()["detail"]
     
-    request_timestamps.clear()
+    rate_limiter.clear()
 
 def test_simplify_rate_limiting_allows_when_under_limit():
     """Test that requests are allowed when under rate limit"""
-    request_timestamps.clear()
+    rate_limiter.clear()
 
     with patch('main.check_rate_limit', return_value=True):
 
@@ -173,7 +182,7 @@ def test_simplify_rate_limiting_allows_when_under_limit():
         mock_tool_call.function.arguments = '{"category": "Contract", "plain_english": "Test translation"}'
         mock_response.choices[0].message.tool_calls = [mock_tool_call]
         
-        with patch('main.client.chat.completions.create', return_value=mock_response):
+        with patch('main.client.chat.completions.create', new_callable=AsyncMock, return_value=mock_response):
             payload = {"text": "The party of the first part shall indemnify the party of the second part."}
             response = client.post("/simplify", json=payload)
             assert response.status_code == 200
@@ -181,7 +190,7 @@ def test_simplify_rate_limiting_allows_when_under_limit():
             assert "response" in data
             assert "category" in data
     
-    request_timestamps.clear()
+    rate_limiter.clear()
 
 def test_metrics_endpoint():
     """Test the /metrics endpoint"""
@@ -199,11 +208,11 @@ def test_metrics_endpoint():
 
 def test_metrics_with_request_data():
     """Test metrics endpoint with some request data"""
-    request_timestamps.clear()
+    rate_limiter.clear()
 
-    request_timestamps["client1"] = [time.time(), time.time() - 30]
-    request_timestamps["client2"] = [time.time() - 10]
-    request_timestamps["client3"] = []
+    check_rate_limit("client1")
+    check_rate_limit("client1")
+    check_rate_limit("client2")
     
     response = client.get("/metrics")
     assert response.status_code == 200
@@ -214,7 +223,7 @@ def test_metrics_with_request_data():
     assert data["active_clients"] == 2
     assert data["server_status"] == "healthy"
     
-    request_timestamps.clear()
+    rate_limiter.clear()
 
 def test_metrics_endpoint_wrong_method():
     """Test that metrics endpoint only accepts GET"""
@@ -258,7 +267,7 @@ def test_simplify_input_validation_valid_input():
         mock_tool_call.function.arguments = '{"category": "Contract", "plain_english": "Valid test translation"}'
         mock_response.choices[0].message.tool_calls = [mock_tool_call]
         
-        with patch('main.client.chat.completions.create', return_value=mock_response):
+        with patch('main.client.chat.completions.create', new_callable=AsyncMock, return_value=mock_response):
             payload = {"text": "This is a valid legal text that is long enough to pass validation."}
             response = client.post("/simplify", json=payload)
             assert response.status_code == 200
@@ -276,7 +285,7 @@ def test_simplify_response_includes_new_fields():
         mock_tool_call.function.arguments = '{"category": "Contract", "plain_english": "Test translation"}'
         mock_response.choices[0].message.tool_calls = [mock_tool_call]
         
-        with patch('main.client.chat.completions.create', return_value=mock_response):
+        with patch('main.client.chat.completions.create', new_callable=AsyncMock, return_value=mock_response):
             payload = {"text": "The party of the first part shall indemnify and hold harmless the party of the second part."}
             response = client.post("/simplify", json=payload)
             assert response.status_code == 200
@@ -300,7 +309,7 @@ def test_simplify_confidence_medium_for_short_text():
         mock_tool_call.function.arguments = '{"category": "Contract", "plain_english": "Test translation"}'
         mock_response.choices[0].message.tool_calls = [mock_tool_call]
 
-        with patch('main.client.chat.completions.create', return_value=mock_response):
+        with patch('main.client.chat.completions.create', new_callable=AsyncMock, return_value=mock_response):
 
             payload = {"text": "This legal contract has exactly ten words in total here."}
             response = client.post("/simplify", json=payload)
@@ -308,4 +317,681 @@ def test_simplify_confidence_medium_for_short_text():
             data = response.json()
             
             assert data["confidence"] == "medium"
-            assert data["word_count"] == 10
\ No newline at end of file
+            assert data["word_count"] == 10
+
+def test_simplify_overlaps_concurrent_model_calls():
+    """Concurrent /simplify requests should not serialize behind the model call"""
+    import asyncio
+    import httpx
+    from openai import AsyncOpenAI
+    from fake_openai_server import FakeCompletionServer
+
+    async def fire(n):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            texts = [f"The tenant shall pay rent on day {i} of each month." for i in range(n)]
+            return await asyncio.gather(*(http.post("/simplify", json={"text": t}) for t in texts))
+
+    with FakeCompletionServer(latency=0.3) as server:
+        fake_client = AsyncOpenAI(api_key="test", base_url=server.base_url)
+        with patch("main.client", fake_client), patch("main.check_rate_limit", return_value=True):
+            start = time.time()
+            responses = asyncio.run(fire(10))
+            elapsed = time.time() - start
+
+    assert all(r.status_code == 200 for r in responses)
+    assert server.calls == 10
+    assert elapsed < 1.5
+
+def _tool_call_response(arguments):
+    mock_tool_call = MagicMock()
+    mock_tool_call.type = "function"
+    mock_tool_call.function.arguments = arguments
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.tool_calls = [mock_tool_call]
+    return mock_response
+
+def test_simplify_serves_repeat_text_from_cache():
+    """Repeated text (modulo whitespace and case) is answered without a second model call"""
+    mock_response = _tool_call_response('{"category": "Contract", "plain_english": "Deadlines in this agreement are strict."}')
+
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, return_value=mock_response) as create:
+        first = client.post("/simplify", json={"text": "Time is of the essence in this Agreement."})
+        second = client.post("/simplify", json={"text": "  time is of the  essence in this agreement. "})
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert create.await_count == 1
+    assert second.json() == first.json()
+    assert second.json()["parse_confidence"] == "high"
+
+    stats = client.get("/metrics").json()["response_cache"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_simplify_served_from_persistent_cache_after_restart(tmp_path):
+    """The SQLite tier answers after the in-process cache has been emptied"""
+    from cache import SQLiteCache
+
+    mock_response = _tool_call_response('{"category": "Real Estate", "plain_english": "The property is sold in its current condition."}')
+
+    disk_cache = SQLiteCache(str(tmp_path / "translations.db"))
+    with patch('main.persistent_cache', disk_cache), patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, return_value=mock_response) as create:
+        first = client.post("/simplify", json={"text": "Subject property is sold 'as is' with all faults."})
+        response_cache.clear()
+        second = client.post("/simplify", json={"text": "Subject property is sold 'as is' with all faults."})
+        metrics = client.get("/metrics").json()
+
+    assert create.await_count == 1
+    assert second.json() == first.json()
+    assert metrics["persistent_cache"]["hits"] == 1
+    disk_cache.close()
+
+def test_simplify_coalesces_identical_concurrent_requests():
+    """Identical texts in flight together trigger a single model call"""
+    import asyncio
+    import httpx
+
+    mock_response = _tool_call_response('{"category": "Criminal Procedure", "plain_english": "Police need good reason before getting a search warrant."}')
+
+    async def slow_create(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return mock_response
+
+    async def fire():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            payload = {"text": "Probable cause must exist before a search warrant may be issued."}
+            return await asyncio.gather(*(http.post("/simplify", json=payload) for _ in range(5)))
+
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=slow_create) as create, \
+         patch('main.inflight.coalesced', 0):
+        responses = asyncio.run(fire())
+        coalesced = client.get("/metrics").json()["coalesced_requests"]
+
+    assert create.await_count == 1
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.text for r in responses}) == 1
+    assert coalesced == 4
+
+def test_simplify_batch_preserves_order_and_deduplicates():
+    """Batch results follow input order and duplicate texts share one model call"""
+    async def fake_create(*args, **kwargs):
+        text = kwargs["messages"][-1]["content"]
+        return _tool_call_response(json.dumps({"category": "Contract", "plain_english": f"Simplified: {text}"}))
+
+    texts = [
+        "The party of the first part shall indemnify the party of the second part.",
+        "Time is of the essence in the performance of all obligations.",
+        "the party of the first part shall  indemnify the party of the second part.",
+    ]
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=fake_create) as create:
+        response = client.post("/simplify/batch", json={"texts": texts})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert create.await_count == 2
+    assert data["count"] == 3
+    assert data["unique"] == 2
+    assert data["results"][0]["response"] == f"Simplified: {texts[0]}"
+    assert data["results"][1]["response"] == f"Simplified: {texts[1]}"
+    assert data["results"][2] == data["results"][0]
+    assert set(data["results"][1]) == {"response", "category", "confidence", "word_count", "parse_confidence"}
+
+def test_simplify_batch_reports_item_errors_without_failing():
+    """Invalid or failing items carry an error while the rest of the batch succeeds"""
+    async def fake_create(*args, **kwargs):
+        text = kwargs["messages"][-1]["content"]
+        if "explode" in text:
+            raise Exception("OpenAI API failed")
+        return _tool_call_response('{"category": "Employment Law", "plain_english": "Workers get 30 days notice."}')
+
+    texts = ["Too short", "Employer shall provide thirty days written notice.", "This clause will explode upstream."]
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=fake_create):
+        response = client.post("/simplify/batch", json={"texts": texts})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert "Input too short" in results[0]["error"]
+    assert results[1]["category"] == "Employment Law"
+    assert results[2] == {"error": "OpenAI API failed"}
+    assert response.json()["errors"] == 2
+
+def test_simplify_batch_validation():
+    """The batch itself must be a non-empty list of strings"""
+    assert client.post("/simplify/batch", json={"texts": []}).status_code == 422
+    assert client.post("/simplify/batch", json={}).status_code == 422
+    assert client.post("/simplify/batch", json={"texts": ["ok"] * 101}).status_code == 422
+
+def test_simplify_batch_costs_one_rate_limit_token_per_distinct_text():
+    """A batch cannot buy many model calls with a single rate-limit token"""
+    rate_limiter.clear()
+    texts = [f"The tenant shall pay rent {i}." for i in range(3)]
+    with patch('main.RATE_LIMIT_REQUESTS', 4), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Contract", "plain_english": "ok"}')):
+        first = client.post("/simplify/batch", json={"texts": texts + texts})
+        second = client.post("/simplify/batch", json={"texts": texts[:2]})
+        too_big = client.post("/simplify/batch", json={"texts": [f"The landlord shall repair item {i}." for i in range(5)]})
+    rate_limiter.clear()
+    assert first.status_code == 200 and first.json()["unique"] == 3
+    assert second.status_code == 429
+    assert too_big.status_code == 413
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_simplify_stream_emits_category_deltas_and_final_payload():
+    """The stream carries the category early, translation deltas, then the post-processed payload"""
+    from openai import AsyncOpenAI
+    from fake_openai_server import FakeCompletionServer
+
+    text = "Employer shall provide thirty (30) days written notice prior to any reduction in force."
+    with FakeCompletionServer(latency=0.05, chunk_delay=0.001, chunk_size=7) as server:
+        fake_client = AsyncOpenAI(api_key="test", base_url=server.base_url)
+        with patch("main.client", fake_client), patch("main.check_rate_limit", return_value=True):
+            response = client.post("/simplify/stream", json={"text": text})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "category"
+    assert events[0][1] == {"category": "Other Legal"}
+    assert names.count("delta") > 3
+    assert names[-1] == "done"
+    assert "".join(data["text"] for name, data in events if name == "delta") == "In plain terms: " + text
+    final = events[-1][1]
+    assert final["category"] == "Employment Law"
+    assert final["parse_confidence"] == "adjusted"
+    assert final["word_count"] == len(text.split())
+
+def test_simplify_stream_reports_upstream_errors():
+    """Upstream failures become an error event instead of a broken stream"""
+    async def raise_exception(*args, **kwargs):
+        raise Exception("OpenAI API failed")
+    with patch("main.client.chat.completions.create", raise_exception), patch("main.check_rate_limit", return_value=True):
+        response = client.post("/simplify/stream", json={"text": "Some legalese that fails"})
+    assert _parse_sse(response.text) == [("error", {"detail": "OpenAI API failed"})]
+
+def test_simplify_document_translates_chunks_concurrently_in_order():
+    """Long documents are chunked, translated in parallel, and reassembled in order"""
+    import asyncio
+    import main
+
+    async def fake_create(*args, **kwargs):
+        text = kwargs["messages"][-1]["content"]
+        await asyncio.sleep(0.2)
+        category = "Employment Law" if "employee" in text.lower() else "Contract"
+        return _tool_call_response(json.dumps({"category": category, "plain_english": f"[{text[:20]}]"}))
+
+    clauses = [f"Section {i}. The employee shall report to the employer on day {i} of the month." for i in range(60)]
+    clauses += [f"Section {i}. This Agreement binds the parties and their assigns as of item {i}." for i in range(60, 70)]
+    document = " ".join(clauses)
+    assert len(document) > 2000
+
+    with patch('main.check_rate_limit', return_value=True), patch('main.DOCUMENT_CHUNK_CHARS', 400), \
+         patch('main.RATE_LIMIT_REQUESTS', 100), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=fake_create) as create:
+        start = time.time()
+        response = client.post("/simplify/document", json={"text": document})
+        elapsed = time.time() - start
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["chunk_count"] == create.await_count > main.DOCUMENT_CONCURRENCY // 2
+    assert [c["index"] for c in data["chunks"]] == list(range(data["chunk_count"]))
+    assert " ".join(c["text"] for c in data["chunks"]) == document
+    assert data["chunks"][0]["category"] == "Employment Law"
+    assert data["chunks"][-1]["category"] == "Contract"
+    assert data["category"] == "Employment Law"
+    assert data["errors"] == 0
+    assert elapsed < 0.2 * data["chunk_count"] / 2
+
+def test_simplify_document_validation():
+    assert client.post("/simplify/document", json={"text": "short"}).status_code == 422
+    assert client.post("/simplify/document", json={"text": "A" * 500001}).status_code == 422
+
+def test_simplify_document_costs_one_rate_limit_token_per_chunk():
+    """A long document is charged for every chunk it sends to the model"""
+    rate_limiter.clear()
+    document = " ".join(f"Section {i}. The employee shall report to the employer on day {i}." for i in range(40))
+    with patch('main.RATE_LIMIT_REQUESTS', 6), patch('main.DOCUMENT_CHUNK_CHARS', 400), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Employment Law", "plain_english": "ok"}')) as create:
+        first = client.post("/simplify/document", json={"text": document[:1500]})
+        second = client.post("/simplify/document", json={"text": document[:1500]})
+        too_long = client.post("/simplify/document", json={"text": document})
+    rate_limiter.clear()
+    assert first.status_code == 200 and first.json()["chunk_count"] == 4
+    assert second.status_code == 429
+    assert too_long.status_code == 413
+    assert create.await_count == 4
+
+def test_simplify_reuses_cached_clauses_inside_longer_text():
+    """Only clauses missing from the cache are sent to the model; the rest are stitched in"""
+    async def fake_create(*args, **kwargs):
+        text = kwargs["messages"][-1]["content"]
+        return _tool_call_response(json.dumps({"category": "Contract", "plain_english": f"<{text}>"}))
+
+    boilerplate = "This Agreement shall be binding upon the heirs, successors, and assigns of the parties."
+    new_terms = "The supplier shall deliver goods within ten days. Payment is due on delivery."
+    clause_stats = {"lookups": 0, "lookup_hits": 0, "stitched_requests": 0, "clauses": 0, "clauses_from_cache": 0}
+    with patch('main.check_rate_limit', return_value=True), patch('main.clause_stats', clause_stats), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=fake_create) as create:
+        client.post("/simplify", json={"text": boilerplate})
+        response = client.post("/simplify", json={"text": f"{boilerplate} {new_terms}"})
+        repeat = client.post("/simplify", json={"text": f"{boilerplate} {new_terms}"})
+        all_metrics = client.get("/metrics").json()
+        metrics = all_metrics["clause_cache"]
+
+    assert response.status_code == 200
+    data = response.json()
+    assert create.await_count == 2
+    assert create.await_args.kwargs["messages"][-1]["content"] == new_terms
+    assert data["response"] == f"<{boilerplate}> <{new_terms}>"
+    assert data["category"] == "Contract"
+    assert data["clause_cache_ratio"] == pytest.approx(1 / 3)
+    assert metrics["clauses_from_cache"] == 1
+    assert metrics["clauses"] == 3
+    # Three clauses, then the two uncached ones again when their gap is translated.
+    assert metrics["lookups"] == 5 and metrics["lookup_hits"] == 1
+    # The exact repeat is a plain hit: no stale stitching ratio, and clause lookups are not counted as misses.
+    assert repeat.json()["response"] == data["response"]
+    assert "clause_cache_ratio" not in repeat.json()
+    assert all_metrics["response_cache"]["hits"] == 1
+    assert all_metrics["response_cache"]["misses"] == 2
+
+def test_simplify_stitched_clauses_skip_the_local_non_legal_answer():
+    """An uncached clause without legal terms goes to the model instead of being answered as Non-Legal"""
+    async def fake_create(*args, **kwargs):
+        text = kwargs["messages"][-1]["content"]
+        return _tool_call_response(json.dumps({"category": "Contract", "plain_english": f"<{text}>"}))
+
+    contract = "The party of the first part shall indemnify the party of the second part."
+    schedule = "Payment is due every Friday at noon."
+    with patch('main.check_rate_limit', return_value=True), patch('main.LOCAL_CLASSIFIER_THRESHOLD', 0), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=fake_create) as create:
+        client.post("/simplify", json={"text": contract})
+        response = client.post("/simplify", json={"text": f"{contract} {schedule}"})
+
+    data = response.json()
+    assert create.await_count == 2
+    assert data["response"] == f"<{contract}> <{schedule}>"
+    assert data["parse_confidence"] != "local"
+
+def test_simplify_answers_obvious_non_legal_locally():
+    """With the fast path on, text without any legal signal is answered Non-Legal without a model call"""
+    with patch('main.check_rate_limit', return_value=True), patch('main.LOCAL_CLASSIFIER_THRESHOLD', 0), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock) as create:
+        response = client.post("/simplify", json={"text": "The weather is really nice today."})
+    assert response.status_code == 200
+    assert create.await_count == 0
+    assert response.json() == {
+        "response": "This isn't legal language; there's nothing to translate.",
+        "category": "Non-Legal",
+        "confidence": "medium",
+        "word_count": 6,
+        "parse_confidence": "local",
+    }
+
+def test_local_classification_threshold():
+    from main import local_classification
+    assert local_classification("Can you help me with my homework?") is None  # off by default
+    assert local_classification("Can you help me with my homework?", threshold=0) is not None
+    assert local_classification("The tenant must pay by the fifth of each month.", threshold=0) is None
+    assert local_classification("Subject property is sold 'as is' with all faults.", threshold=1) is not None
+
+def test_text_analysis_matches_per_step_helpers():
+    from main import TextAnalysis, _normalize_text, find_terms, cache_key
+    text = "  The Tenant  shall pay\n\nrent; the Landlord's duty of care — applies.  "
+    analysis = TextAnalysis(text)
+    assert analysis.lowered == text.lower()
+    assert analysis.word_count == len(text.split())
+    assert analysis.normalized == _normalize_text(text)
+    assert analysis.found == find_terms(text)
+    assert cache_key(text, analysis) == cache_key(text)
+
+def test_simplify_scans_text_for_terms_once():
+    """Fast path, category adjustment and fallbacks share one term scan per request"""
+    import main
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Other Legal", "plain_english": ""}')), \
+         patch.object(main._TERM_MATCHER, 'find', wraps=main._TERM_MATCHER.find) as find:
+        response = client.post("/simplify", json={"text": "The lessee shall vacate the premises upon termination of the lease."})
+    assert response.status_code == 200
+    assert find.call_count == 1
+
+def test_simplify_rate_limits_per_client_not_per_text():
+    """Requests are limited per API key (or IP), whatever text they send"""
+    rate_limiter.clear()
+    with patch('main.RATE_LIMIT_REQUESTS', 2), patch('main.RATE_LIMIT_API_KEYS', {"alice", "bob"}), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Contract", "plain_english": "ok"}')):
+        statuses = [
+            client.post("/simplify", json={"text": f"The tenant shall pay rent {i}."}, headers={"X-API-Key": "alice"}).status_code
+            for i in range(3)
+        ]
+        other = client.post("/simplify", json={"text": "The tenant shall pay rent 0."}, headers={"X-API-Key": "bob"})
+    rate_limiter.clear()
+    assert statuses == [200, 200, 429]
+    assert other.status_code == 200
+
+def test_simplify_rate_limit_ignores_spoofed_forwarded_for_entries():
+    """Only the X-Forwarded-For entry appended by the trusted proxy identifies the client"""
+    rate_limiter.clear()
+    with patch('main.RATE_LIMIT_REQUESTS', 2), patch('main.RATE_LIMIT_TRUST_FORWARDED', True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Contract", "plain_english": "ok"}')):
+        statuses = [
+            client.post("/simplify", json={"text": f"The tenant shall pay rent {i}."},
+                        headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"}).status_code
+            for i in range(4)
+        ]
+        other = client.post("/simplify", json={"text": "The tenant shall pay rent 0."},
+                            headers={"X-Forwarded-For": "203.0.113.8"})
+    rate_limiter.clear()
+    assert statuses == [200, 200, 429, 429]
+    assert other.status_code == 200
+
+def test_simplify_rate_limit_ignores_unlisted_api_keys():
+    """A fresh X-API-Key per request still lands in the caller's IP bucket"""
+    rate_limiter.clear()
+    with patch('main.RATE_LIMIT_REQUESTS', 2), patch('main.RATE_LIMIT_API_KEYS', {"alice"}), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Contract", "plain_english": "ok"}')):
+        statuses = [
+            client.post("/simplify", json={"text": f"The tenant shall pay rent {i}."}, headers={"X-API-Key": f"random-{i}"}).status_code
+            for i in range(3)
+        ]
+        tracked = rate_limiter.stats()
+    rate_limiter.clear()
+    assert statuses == [200, 200, 429]
+    assert tracked["tracked_keys"] == 1
+
+def test_simplify_sheds_with_retry_after_when_upstream_is_saturated():
+    """A full admission queue returns 503 with Retry-After instead of piling up"""
+    from concurrency import AdmissionController
+    saturated = AdmissionController(max_inflight=1, max_queue=0, queue_timeout=1)
+    saturated.inflight = 1
+    with patch('main.check_rate_limit', return_value=True), patch('main.admission', saturated), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock) as create:
+        response = client.post("/simplify", json={"text": "The tenant shall pay rent on the first of the month."})
+        metrics = client.get("/metrics").json()["admission"]
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert create.await_count == 0
+    assert metrics["shed_queue_full"] == 1
+
+def test_admin_admission_limits_require_token():
+    import main
+    original = main.admission.stats()
+    with patch('main.ADMIN_TOKEN', "secret"):
+        assert client.put("/admin/admission", json={"max_inflight": 4}).status_code == 403
+        response = client.put("/admin/admission", json={"max_inflight": 4, "queue_timeout": 2.5}, headers={"X-Admin-Token": "secret"})
+    main.admission.configure(original["max_inflight"], original["max_queue"], original["queue_timeout"])
+    assert response.status_code == 200
+    assert response.json()["max_inflight"] == 4
+    assert response.json()["queue_timeout"] == 2.5
+    assert response.json()["max_queue"] == original["max_queue"]
+
+def test_simplify_serves_degraded_answers_while_circuit_is_open():
+    """Repeated upstream failures open the breaker; later requests get the local rules instantly"""
+    async def raise_exception(*args, **kwargs):
+        raise Exception("OpenAI API failed")
+
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=raise_exception) as create:
+        failures = [client.post("/simplify", json={"text": f"The tenant shall pay rent {i}."}).status_code
+                    for i in range(breaker.failure_threshold)]
+        response = client.post("/simplify", json={"text": "The party of the first part shall indemnify the party of the second part."})
+        health = client.get("/health").json()
+        metrics = client.get("/metrics").json()
+
+    assert failures == [500] * breaker.failure_threshold
+    assert create.await_count == breaker.failure_threshold
+    assert response.status_code == 200
+    assert response.json()["parse_confidence"] == "degraded"
+    assert response.json()["category"] == "Contract"
+    assert response.json()["response"] == "The first party will indemnify the second party."
+    assert health == {"status": "degraded", "circuit": "open"}
+    assert metrics["circuit_breaker"]["state"] == "open"
+    assert metrics["circuit_breaker"]["transitions"][-1]["to"] == "open"
+    assert metrics["server_status"] == "degraded"
+    assert len(response_cache) == 0
+
+def test_circuit_half_open_probe_closes_breaker_on_success():
+    import main
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure("boom")
+    assert breaker.state == "open"
+    breaker._opened_at -= breaker.reset_timeout
+    with patch('main.check_rate_limit', return_value=True), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock,
+               return_value=_tool_call_response('{"category": "Contract", "plain_english": "ok"}')) as create:
+        response = client.post("/simplify", json={"text": "The tenant shall pay rent."})
+    assert response.json()["parse_confidence"] == "high"
+    assert create.await_count == 1
+    assert [t["to"] for t in main.breaker.transitions] == ["open", "half_open", "closed"]
+
+def test_simplify_model_call_times_out_within_attempt_budget():
+    """A hung upstream call fails after MODEL_ATTEMPT_TIMEOUT and counts against the breaker"""
+    import asyncio
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    with patch('main.check_rate_limit', return_value=True), patch('main.MODEL_ATTEMPT_TIMEOUT', 0.05), \
+         patch('main.client.chat.completions.create', hang):
+        start = time.perf_counter()
+        response = client.post("/simplify", json={"text": "The tenant shall pay rent on time."})
+        elapsed = time.perf_counter() - start
+    assert response.status_code == 500
+    assert "timed out" in response.json()["detail"]
+    assert elapsed < 2
+    assert breaker.consecutive_failures == 1
+
+def test_simplify_hung_calls_open_the_breaker_when_deadline_equals_attempt_timeout():
+    """With the default equal deadline and attempt timeout, hung calls still count as failures"""
+    import asyncio
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    with patch('main.check_rate_limit', return_value=True), patch('main.MODEL_DEADLINE', 0.1), \
+         patch('main.MODEL_ATTEMPT_TIMEOUT', 0.1), patch('main.client.chat.completions.create', hang):
+        statuses = [
+            client.post("/simplify", json={"text": f"The tenant shall pay rent on day {i}."}).status_code
+            for i in range(breaker.failure_threshold)
+        ]
+    assert statuses == [500] * breaker.failure_threshold
+    assert breaker.failures == breaker.failure_threshold
+    assert breaker.state == breaker.OPEN
+
+def test_simplify_routes_to_fast_model_and_escalates_weak_answers():
+    """The fast model answers first; echoes and category overrides go to the strong model"""
+    import main
+
+    async def fake_create(*args, **kwargs):
+        text = kwargs["messages"][-1]["content"]
+        if kwargs["model"] == "fast-model":
+            if "echo" in text:
+                return _tool_call_response(json.dumps({"category": "Contract", "plain_english": text}))
+            return _tool_call_response(json.dumps({"category": "Contract", "plain_english": "Pay on time."}))
+        return _tool_call_response(json.dumps({"category": "Contract", "plain_english": "Strong answer."}))
+
+    with patch('main.check_rate_limit', return_value=True), patch('main.FAST_MODEL_NAME', "fast-model"), \
+         patch('main.routing_stats', main.RoutingStats()), \
+         patch('main.client.chat.completions.create', new_callable=AsyncMock, side_effect=fake_create) as create:
+        fast = client.post("/simplify", json={"text": "The buyer shall pay the invoice on time."}).json()
+        escalated = client.post("/simplify", json={"text": "The buyer shall echo the contract terms."}).json()
+        routing = client.get("/metrics").json()["routing"]
+
+    assert fast["response"] == "Pay on time."
+    assert escalated["response"] == "Strong answer."
+    assert [c.kwargs["model"] for c in create.await_args_list] == ["fast-model", "fast-model", main.MODEL_NAME]
+    assert routing["fast_served"] == 1
+    assert routing["escalated"] == 1
+    assert routing["escalation_rate"] == 0.5
+    assert routing["escalation_reasons"] == {"echo": 1}
+    assert routing["latency"]["fast"]["calls"] == 2
+    assert routing["latency"]["strong"]["calls"] == 1
+
+def test_simplify_escalation_shares_one_deadline():
+    """The strong call after a slow fast-model failure only gets the rest of MODEL_DEADLINE"""
+    import asyncio
+    import main
+
+    async def fake_create(*args, **kwargs):
+        if kwargs["model"] == "fast-model":
+            await asyncio.sleep(0.3)
+            raise RuntimeError("fast model unavailable")
+        await asyncio.sleep(5)
+
+    with patch('main.check_rate_limit', return_value=True), patch('main.FAST_MODEL_NAME', "fast-model"), \
+         patch('main.MODEL_DEADLINE', 0.4), patch('main.MODEL_ATTEMPT_TIMEOUT', 0.4), \
+         patch('main.routing_stats', main.RoutingStats()), \
+         patch('main.client.chat.completions.create', side_effect=fake_create):
+        start = time.perf_counter()
+        response = client.post("/simplify", json={"text": "The buyer shall pay the invoice on time."})
+        elapsed = time.perf_counter() - start
+
+    assert response.status_code == 500
+    assert "deadline" in response.json()["detail"]
+    assert elapsed < 0.6
+
+def test_prompt_reload_endpoint_changes_prompt_and_cache_key(tmp_path):
+    """The system prompt is served from memory; a reload swaps it and moves cache keys to the new version"""
+    import main
+    from main import cache_key
+    from prompt_store import PromptStore
+
+    (tmp_path / "p.txt").write_text("Prompt one")
+    store = PromptStore(str(tmp_path), "p.txt")
+    with patch('main.prompt_store', store), patch('main.ADMIN_TOKEN', "secret"):
+        old_key = cache_key("The tenant shall pay rent.")
+        assert main._completion_kwargs("text")["messages"][0]["content"] == "Prompt one"
+        (tmp_path / "p.txt").write_text("Prompt two, revised")
+        assert client.post("/admin/prompts/reload").status_code == 403
+        response = client.post("/admin/prompts/reload", headers={"X-Admin-Token": "secret"})
+        new_key = cache_key("The tenant shall pay rent.")
+        system_prompt = main._completion_kwargs("text")["messages"][0]["content"]
+        metrics = client.get("/metrics").json()
+
+    assert response.status_code == 200
+    assert response.json()["changed"] is True
+    assert system_prompt == "Prompt two, revised"
+    assert new_key != old_key
+    assert metrics["prompt"]["version"] == store.current.version
+
+def test_token_usage_is_recorded_per_prompt_version_for_simplify_and_stream():
+    """Usage from completions (and the final stream chunk) is totalled under the active prompt version"""
+    import main
+    from openai import AsyncOpenAI
+    from fake_openai_server import FakeCompletionServer
+    from usage import TokenUsage
+
+    with FakeCompletionServer(latency=0, chunk_delay=0) as server, \
+         patch("main.token_usage", TokenUsage()), patch("main.check_rate_limit", return_value=True):
+        # One OpenAI client per request: TestClient runs each request on its own event loop.
+        with patch("main.client", AsyncOpenAI(api_key="test", base_url=server.base_url)):
+            client.post("/simplify", json={"text": "The lessee shall maintain the premises in good repair."})
+        with patch("main.client", AsyncOpenAI(api_key="test", base_url=server.base_url)):
+            client.post("/simplify/stream", json={"text": "The lessor shall deliver possession on the commencement date."})
+        tokens = client.get("/metrics").json()["tokens"]
+
+    version = main.prompt_store.current.version
+    assert tokens["calls"] == 2
+    assert tokens["missing_usage"] == 0
+    assert tokens["by_prompt"][version]["calls"] == 2
+    # The system prompt alone is about a quarter as many tokens as it has characters.
+    assert tokens["avg_prompt_tokens"] > len(main.prompt_store.current.text) // 4
+    assert sum(c["calls"] for c in tokens["by_category"].values()) == 2
+
+def test_prefix_stays_byte_identical_across_reloads_and_model_tiers():
+    """The fake server sees one static prefix for both tiers, before and after a no-op prompt reload, and reports cache hits"""
+    import main
+    from openai import AsyncOpenAI
+    from fake_openai_server import FakeCompletionServer
+    from usage import TokenUsage
+
+    # The fake model answers Other Legal, which the keyword rules override here, so every call escalates.
+    texts = [f"Employer shall provide {30 + i} days written notice prior to any reduction in force." for i in range(4)]
+    with FakeCompletionServer(latency=0) as server, patch("main.FAST_MODEL_NAME", "fast-model"), \
+         patch("main.token_usage", TokenUsage()), patch("main.check_rate_limit", return_value=True):
+        for i, text in enumerate(texts):
+            if i == 2:
+                assert main.prompt_store.reload() is False
+            with patch("main.client", AsyncOpenAI(api_key="test", base_url=server.base_url)):
+                assert client.post("/simplify", json={"text": text}).status_code == 200
+        metrics = client.get("/metrics").json()
+        prefixes = server.app.state.prefixes
+
+    assert {model for model, _ in prefixes} == {"fast-model", main.MODEL_NAME}
+    assert len({prefix for _, prefix in prefixes}) == 1
+    assert metrics["prefix_cache"]["prefix_sha256"] == main.request_builder.prefix(main.prompt_store.current).sha256
+    # Every call after the first on each model reuses the cached prefix.
+    calls = metrics["tokens"]["calls"]
+    assert metrics["tokens"]["cache_hits"] == calls - len(prefixes)
+    assert metrics["prefix_cache"]["hit_ratio"] > 0.5
+
+def test_replayed_eval_reproduces_recorded_categories(tmp_path):
+    """Category eval samples recorded through /simplify replay offline with identical answers"""
+    import asyncio
+    import httpx
+    import yaml
+    from openai import AsyncOpenAI
+    from cassette import Cassette, CassetteClient
+    from fake_openai_server import FakeCompletionServer
+
+    with open("category_eval_samples.yaml") as f:
+        samples = yaml.safe_load(f)["samples"]
+    cassette = Cassette(str(tmp_path))
+
+    async def run_eval(base_url, mode):
+        model_client = CassetteClient(AsyncOpenAI(api_key="test", base_url=base_url), cassette, mode)
+        with patch("main.client", model_client):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://eval") as http:
+                responses = [await http.post("/simplify", json={"text": s["input"]}) for s in samples]
+        await model_client.close()
+        return [r.json() for r in responses]
+
+    with patch("main.check_rate_limit", return_value=True):
+        with FakeCompletionServer(latency=0) as server:
+            recorded = asyncio.run(run_eval(server.base_url, "record"))
+        response_cache.clear()
+        replayed = asyncio.run(run_eval("http://127.0.0.1:9/v1", "replay"))
+
+    def accuracy(results):
+        return sum(r["category"] == s["expected_category"] for r, s in zip(results, samples))
+
+    assert cassette.misses == 0
+    assert cassette.hits == cassette.recorded > 0
+    assert replayed == recorded
+    assert accuracy(replayed) == accuracy(recorded)
+
+def test_replay_misses_fail_without_opening_the_breaker(tmp_path):
+    """An unrecorded request is an error in replay mode, never a degraded answer"""
+    from cassette import Cassette, CassetteClient
+
+    replayer = CassetteClient(MagicMock(), Cassette(str(tmp_path)), "replay")
+    with patch("main.check_rate_limit", return_value=True), patch("main.client", replayer):
+        responses = [
+            client.post("/simplify", json={"text": f"The tenant shall pay rent on day {i}."})
+            for i in range(breaker.failure_threshold + 2)
+        ]
+    assert [r.status_code for r in responses] == [500] * (breaker.failure_threshold + 2)
+    assert "No recorded response" in responses[-1].json()["detail"]
+    assert breaker.state == breaker.CLOSED
+    assert breaker.failures == 0
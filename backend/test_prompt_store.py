@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+import pytest
+
+from prompt_store import PromptStore
+
+
+def write(directory, name, text):
+    path = directory / name
+    path.write_text(text)
+    # Bump the mtime explicitly so the watcher sees the change on coarse-grained filesystems.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_prompt_is_rendered_once_and_versioned(tmp_path):
+    write(tmp_path, "v1.txt", "You are {{ 'a legal' }} assistant.")
+    store = PromptStore(str(tmp_path), "v1.txt")
+    assert store.current.text == "You are a legal assistant."
+    assert store.current.version == f"v1.txt@{store.current.sha256[:12]}"
+    assert store.stats()["using_fallback"] is False
+
+
+def test_missing_template_falls_back_at_startup(tmp_path):
+    write(tmp_path, "v1.txt", "fallback prompt")
+    store = PromptStore(str(tmp_path), "missing.txt", "v1.txt")
+    assert store.current.template == "v1.txt"
+    assert store.stats()["using_fallback"] is True
+    with pytest.raises(Exception):
+        PromptStore(str(tmp_path), "missing.txt")
+
+
+def test_reload_swaps_only_on_change_and_keeps_snapshot_on_error(tmp_path):
+    write(tmp_path, "v1.txt", "first")
+    store = PromptStore(str(tmp_path), "v1.txt")
+    before = store.current
+    assert store.reload() is False
+    assert store.current is before
+
+    write(tmp_path, "v1.txt", "second")
+    assert store.reload() is True
+    assert store.current.text == "second"
+    assert store.current.sha256 != before.sha256
+
+    write(tmp_path, "v1.txt", "{% broken")
+    with pytest.raises(Exception):
+        store.reload()
+    assert store.current.text == "second"
+    assert store.stats()["reloads"] == 1
+    assert store.stats()["reload_errors"] == 1
+
+
+def test_broken_reload_keeps_current_prompt_instead_of_fallback(tmp_path):
+    write(tmp_path, "v5.txt", "current")
+    write(tmp_path, "v4.txt", "older")
+    store = PromptStore(str(tmp_path), "v5.txt", fallback="v4.txt")
+
+    write(tmp_path, "v5.txt", "{% broken")
+    with pytest.raises(Exception):
+        store.reload()
+    assert store.current.text == "current"
+    assert store.stats()["using_fallback"] is False
+
+
+def test_watch_picks_up_edits(tmp_path):
+    write(tmp_path, "v1.txt", "first")
+    store = PromptStore(str(tmp_path), "v1.txt")
+
+    async def scenario():
+        watcher = asyncio.create_task(store.watch(0.01))
+        await asyncio.sleep(0.05)
+        write(tmp_path, "v1.txt", "edited")
+        for _ in range(100):
+            if store.current.text == "edited":
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert store.current.text == "edited"
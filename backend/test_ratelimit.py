@@ -0,0 +1,128 @@
+import multiprocessing
+import sqlite3
+import time
+
+from ratelimit import SQLiteRateLimiter, TokenBucketLimiter
+
+
+def test_token_bucket_bursts_then_refills():
+    limiter = TokenBucketLimiter(window=60)
+    assert [limiter.hit("a", 2, 60, now=0) for _ in range(3)] == [True, True, False]
+    assert limiter.hit("a", 2, 60, now=29) is False
+    assert limiter.hit("a", 2, 60, now=30) is True
+    assert limiter.hit("a", 2, 60, now=30) is False
+    assert limiter.hit("b", 2, 60, now=30) is True
+
+
+def test_idle_keys_are_evicted():
+    limiter = TokenBucketLimiter(window=60)
+    for i in range(100):
+        limiter.hit(f"client-{i}", 5, 60, now=i * 0.1)
+    assert limiter.active_keys(now=30) == 100
+    limiter.hit("late", 5, 60, now=65)
+    assert len(limiter) == 50
+    assert limiter.active_keys(now=200) == 0
+
+
+def test_key_cap_drops_least_recently_seen():
+    limiter = TokenBucketLimiter(window=60, max_keys=3)
+    for key in "abcd":
+        limiter.hit(key, 1, 60, now=0)
+    assert len(limiter) == 3
+    assert limiter.evicted == 1
+    # "a" was dropped, so it starts over with a full bucket; "b" is still limited.
+    assert limiter.hit("a", 1, 60, now=1) is True
+    assert limiter.hit("d", 1, 60, now=1) is False
+
+
+def test_requests_in_window_slides():
+    limiter = TokenBucketLimiter(window=60)
+    for i in range(10):
+        limiter.hit(f"k{i}", 5, 60, now=0)
+    limiter.hit("k0", 5, 60, now=59)
+    assert limiter.requests_in_window(now=59) == 11
+    assert limiter.requests_in_window(now=75) == 8
+    assert limiter.requests_in_window(now=200) == 0
+    assert limiter.stats(now=200)["allowed"] == 11
+
+
+def test_sqlite_limiter_refills_like_in_memory(tmp_path):
+    shared = SQLiteRateLimiter(str(tmp_path / "limits.db"), window=60)
+    local = TokenBucketLimiter(window=60)
+    times = [0, 0, 0, 0, 10, 20, 20, 45, 90, 90, 90, 90]
+    assert [shared.hit("a", 3, 60, now=t) for t in times] == [local.hit("a", 3, 60, now=t) for t in times]
+    assert shared.active_keys(now=100) == 1
+    assert shared.active_keys(now=200) == 0
+    shared.close()
+
+
+def test_costly_requests_take_several_tokens_in_both_limiters(tmp_path):
+    shared = SQLiteRateLimiter(str(tmp_path / "limits.db"), window=60)
+    local = TokenBucketLimiter(window=60)
+    calls = [(0, 3), (0, 2), (0, 1), (20, 3), (30, 2), (30, 11)]
+    expected = [True, True, False, False, True, False]
+    assert [local.hit("a", 5, 60, now=t, cost=c) for t, c in calls] == expected
+    assert [shared.hit("a", 5, 60, now=t, cost=c) for t, c in calls] == expected
+    assert shared.requests_in_window(now=30) == local.requests_in_window(now=30) == 7  # tokens, not requests
+    shared.close()
+
+
+def test_sqlite_limiter_evicts_idle_and_excess_keys(tmp_path):
+    limiter = SQLiteRateLimiter(str(tmp_path / "limits.db"), window=60, max_keys=5, evict_every=10)
+    for i in range(10):
+        limiter.hit(f"old-{i}", 1, 60, now=0)
+    assert len(limiter) == 5
+    assert limiter.evicted == 5
+    for i in range(10):
+        limiter.hit(f"new-{i}", 1, 60, now=100)
+    assert len(limiter) == 5
+    assert limiter.active_keys(now=100) == 5
+    limiter.close()
+
+
+def _hit_shared(path, count, results):
+    limiter = SQLiteRateLimiter(path, window=3600, busy_timeout=5.0)
+    results.put(sum(limiter.hit("shared-client", 40, 3600) for _ in range(count)))
+    limiter.close()
+
+
+def test_sqlite_limiter_holds_global_limit_across_processes(tmp_path):
+    path = str(tmp_path / "limits.db")
+    SQLiteRateLimiter(path).close()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_hit_shared, args=(path, 25, results)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    granted = [results.get(timeout=30) for _ in procs]
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+    assert sum(granted) == 40
+    limiter = SQLiteRateLimiter(path, window=3600)
+    assert limiter.requests_in_window() == 40
+    assert limiter.stats()["errors"] == 0
+
+
+def test_sqlite_limiter_fails_open_quickly_on_a_locked_database(tmp_path):
+    path = str(tmp_path / "limits.db")
+    limiter = SQLiteRateLimiter(path, window=60)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # another worker mid-check
+
+    start = time.perf_counter()
+    granted = limiter.hit("client", 0, 60)
+    elapsed = time.perf_counter() - start
+
+    other.rollback()
+    other.close()
+    assert granted is True
+    assert elapsed < 1
+    assert limiter.stats()["errors"] == 1
+
+
+def test_sqlite_limiter_check_is_under_a_millisecond(tmp_path):
+    limiter = SQLiteRateLimiter(str(tmp_path / "limits.db"))
+    start = time.perf_counter()
+    for i in range(500):
+        limiter.hit(f"client-{i % 20}", 1000, 60)
+    assert (time.perf_counter() - start) / 500 < 0.001
@@ -0,0 +1,55 @@
+import json
+
+from prompt_store import PromptSnapshot
+from request_builder import RequestBuilder
+
+TOOLS = [{"type": "function", "function": {"name": "classify_legal_area", "parameters": {"type": "object"}}}]
+CHOICE = {"type": "function", "function": {"name": "classify_legal_area"}}
+
+
+def snapshot(text):
+    return PromptSnapshot("p.txt", text, str(hash(text)), 0.0)
+
+
+def static_part(kwargs):
+    return json.dumps(kwargs["tools"]) + json.dumps(kwargs["messages"][:-1])
+
+
+def test_prefix_is_identical_across_models_limits_and_inputs():
+    builder = RequestBuilder(TOOLS, CHOICE)
+    prompt = snapshot("You are a legal assistant.")
+    requests = [
+        builder.build(prompt, "The lessee shall pay rent.", "gpt-5", 500),
+        builder.build(prompt, "Time is of the essence.", "gpt-5-mini", 200),
+        builder.build(prompt, "Anything else", "gpt-4o", 300),
+    ]
+    assert len({static_part(r) for r in requests}) == 1
+    assert [r["messages"][-1]["content"] for r in requests][0] == "The lessee shall pay rent."
+    assert requests[0]["max_completion_tokens"] == 500
+    assert requests[2]["max_tokens"] == 300 and requests[2]["temperature"] == 0.1
+
+
+def test_caller_mutations_cannot_change_the_prefix():
+    tools = json.loads(json.dumps(TOOLS))
+    builder = RequestBuilder(tools, CHOICE)
+    prompt = snapshot("System prompt")
+    before = builder.prefix(prompt)
+    first = builder.build(prompt, "x", "gpt-5")
+    tools[0]["function"]["name"] = "renamed"
+    first["tools"][0]["function"]["name"] = "renamed"
+    first["tools"].append({"type": "function", "function": {"name": "extra"}})
+    first["tool_choice"]["function"]["name"] = "extra"
+
+    later = builder.build(prompt, "y", "gpt-5")
+    assert later["tools"] == TOOLS
+    assert later["tool_choice"] == CHOICE
+    assert builder.prefix(prompt) == before
+
+
+def test_prefix_fingerprint_follows_prompt_content_and_cache_key_is_optional():
+    builder = RequestBuilder(TOOLS, CHOICE, cache_key=True)
+    one, same, other = snapshot("Prompt A"), snapshot("Prompt A"), snapshot("Prompt B")
+    assert builder.prefix(one) == builder.prefix(same)
+    assert builder.prefix(one) != builder.prefix(other)
+    assert builder.build(one, "x", "gpt-5")["prompt_cache_key"] == "legal-ease-" + builder.prefix(one).sha256[:16]
+    assert "prompt_cache_key" not in RequestBuilder(TOOLS, CHOICE).build(one, "x", "gpt-5")
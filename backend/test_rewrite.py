@@ -0,0 +1,45 @@
+import os
+import random
+import re
+
+import pytest
+
+from rewrite import RewriteRules, load_rules
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), "rewrite_rules.yaml")
+
+
+def sequential(rules, text):
+    for phrase, replacement in rules:
+        text = re.sub(rf"\b{re.escape(phrase)}\b", replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+def test_rewrite_rules_earlier_rule_wins_at_same_position():
+    rules = RewriteRules([("breached the duty of care owed to", "failed toward"), ("breached", "failed to meet")])
+    assert rules.apply("He Breached the duty of care owed to her and breached again.") == "He failed toward her and failed to meet again."
+
+
+def test_rewrite_rules_match_whole_words_only():
+    rules = RewriteRules([("shall", "will"), ("herein", "here")])
+    assert rules.apply("Marshall shall remain hereinafter; SHALL herein.") == "Marshall will remain hereinafter; will here."
+
+
+def test_rewrite_rules_reject_replacements_a_later_rule_would_rewrite():
+    with pytest.raises(ValueError):
+        RewriteRules([("plaintiff", "the injured party"), ("party", "person")])
+
+
+def test_rewrite_rules_empty_set_is_identity():
+    assert RewriteRules([]).apply("unchanged text") == "unchanged text"
+
+
+def test_shipped_rules_match_sequential_substitution():
+    rng = random.Random(11)
+    for rules in load_rules(RULES_PATH).values():
+        phrases = [p for p, _ in rules.rules]
+        words = phrases + ["the", "to", "of", "care", "all", "party", "x", ",", ".", "  "]
+        for _ in range(2000):
+            pieces = [rng.choice([w, w.upper(), w.title()]) for w in rng.choices(words, k=rng.randint(1, 10))]
+            text = rng.choice(["", " "]).join(pieces)
+            assert rules.apply(text) == sequential(rules.rules, text), text
@@ -0,0 +1,24 @@
+from routing import RoutingStats, weak_reasons
+
+
+def test_weak_reasons():
+    assert weak_reasons("high", False, False) == []
+    assert weak_reasons("adjusted", True, False) == ["category_override"]
+    assert weak_reasons("medium", False, True) == ["low_confidence", "echo"]
+    assert weak_reasons("low", False, False) == ["low_confidence"]
+
+
+def test_routing_stats_escalation_rate_and_latency():
+    stats = RoutingStats()
+    for _ in range(3):
+        stats.fast_served += 1
+        stats.record_call("fast", 0.1)
+    stats.record_call("fast", 0.1)
+    stats.record_call("strong", 1.0)
+    stats.record_escalation(["echo", "low_confidence"])
+    summary = stats.stats()
+    assert summary["escalation_rate"] == 0.25
+    assert summary["escalation_reasons"] == {"echo": 1, "low_confidence": 1}
+    assert summary["latency"]["fast"]["calls"] == 4
+    assert summary["latency"]["strong"]["p95_ms"] == 1000.0
+    assert summary["latency"]["strong"]["avg_ms"] == 1000.0
@@ -0,0 +1,37 @@
+from segmentation import iter_chunks, iter_sentences
+
+
+def test_iter_sentences_keeps_abbreviations_and_clause_numbers():
+    text = (
+        '1. Definitions. The Lessee ("Tenant") shall pay ABC Corp. No. 5 on the first day. '
+        "See U.S. law, e.g. the Act.\n\nSection 2: Term. J. Smith may renew! Is that clear?"
+    )
+    assert list(iter_sentences(text)) == [
+        "1. Definitions.",
+        'The Lessee ("Tenant") shall pay ABC Corp. No. 5 on the first day.',
+        "See U.S. law, e.g. the Act.",
+        "Section 2: Term.",
+        "J. Smith may renew!",
+        "Is that clear?",
+    ]
+
+
+def test_iter_chunks_packs_sentences_in_order():
+    sentences = [f"Clause {i} shall apply to the parties." for i in range(50)]
+    chunks = list(iter_chunks(" ".join(sentences), 200))
+    assert all(len(c) <= 200 for c in chunks)
+    assert " ".join(chunks) == " ".join(sentences)
+    assert len(chunks) > 1
+
+
+def test_iter_chunks_splits_long_sentences_at_clause_separators():
+    sentence = "; ".join(f"the tenant shall maintain item {i} in good repair" for i in range(40)) + "."
+    chunks = list(iter_chunks(sentence, 300))
+    assert all(len(c) <= 300 for c in chunks)
+    assert all(c.endswith((";", ".")) for c in chunks)
+    assert " ".join(chunks) == sentence
+
+
+def test_iter_chunks_is_lazy():
+    chunks = iter_chunks("The buyer shall pay. " * 100_000, 1000)
+    assert len(next(chunks)) <= 1000
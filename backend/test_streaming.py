@@ -0,0 +1,40 @@
+import json
+
+from streaming import ToolArgsStream, sse_event
+
+
+def _feed_all(stream, fragments):
+    categories, text = [], ""
+    for fragment in fragments:
+        category, delta = stream.feed(fragment)
+        if category:
+            categories.append(category)
+        text += delta
+    return categories, text
+
+
+def test_tool_args_stream_emits_category_then_text():
+    args = json.dumps({"category": "Real Estate", "plain_english": "The seller gives the buyer a deed."})
+    stream = ToolArgsStream()
+    categories, text = _feed_all(stream, [args[i:i + 5] for i in range(0, len(args), 5)])
+    assert categories == ["Real Estate"]
+    assert text == "The seller gives the buyer a deed."
+    assert stream.buffer == args
+
+
+def test_tool_args_stream_holds_back_split_escapes():
+    args = json.dumps({"category": "Contract", "plain_english": 'Say "yes"\nthen sign — ok 😀'})
+    stream = ToolArgsStream()
+    categories, text = _feed_all(stream, list(args))
+    assert categories == ["Contract"]
+    assert text == 'Say "yes"\nthen sign — ok 😀'
+
+
+def test_tool_args_stream_text_before_category():
+    stream = ToolArgsStream()
+    assert stream.feed('{"plain_english": "Pay on') == (None, "Pay on")
+    assert stream.feed(' time", "category": "Contract"}') == ("Contract", " time")
+
+
+def test_sse_event_format():
+    assert sse_event("category", {"category": "Contract"}) == 'event: category\ndata: {"category": "Contract"}\n\n'
@@ -0,0 +1,39 @@
+import random
+
+from terms import TermMatcher
+
+TERMS = {"will", "wills", "last will", "trust", "trustee", "as is", "warrant", "search warrant", "indemnif", "hold harmless", "rent"}
+
+
+def brute_force(text):
+    return frozenset(t for t in TERMS if t in text)
+
+
+def test_term_matcher_finds_nested_and_mid_word_terms():
+    matcher = TermMatcher(TERMS)
+    text = "my last will names a trustee; the parent has issues with the search warrant."
+    assert matcher.find(text) == brute_force(text)
+    assert {"will", "last will", "trust", "trustee", "rent", "as is", "warrant", "search warrant"} <= matcher.find(text)
+
+
+def test_term_matcher_phrases_need_exact_spacing():
+    matcher = TermMatcher(TERMS)
+    assert "hold harmless" in matcher.find("agrees to hold harmless the buyer")
+    assert "hold harmless" not in matcher.find("agrees to hold  harmless the buyer")
+    assert "hold harmless" not in matcher.find("harmless hold")
+
+
+def test_term_matcher_matches_substring_semantics():
+    matcher = TermMatcher(TERMS)
+    words = sorted(TERMS) + ["the", "s", "ee", "of", ",", ".", "x"]
+    rng = random.Random(3)
+    for _ in range(2000):
+        text = "".join(rng.choice(words) + rng.choice(["", " ", "  "]) for _ in range(rng.randint(0, 12)))
+        assert matcher.find(text) == brute_force(text), text
+
+
+def test_term_matcher_counts_per_group():
+    matcher = TermMatcher(TERMS)
+    found = matcher.find("the trustee shall indemnify")
+    groups = {"Estate": frozenset({"trust", "trustee", "will"}), "Contract": frozenset({"indemnif", "hold harmless"})}
+    assert matcher.counts(found, groups) == {"Estate": 2, "Contract": 1}
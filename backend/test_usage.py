@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from usage import TokenUsage, usage_counts
+
+
+def make_usage(prompt, completion, cached=None):
+    details = SimpleNamespace(cached_tokens=cached) if cached is not None else None
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, prompt_tokens_details=details)
+
+
+def test_usage_counts_reads_cached_tokens_when_present():
+    assert usage_counts(make_usage(100, 20, 64)) == {"prompt_tokens": 100, "completion_tokens": 20, "cached_tokens": 64}
+    assert usage_counts(make_usage(100, 20))["cached_tokens"] == 0
+    assert usage_counts(None) is None
+
+
+def test_token_usage_breaks_down_by_prompt_and_category():
+    usage = TokenUsage()
+    usage.record("v5@aaa", "Contract", make_usage(1000, 50, 768))
+    usage.record("v5@aaa", "Real Estate", make_usage(1000, 70))
+    usage.record("v4@bbb", "Contract", make_usage(700, 40))
+    usage.record("v4@bbb", "Contract", None)
+
+    stats = usage.stats()
+    assert stats["calls"] == 3
+    assert stats["prompt_tokens"] == 2700
+    assert stats["missing_usage"] == 1
+    assert stats["by_prompt"]["v5@aaa"]["avg_prompt_tokens"] == 1000
+    assert stats["by_prompt"]["v5@aaa"]["cached_ratio"] == 768 / 2000
+    assert stats["by_category"]["Contract"]["calls"] == 2
+    assert stats["by_category"]["Contract"]["completion_tokens"] == 90
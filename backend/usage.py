@@ -0,0 +1,67 @@
+"""
+Token accounting for model calls, taken from the `usage` block of each
+completion and broken down by prompt version and category.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+FIELDS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "cache_hits")
+
+
+def usage_counts(usage) -> Optional[Dict[str, int]]:
+    """(prompt, completion, cached) token counts from a completion's usage, or None if it has none."""
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if not isinstance(prompt, int) or not isinstance(completion, int):
+        return None
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": cached if isinstance(cached, int) else 0,
+    }
+
+
+class TokenUsage:
+    """Running token totals overall, per prompt version and per category.
+
+    `cached_ratio` is the share of prompt tokens served from the provider's
+    prefix cache; `cache_hit_ratio` is the share of calls that hit it at all.
+    """
+
+    def __init__(self):
+        self.totals = dict.fromkeys(FIELDS, 0)
+        self.missing_usage = 0
+        self._by_prompt: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        self._by_category: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    def record(self, prompt_version: str, category: str, usage) -> None:
+        counts = usage_counts(usage)
+        if counts is None:
+            self.missing_usage += 1
+            return
+        for bucket in (self.totals, self._by_prompt[prompt_version], self._by_category[category or "unknown"]):
+            bucket["calls"] += 1
+            bucket["cache_hits"] += counts["cached_tokens"] > 0
+            for field, n in counts.items():
+                bucket[field] += n
+
+    @staticmethod
+    def _summary(bucket: Dict[str, int]) -> Dict[str, Any]:
+        calls = bucket["calls"]
+        return {
+            **bucket,
+            "avg_prompt_tokens": bucket["prompt_tokens"] / calls if calls else 0.0,
+            "avg_completion_tokens": bucket["completion_tokens"] / calls if calls else 0.0,
+            "cached_ratio": bucket["cached_tokens"] / bucket["prompt_tokens"] if bucket["prompt_tokens"] else 0.0,
+            "cache_hit_ratio": bucket["cache_hits"] / calls if calls else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._summary(self.totals),
+            "missing_usage": self.missing_usage,
+            "by_prompt": {version: self._summary(b) for version, b in self._by_prompt.items()},
+            "by_category": {category: self._summary(b) for category, b in self._by_category.items()},
+        }
@@ -0,0 +1,86 @@
+"""
+Pre-warm the persistent translation cache so a fresh deploy starts hot.
+
+Inputs can be the eval samples YAML (a `samples` list with `input` keys) or a
+JSONL file of historical inputs, one per line, either as a JSON string or an
+object with a `text` (or `input`) field.
+
+Usage: python warm_cache.py category_eval_samples.yaml --db translation_cache.db
+       python warm_cache.py history.jsonl --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import yaml
+
+
+def load_inputs(path):
+    if path.endswith((".yaml", ".yml")):
+        with open(path, "r") as f:
+            data = yaml.safe_load(f)
+        return [sample["input"] for sample in data["samples"]]
+    texts = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            texts.append(item if isinstance(item, str) else item.get("text") or item.get("input", ""))
+    return texts
+
+
+async def warm(backend, texts, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    counts = {"translated": 0, "already_cached": 0, "skipped": 0, "failed": 0}
+
+    async def one(text):
+        try:
+            legal_text = backend.SimplifyRequest(text=text).text
+        except ValueError:
+            counts["skipped"] += 1
+            return
+        key = backend.cache_key(legal_text)
+        if key in backend.persistent_cache:
+            counts["already_cached"] += 1
+            return
+        async with sem:
+            try:
+                result = await backend._translate(legal_text)
+            except Exception as e:
+                print(f"  ❌ {legal_text[:50]!r}: {e}")
+                counts["failed"] += 1
+                return
+        backend.cache_store(key, result)
+        counts["translated"] += 1
+
+    await asyncio.gather(*(one(t) for t in dict.fromkeys(texts)))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", help="samples YAML or JSONL file of inputs")
+    parser.add_argument("--db", default=os.getenv("PERSISTENT_CACHE_PATH") or "translation_cache.db",
+                        help="persistent cache file (defaults to PERSISTENT_CACHE_PATH)")
+    parser.add_argument("--concurrency", type=int, default=8, help="model calls in flight")
+    args = parser.parse_args()
+
+    os.environ["PERSISTENT_CACHE_PATH"] = args.db
+    import main as backend
+
+    texts = load_inputs(args.inputs)
+    print(f"Warming {args.db} with {len(texts)} inputs from {args.inputs}...")
+    counts = asyncio.run(warm(backend, texts, args.concurrency))
+    print(f"✅ Translated {counts['translated']} | already cached {counts['already_cached']} | "
+          f"invalid {counts['skipped']} | failed {counts['failed']}")
+    print(f"Cache now holds {len(backend.persistent_cache)} entries")
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()